@@ -1,11 +1,17 @@
-import gymnasium as gym
-from gymnasium import spaces
-import numpy as np
+import argparse
+import os
+import tempfile
 import time
+from functools import partial
 from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
 from stable_baselines3.common.env_util import make_vec_env
-from asignador_recursos import AsignadorRecursos, DemandPredictor
-from app import cargar_datos_entrenamiento
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecMonitor
+from asignador_recursos import AsignadorRecursos, PredictorNumPy
+from artefactos import cargar_bundle
+from entrenar import entrenar_predictor
+from entorno_rl import EntornoBalanceo
+from simulador_eventos import EntornoSimulado, llegadas_desde_csv, llegadas_poisson
 
 # Definir constantes
 NUM_SERVIDORES_INICIAL = 1
@@ -13,81 +19,135 @@ NUM_SERVIDORES_MAX = 5
 UMBRAL_ESCALADO_SUPERIOR = 5
 UMBRAL_ESCALADO_INFERIOR = 1
 INTERVALO_IMPRESION = 10
-
-class EntornoBalanceo(gym.Env):
-    def __init__(self, asignador_recursos):
-        super(EntornoBalanceo, self).__init__()
-        self.asignador_recursos = asignador_recursos
-        self.action_space = spaces.Discrete(3)  # 0: No hacer nada, 1: Crear servidor, 2: Eliminar servidor
-        self.observation_space = spaces.Box(low=0, high=100, shape=(NUM_SERVIDORES_MAX + 1,), dtype=np.float32)
-
-    def reset(self, seed=None):
-        super().reset(seed=seed)
-        # Reiniciar el entorno a un estado inicial
-        for servidor in self.asignador_recursos.servidores:
-            servidor.carga = 0
-        self.asignador_recursos.cola_solicitudes.queue.clear()
-
-        # Devolver el estado inicial
-        return self._get_estado(), {}
-
-    def step(self, accion):
-        # Ejecutar la acción en el entorno
-        if accion == 1:
-            self.asignador_recursos.crear_servidor()
-        elif accion == 2:
-            self.asignador_recursos.eliminar_servidor()
-
-        # Esperar un tiempo para que la acción tenga efecto y se procesen solicitudes
-        time.sleep(1)  # Ajusta el tiempo según sea necesario
-
-        # Calcular la recompensa (esto es solo un ejemplo)
-        carga_promedio = sum(s.carga for s in self.asignador_recursos.servidores) / len(self.asignador_recursos.servidores) if len(self.asignador_recursos.servidores) > 0 else 0
-        longitud_cola = self.asignador_recursos.cola_solicitudes.qsize()
-        recompensa = -carga_promedio - longitud_cola * 0.5  # Penalizar carga alta y cola larga
-
-        # Obtener el nuevo estado
-        estado = self._get_estado()
-
-        # Comprobar si el episodio ha terminado (puedes definir un criterio de finalización)
-        terminado = False  # En este ejemplo, el episodio nunca termina
-        truncado = False
-        # Información adicional (opcional)
-        info = {}
-
-        return estado, recompensa, terminado, truncado, info
-
-    def _get_estado(self):
-        # Obtener el estado actual del sistema
-        carga_servidores = [s.carga for s in self.asignador_recursos.servidores]
-        longitud_cola = self.asignador_recursos.cola_solicitudes.qsize()
-
-        # Asegurarse de que el estado tenga siempre la misma longitud
-        while len(carga_servidores) < NUM_SERVIDORES_MAX:
-            carga_servidores.append(0.0)  # Rellenar con ceros si hay menos servidores que el máximo
-
-        estado = np.array(carga_servidores + [longitud_cola], dtype=np.float32)
-        return estado
-
-# Inicializar el DemandPredictor y entrenarlo si es necesario
-demand_predictor = DemandPredictor()
-# Aquí deberías cargar y entrenar tu modelo con los datos de datos_entrenamiento.csv
-X_train, y_train = cargar_datos_entrenamiento("datos_simulacion.csv")
-demand_predictor.train(X_train, y_train, epochs=100)
-
-# Crear una instancia de AsignadorRecursos
-asignador_recursos = AsignadorRecursos(NUM_SERVIDORES_INICIAL, demand_predictor)
-
-# Crear el entorno de RL
-entorno = EntornoBalanceo(asignador_recursos)
-
-# Crear el agente PPO
-modelo = PPO("MlpPolicy", entorno, verbose=1)
-
-# Entrenar el agente
-modelo.learn(total_timesteps=1000)  # Ajusta el número de pasos de entrenamiento
-
-# Guardar el modelo entrenado (opcional)
-modelo.save("modelo_ppo_balanceo")
-
-print("Entrenamiento completado. Modelo guardado.")
\ No newline at end of file
+# Servidores arrancados en espera; por defecto, los mismos que usa app.py
+TAMANO_RESERVA = int(os.environ.get("TAMANO_RESERVA", 1))
+
+class CallbackPasosPorSegundo(BaseCallback):
+    """Mide los pasos de entorno por segundo durante la recogida de experiencia y en total."""
+
+    def __init__(self, verbose=0):
+        super().__init__(verbose)
+        self.inicio = None
+        self.inicio_recogida = None
+        self.pasos_inicio_recogida = 0
+        self.tiempo_recogida = 0.0
+        self.pasos_recogidos = 0
+
+    def _on_training_start(self):
+        self.inicio = time.perf_counter()
+
+    def _on_rollout_start(self):
+        self.inicio_recogida = time.perf_counter()
+        self.pasos_inicio_recogida = self.num_timesteps
+
+    def _on_step(self):
+        return True
+
+    def _on_rollout_end(self):
+        duracion = time.perf_counter() - self.inicio_recogida
+        pasos = self.num_timesteps - self.pasos_inicio_recogida
+        self.tiempo_recogida += duracion
+        self.pasos_recogidos += pasos
+        self.logger.record("rendimiento/pasos_por_segundo", pasos / duracion if duracion > 0 else 0.0)
+
+    def _on_training_end(self):
+        total = time.perf_counter() - self.inicio
+        recogida = self.pasos_recogidos / self.tiempo_recogida if self.tiempo_recogida > 0 else 0.0
+        print(f"{self.num_timesteps} pasos de entorno en {total:.1f} s: {self.num_timesteps / total:,.0f} pasos/s "
+              f"en total, {recogida:,.0f} pasos/s durante la recogida de experiencia")
+
+def obtener_predictor():
+    """
+    Usa el predictor del bundle de artefactos si existe; si no, lo entrena aquí.
+    En ambos casos devuelve un PredictorNumPy, que se puede enviar a otros procesos.
+    """
+    bundle = cargar_bundle()
+    if bundle is not None:
+        return bundle.cargar_predictor()
+    # Se entrena en un directorio temporal: no se deja ningún modelo en el directorio de trabajo
+    with tempfile.TemporaryDirectory(prefix="agente_rl_") as directorio:
+        demand_predictor = entrenar_predictor(directorio, "datos_simulacion.csv", epochs=100)
+        return PredictorNumPy.cargar(demand_predictor.exportar_numpy())
+
+def crear_llegadas(args, semilla):
+    if args.csv_llegadas:
+        return llegadas_desde_csv(args.csv_llegadas)
+    return llegadas_poisson(args.tasa_llegadas, semilla)
+
+def crear_entorno(args, demand_predictor):
+    """Crea un entorno de entrenamiento: simulado (reloj virtual) o real (tiempo de pared)."""
+    if args.entorno == "real":
+        # Cada copia del entorno tiene su propio AsignadorRecursos
+        asignador_recursos = AsignadorRecursos(NUM_SERVIDORES_INICIAL, demand_predictor,
+                                               tamano_reserva=args.reserva, num_servidores_max=args.servidores_max)
+        return EntornoBalanceo(asignador_recursos, modo_observacion=args.observacion)
+
+    # Cada copia recibe su propia semilla en reset, y con ella su propia secuencia de llegadas.
+    # Como en producción, la política es el único controlador del escalado: sin umbrales por llegada
+    return EntornoSimulado(partial(crear_llegadas, args), NUM_SERVIDORES_INICIAL, args.servidores_max,
+                           demand_predictor, max_pasos=args.pasos_episodio, modo_observacion=args.observacion,
+                           escalado_por_umbral=False, tamano_reserva=args.reserva)
+
+def crear_entornos(args, demand_predictor):
+    """
+    Crea las `--num-envs` copias del entorno de entrenamiento:
+      - 'procesos': una copia por proceso (SubprocVecEnv), para usar todos los núcleos.
+      - 'secuencial': todas en este proceso (DummyVecEnv).
+      - 'numpy': EntornoVectorizado, que avanza todas las simulaciones con operaciones de arrays.
+    """
+    if args.vectorizacion == "numpy":
+        if args.entorno != "simulado" or args.csv_llegadas:
+            raise ValueError("La vectorización 'numpy' solo admite el entorno simulado con llegadas de Poisson")
+        from entorno_vectorizado import EntornoVectorizado
+
+        if args.reserva:
+            print(f"Advertencia: EntornoVectorizado no modela la reserva de servidores; se ignora --reserva {args.reserva}")
+        entornos = EntornoVectorizado(args.num_envs, args.tasa_llegadas, NUM_SERVIDORES_INICIAL,
+                                      args.servidores_max, demand_predictor, max_pasos=args.pasos_episodio,
+                                      escalado_por_umbral=False, modo_observacion=args.observacion)
+        entornos.seed(args.semilla)
+        return VecMonitor(entornos)
+
+    clase = SubprocVecEnv if args.vectorizacion == "procesos" and args.num_envs > 1 else DummyVecEnv
+    return make_vec_env(partial(crear_entorno, args, demand_predictor), n_envs=args.num_envs,
+                        seed=args.semilla, vec_env_cls=clase)
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena el agente PPO de escalado.")
+    parser.add_argument("--entorno", choices=["simulado", "real"], default="simulado",
+                        help="'simulado' usa el simulador de eventos discretos; 'real' el asignador con hilos")
+    parser.add_argument("--num-envs", type=int, default=1, help="Copias del entorno que se entrenan en paralelo")
+    parser.add_argument("--vectorizacion", choices=["procesos", "secuencial", "numpy"], default="procesos",
+                        help="Cómo se ejecutan las copias del entorno")
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--servidores-max", type=int, default=NUM_SERVIDORES_MAX)
+    parser.add_argument("--observacion", choices=["servidores", "agregada"], default="servidores",
+                        help="'agregada' resume la flota en un vector de tamaño fijo: la política sirve para cualquier número de servidores")
+    parser.add_argument("--reserva", type=int, default=TAMANO_RESERVA,
+                        help="Servidores arrancados en espera (como TAMANO_RESERVA en app.py)")
+    parser.add_argument("--timesteps", type=int, default=1000)
+    parser.add_argument("--tasa-llegadas", type=float, default=2.0, help="Solicitudes/s de las llegadas sintéticas")
+    parser.add_argument("--csv-llegadas", default=None, help="Reproducir las llegadas grabadas en este CSV")
+    parser.add_argument("--pasos-episodio", type=int, default=1000, help="Pasos por episodio en el entorno simulado")
+    parser.add_argument("--salida", default="modelo_ppo_balanceo")
+    args = parser.parse_args()
+
+    demand_predictor = obtener_predictor()
+
+    # Crear las copias del entorno de RL
+    entornos = crear_entornos(args, demand_predictor)
+
+    # Crear el agente PPO
+    modelo = PPO("MlpPolicy", entornos, verbose=1, seed=args.semilla)
+
+    # Entrenar el agente
+    modelo.learn(total_timesteps=args.timesteps, callback=CallbackPasosPorSegundo())  # Ajusta el número de pasos de entrenamiento
+    entornos.close()
+
+    # Guardar el modelo entrenado (opcional)
+    modelo.save(args.salida)
+
+    print("Entrenamiento completado. Modelo guardado.")
+
+if __name__ == "__main__":
+    main()
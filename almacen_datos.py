@@ -0,0 +1,137 @@
+import io
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+TAMANO_BLOQUE_LECTURA = 1 << 20  # Bytes por lectura al buscar las últimas filas desde el final
+
+class AlmacenDatos:
+    """
+    Últimas filas de un CSV al que otros procesos van añadiendo filas (como
+    datos_simulacion.csv), leídas de forma incremental.
+
+    Recuerda hasta qué byte ha leído y en cada refresco solo analiza las filas
+    completas añadidas desde entonces; una última línea a medio escribir se deja
+    para el siguiente. Se guardan como mucho `max_filas` filas: al arrancar, o si
+    se han añadido más filas de las que caben, se busca hacia atrás desde el final
+    dónde empiezan las `max_filas` últimas y el resto ni se lee. Si el archivo
+    se trunca o se reemplaza, se vuelve a cargar desde cero.
+
+    `obtener` refresca como mucho una vez cada `vigencia` segundos, así que todas
+    las llamadas de un mismo intervalo (p. ej. los callbacks del dashboard)
+    comparten el mismo refresco. Supone, como escribe csv.writer con estos datos,
+    que ningún campo contiene saltos de línea.
+    """
+
+    def __init__(self, ruta, max_filas=200_000, columnas=None, vigencia=1.0):
+        self.ruta = ruta
+        self.max_filas = max_filas
+        self.columnas = columnas  # None: todas
+        self.vigencia = vigencia
+        self._lock = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.df = pd.DataFrame()
+        self._cabecera = None
+        self._inicio_datos = 0  # Byte donde empiezan las filas, tras la cabecera
+        self._desplazamiento = 0  # Byte hasta el que se ha leído
+        self._inodo = None
+        self._ultimo_refresco = float("-inf")
+        self.filas_leidas = 0
+
+    def obtener(self):
+        """Las filas guardadas, refrescadas si han pasado `vigencia` segundos desde el último refresco."""
+        with self._lock:
+            if time.monotonic() - self._ultimo_refresco >= self.vigencia:
+                try:
+                    self.refrescar()
+                except Exception as e:
+                    print(f"Error al leer '{self.ruta}': {e}")
+                self._ultimo_refresco = time.monotonic()
+            return self.df
+
+    def refrescar(self):
+        """Lee las filas completas añadidas desde el último refresco. Devuelve cuántas."""
+        try:
+            estado = os.stat(self.ruta)
+        except FileNotFoundError:
+            self._reiniciar()
+            return 0
+        if estado.st_ino != self._inodo or estado.st_size < self._desplazamiento:
+            self._reiniciar()
+            self._inodo = estado.st_ino
+        if estado.st_size == self._desplazamiento:
+            return 0
+
+        with open(self.ruta, "rb") as archivo:
+            if self._cabecera is None and not self._leer_cabecera(archivo):
+                return 0
+            inicio = self._inicio_ultimas_filas(archivo, max(self._desplazamiento, self._inicio_datos), estado.st_size)
+            archivo.seek(inicio)
+            bloque = archivo.read(estado.st_size - inicio)
+
+        fin_ultima_linea = bloque.rfind(b"\n") + 1
+        if fin_ultima_linea == 0:
+            return 0
+        self._desplazamiento = inicio + fin_ultima_linea
+        nuevas = self._analizar(bloque[:fin_ultima_linea])
+        self.filas_leidas += len(nuevas)
+        if len(nuevas) >= self.max_filas or self.df.empty:
+            self.df = nuevas.iloc[-self.max_filas:].reset_index(drop=True)
+        elif len(nuevas):
+            df = pd.concat([self.df, nuevas], ignore_index=True)
+            self.df = df.iloc[-self.max_filas:].reset_index(drop=True) if len(df) > self.max_filas else df
+        return len(nuevas)
+
+    def _leer_cabecera(self, archivo):
+        linea = archivo.readline()
+        if not linea.endswith(b"\n"):
+            return False  # Cabecera aún incompleta
+        self._cabecera = linea.decode("utf-8").strip().split(",")
+        self._usecols = None if self.columnas is None else [c for c in self.columnas if c in self._cabecera]
+        self._inicio_datos = self._desplazamiento = len(linea)
+        return True
+
+    def _inicio_ultimas_filas(self, archivo, desde, hasta):
+        """
+        Byte donde empiezan las `max_filas` últimas filas completas entre `desde` y
+        `hasta`, contando saltos de línea hacia atrás por bloques; `desde` si hay menos.
+        """
+        if hasta - desde <= TAMANO_BLOQUE_LECTURA:
+            return desde
+        saltos = 0
+        posicion = hasta
+        while posicion > desde:
+            inicio_bloque = max(desde, posicion - TAMANO_BLOQUE_LECTURA)
+            archivo.seek(inicio_bloque)
+            bloque = archivo.read(posicion - inicio_bloque)
+            saltos_bloque = np.flatnonzero(np.frombuffer(bloque, dtype=np.uint8) == ord("\n"))
+            # Hacen falta max_filas + 1 saltos: el de la fila anterior a la primera que se guarda
+            faltan = self.max_filas + 1 - saltos
+            if len(saltos_bloque) >= faltan:
+                return inicio_bloque + int(saltos_bloque[-faltan]) + 1
+            saltos += len(saltos_bloque)
+            posicion = inicio_bloque
+        return desde
+
+    def _analizar(self, datos):
+        """Filas nuevas ya limpias, con los mismos criterios que seguía dashboard.obtener_datos."""
+        try:
+            df = pd.read_csv(io.BytesIO(datos), header=None, names=self._cabecera, usecols=self._usecols)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame(columns=self._usecols or self._cabecera)
+        # Eliminar filas con valores NaN o infinitos
+        df = df.replace([np.inf, -np.inf], np.nan).dropna()
+        if 'tiempo_inicio' in df.columns:
+            df['tiempo_inicio'] = pd.to_datetime(df['tiempo_inicio'], format="%Y-%m-%d %H:%M:%S", errors='coerce')
+        else:
+            df['tiempo_inicio'] = pd.Timestamp.now()
+        if 'tiempo_respuesta' in df.columns:
+            df['tiempo_respuesta'] = pd.to_numeric(df['tiempo_respuesta'], errors='coerce').fillna(0.0)
+        else:
+            df['tiempo_respuesta'] = 0.0
+        return df
@@ -1,17 +1,66 @@
+import unicodedata
+
+# Palabras clave de cada tipo de solicitud, de mayor a menor prioridad: si un texto
+# contiene palabras de varios tipos, gana el que aparece antes en la tabla
+REGLAS_TIPO = [
+    ("codigo", ["código", "ejecutar"]),
+    ("compleja", ["análisis", "predicción"])
+]
+TIPO_POR_DEFECTO = "simple"
+
+def quitar_acentos(texto):
+    """Quita tildes, diéresis y demás marcas diacríticas (á -> a, ñ -> n, ç -> c) de cualquier letra."""
+    descompuesto = unicodedata.normalize("NFD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
 class AnalizadorSolicitudes:
+    """
+    Clasifica las solicitudes con una tabla de reglas palabra clave -> tipo.
+
+    El texto se normaliza una sola vez (minúsculas, forma Unicode NFC y,
+    opcionalmente, sin acentos) y las palabras clave de cada tipo se buscan en
+    orden de prioridad, parando en la primera que aparezca. La búsqueda de
+    subcadenas de Python (en C) es más rápida con estos textos cortos que una
+    expresión regular combinada.
+    """
+
+    def __init__(self, reglas=REGLAS_TIPO, insensible_acentos=False, tipo_por_defecto=TIPO_POR_DEFECTO):
+        self.insensible_acentos = insensible_acentos
+        self.tipo_por_defecto = tipo_por_defecto
+        self.reglas = reglas
+        # (palabra normalizada, tipo) de todas las reglas, en orden de prioridad
+        self._palabras = tuple(dict.fromkeys((self.normalizar(palabra), tipo)
+                                             for tipo, palabras in reglas for palabra in palabras))
+
+    def normalizar(self, texto):
+        """Texto en minúsculas y, si no es ASCII, sin acentos o al menos en NFC (á compuesta, no a + tilde)."""
+        texto = texto.lower()
+        if not texto.isascii():
+            texto = quitar_acentos(texto) if self.insensible_acentos else unicodedata.normalize("NFC", texto)
+        return texto
+
+    def clasificar(self, texto_solicitud):
+        """Tipo de la solicitud según la regla de mayor prioridad que encaje."""
+        texto = self.normalizar(texto_solicitud)
+        for palabra, tipo in self._palabras:
+            if palabra in texto:
+                return tipo
+        return self.tipo_por_defecto
+
     def analizar(self, texto_solicitud):
         """
         Analiza la solicitud y extrae características básicas.
         """
-        longitud = len(texto_solicitud)
-        tipo = "simple"  # Valor por defecto
-
-        if "código" in texto_solicitud.lower() or "ejecutar" in texto_solicitud.lower():
-            tipo = "codigo"
-        elif "análisis" in texto_solicitud.lower() or "predicción" in texto_solicitud.lower():
-            tipo = "compleja"
-
         return {
-            "longitud": longitud,
-            "tipo": tipo
-        }
\ No newline at end of file
+            "longitud": len(texto_solicitud),
+            "tipo": self.clasificar(texto_solicitud)
+        }
+
+    def analizar_batch(self, textos):
+        """
+        Analiza una lista de solicitudes; devuelve sus características en el mismo
+        orden. Los textos repetidos dentro del lote se clasifican una sola vez.
+        """
+        clasificar = self.clasificar
+        tipos = {texto: clasificar(texto) for texto in dict.fromkeys(textos)}
+        return [{"longitud": len(texto), "tipo": tipos[texto]} for texto in textos]
@@ -0,0 +1,86 @@
+import argparse
+from collections import defaultdict
+
+import numpy as np
+
+from trazas import id_traza_de, leer_tramos
+
+def duracion_ms(tramo):
+    return (int(tramo["endTimeUnixNano"]) - int(tramo["startTimeUnixNano"])) / 1e6
+
+def agrupar_trazas(tramos):
+    """{id de traza: [tramos]} a partir de los tramos leídos del archivo."""
+    trazas = defaultdict(list)
+    for tramo in tramos:
+        trazas[tramo["traceId"]].append(tramo)
+    return trazas
+
+def latencia_por_etapa(trazas):
+    """{etapa: array de duraciones en ms}; las etapas son los nombres de los tramos."""
+    duraciones = defaultdict(list)
+    for tramos in trazas.values():
+        for tramo in tramos:
+            duraciones[tramo["name"]].append(duracion_ms(tramo))
+    return {etapa: np.array(valores) for etapa, valores in duraciones.items()}
+
+def duracion_total_ms(tramos):
+    """Del primer inicio al último fin de la traza: incluye la espera en cola y el procesamiento."""
+    inicio = min(int(t["startTimeUnixNano"]) for t in tramos)
+    fin = max(int(t["endTimeUnixNano"]) for t in tramos)
+    return (fin - inicio) / 1e6
+
+def imprimir_etapas(duraciones):
+    print(f"{'etapa':<22}{'tramos':>8}{'media':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'máx':>10}   (ms)")
+    for etapa, valores in sorted(duraciones.items(), key=lambda e: -e[1].mean()):
+        p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+        print(f"{etapa:<22}{len(valores):>8}{valores.mean():>10.3f}{p50:>10.3f}{p95:>10.3f}{p99:>10.3f}"
+              f"{valores.max():>10.3f}")
+
+def imprimir_mas_lentas(trazas, cantidad):
+    lentas = sorted(trazas.items(), key=lambda t: -duracion_total_ms(t[1]))[:cantidad]
+    print(f"\nLas {len(lentas)} trazas más lentas (de la entrada al final del procesamiento):")
+    for id_traza, tramos in lentas:
+        raiz = next((t for t in tramos if "parentSpanId" not in t), None)
+        nombre = raiz["name"] if raiz else "?"
+        print(f"{id_traza}  {nombre}  {duracion_total_ms(tramos):.3f} ms")
+        etapas = defaultdict(float)
+        for tramo in tramos:
+            if tramo is not raiz:
+                etapas[tramo["name"]] += duracion_ms(tramo)
+        print("    " + ", ".join(f"{etapa} {ms:.3f}" for etapa, ms in sorted(etapas.items(), key=lambda e: -e[1])))
+
+def trazas_de_solicitud(trazas, id_solicitud):
+    """
+    La traza de `id_solicitud`: la de /solicitud (id derivado con id_traza_de) o
+    la del lote de /solicitudes cuyo tramo raíz la incluye en `ids_solicitud`.
+    """
+    id_traza = id_traza_de(id_solicitud)
+    if id_traza in trazas:
+        return {id_traza: trazas[id_traza]}
+    for id_traza, tramos in trazas.items():
+        for tramo in tramos:
+            for atributo in tramo.get("attributes", ()):
+                valores = atributo["value"].get("arrayValue", {}).get("values", ())
+                if atributo["key"] == "ids_solicitud" and {"stringValue": id_solicitud} in valores:
+                    return {id_traza: tramos}
+    return {}
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia por etapa y trazas más lentas de un archivo de trazas.")
+    parser.add_argument("ruta", nargs="?", default="trazas.jsonl", help="Archivo OTLP/JSON Lines (ver trazas.py)")
+    parser.add_argument("--lentas", type=int, default=10, help="Número de trazas más lentas que se muestran")
+    parser.add_argument("--solicitud", help="Mostrar solo la traza de este id de solicitud (X-Request-Id o id de /solicitudes)")
+    args = parser.parse_args()
+
+    trazas = agrupar_trazas(leer_tramos(args.ruta))
+    if args.solicitud:
+        trazas = trazas_de_solicitud(trazas, args.solicitud)
+    if not trazas:
+        print(f"No hay trazas en '{args.ruta}'.")
+        return
+    print(f"{len(trazas)} trazas en '{args.ruta}'\n")
+    imprimir_etapas(latencia_por_etapa(trazas))
+    imprimir_mas_lentas(trazas, args.lentas)
+
+if __name__ == "__main__":
+    main()
@@ -1,220 +1,132 @@
-from flask import Flask, request, jsonify
-from gestor_usuarios import GestorUsuarios
-from analizador_solicitudes import AnalizadorSolicitudes
-from asignador_recursos import AsignadorRecursos, DemandPredictor, ServidorSimulado
-import numpy as np
-import pandas as pd
+from flask import Flask, Response, request, jsonify, stream_with_context
+from gestor_usuarios import PERFILES, GestorUsuarios
+from analizador_solicitudes import REGLAS_TIPO, TIPO_POR_DEFECTO, AnalizadorSolicitudes
+from asignador_recursos import AsignadorRecursos, ServidorSimulado
+from autoescalador import Autoescalador
+from inferencia_lotes import PredictorPorLotes
+from artefactos import DIRECTORIO_ARTEFACTOS, cargar_bundle, clave_politica
+from entorno_rl import EntornoBalanceo
+from registro_eventos import muestreo_desde_texto, nivel_desde_texto, registro
+from metricas import histograma_etapa, metricas
+from trazas import nuevo_id_solicitud, trazador
+from instantaneas import HistorialInstantaneas
+from rollups import AlmacenRollups
+import atexit
 import time
-import json
-import gymnasium as gym
-from gymnasium import spaces
-from stable_baselines3 import PPO
-import queue
-from tensorflow import keras
-from sklearn.model_selection import train_test_split
+import threading
 import os
+import json
+from itertools import islice
 
 app = Flask(__name__)
 
 # --- CONFIGURACIÓN INICIAL ---
-training_data_predefined = [
-    ({"longitud": 10, "tipo": "simple"}, 1),
-    ({"longitud": 25, "tipo": "compleja"}, 3),
-    ({"longitud": 15, "tipo": "codigo"}, 5),
-    ({"longitud": 12, "tipo": "simple"}, 1),
-    ({"longitud": 30, "tipo": "compleja"}, 4),
-    ({"longitud": 20, "tipo": "codigo"}, 6)
-]
 # Hiperparámetros del modelo y del entorno
 NUM_SERVIDORES_INICIAL = 1
-NUM_SERVIDORES_MAX = 5
+NUM_SERVIDORES_MAX = int(os.environ.get("NUM_SERVIDORES_MAX", 5))
 UMBRAL_ESCALADO_SUPERIOR = 5
 UMBRAL_ESCALADO_INFERIOR = 1
 INTERVALO_IMPRESION = 10
+INTERVALO_AUTOESCALADO = float(os.environ.get("INTERVALO_AUTOESCALADO", 1.0))  # Segundos entre decisiones de escalado
+# .npy donde se guardan las últimas observaciones del autoescalador al salir y en POST /estados_autoescalado
+RUTA_ESTADOS_AUTOESCALADO = os.environ.get("RUTA_ESTADOS_AUTOESCALADO")
+VENTANA_LOTES = float(os.environ.get("VENTANA_LOTES", 0.005))  # Segundos que se esperan para agrupar predicciones
+TAMANO_MAX_LOTE = int(os.environ.get("TAMANO_MAX_LOTE", 64))
+DIRECTORIO_BUNDLE = os.environ.get("DIRECTORIO_ARTEFACTOS", DIRECTORIO_ARTEFACTOS)
+VERSION_BUNDLE = os.environ.get("VERSION_ARTEFACTOS")  # Por defecto, la versión marcada como actual
+ESTRATEGIA_SELECCION = os.environ.get("ESTRATEGIA_SELECCION", "menor_carga")  # Ver estrategias_seleccion.ESTRATEGIAS
+TAMANO_RESERVA = int(os.environ.get("TAMANO_RESERVA", 1))  # Servidores arrancados en espera para escalar al instante
+# 'servidores' (carga de cada servidor, hasta NUM_SERVIDORES_MAX) o 'agregada' (resumen de la flota);
+# debe coincidir con el modo con el que se entrenó la política
+MODO_OBSERVACION = os.environ.get("MODO_OBSERVACION", "servidores")
+TAMANO_LOTE_SOLICITUDES = int(os.environ.get("TAMANO_LOTE_SOLICITUDES", 256))  # Elementos por lote en /solicitudes
+# Registro de eventos de las solicitudes: nivel mínimo (DEBUG, INFO, ADVERTENCIA, ERROR o NINGUNO)
+# y fracción que se escribe de cada nivel, p. ej. "INFO=0.1,DEBUG=0.01"
+NIVEL_REGISTRO = nivel_desde_texto(os.environ.get("NIVEL_REGISTRO", "INFO"))
+MUESTREO_REGISTRO = muestreo_desde_texto(os.environ.get("MUESTREO_REGISTRO", ""))
+# Trazas de las solicitudes (OTLP/JSON Lines, ver trazas.py): archivo y fracción de solicitudes trazadas
+RUTA_TRAZAS = os.environ.get("RUTA_TRAZAS", "trazas.jsonl")
+MUESTREO_TRAZAS = float(os.environ.get("MUESTREO_TRAZAS", 0.01))
+# Instantáneas del estado del balanceador para el dashboard: segundos entre capturas y cuántas se guardan
+INTERVALO_INSTANTANEAS = float(os.environ.get("INTERVALO_INSTANTANEAS", 0.1))
+CAPACIDAD_INSTANTANEAS = int(os.environ.get("CAPACIDAD_INSTANTANEAS", 3000))
+ESPERA_MAX_INSTANTANEAS = 30.0  # Segundos como mucho que espera una petición de long-polling
+
+registro.configurar(NIVEL_REGISTRO, MUESTREO_REGISTRO)
+trazador.configurar(RUTA_TRAZAS, MUESTREO_TRAZAS)
+
+# --- CARGA DE ARTEFACTOS ---
+
+# Servir desde el bundle de artefactos ya entrenados (ver entrenar.py): no se entrena al importar
+bundle = cargar_bundle(DIRECTORIO_BUNDLE, VERSION_BUNDLE)
+if bundle is None:
+    print(f"No se encontró ningún bundle en '{DIRECTORIO_BUNDLE}'. Ejecuta `python entrenar.py` para publicarlo; "
+          "mientras tanto se entrena uno ahora (arranque lento).")
+    from entrenar import entrenar_y_guardar
+    bundle = entrenar_y_guardar(directorio=DIRECTORIO_BUNDLE, version=VERSION_BUNDLE)
+print(f"Sirviendo la versión {bundle.version} de los artefactos.")
+
+# Servir las predicciones con la red exportada a NumPy, sin pasar por Keras
+predictor_servicio = bundle.cargar_predictor()
+
+# Agrupar en lotes las predicciones de las solicitudes concurrentes
+predictor_lotes = PredictorPorLotes(predictor_servicio, ventana=VENTANA_LOTES, tamano_max_lote=TAMANO_MAX_LOTE)
 
-# --- CLASES DEL ENTORNO DE RL (DENTRO DE APP.PY) ---
-
-class EntornoBalanceo(gym.Env):
-    def __init__(self, asignador_recursos):
-        super(EntornoBalanceo, self).__init__()
-        self.asignador_recursos = asignador_recursos
-        self.action_space = spaces.Discrete(3)  # 0: No hacer nada, 1: Crear servidor, 2: Eliminar servidor
-        self.observation_space = spaces.Box(low=0, high=100, shape=(NUM_SERVIDORES_MAX + 1,), dtype=np.float32)
-    
-    def reset(self, seed=None):
-        super().reset(seed=seed)
-        # Reiniciar el entorno a un estado inicial
-        for servidor in self.asignador_recursos.servidores:
-            servidor.carga = 0
-        self.asignador_recursos.cola_solicitudes.queue.clear()
-
-        # Devolver el estado inicial
-        return self._get_estado(), {}
-
-    def step(self, accion):
-        # Ejecutar la acción en el entorno
-        if accion == 1:
-            self.asignador_recursos.crear_servidor()
-        elif accion == 2:
-            self.asignador_recursos.eliminar_servidor()
-
-        # Esperar un tiempo para que la acción tenga efecto y se procesen solicitudes
-        time.sleep(1)  # Ajusta el tiempo según sea necesario
-
-        # Calcular la recompensa (esto es solo un ejemplo)
-        carga_promedio = sum(s.carga for s in self.asignador_recursos.servidores) / len(self.asignador_recursos.servidores) if len(self.asignador_recursos.servidores) > 0 else 0
-        longitud_cola = self.asignador_recursos.cola_solicitudes.qsize()
-        recompensa = -carga_promedio - longitud_cola * 0.5  # Penalizar carga alta y cola larga
-
-        # Obtener el nuevo estado
-        estado = self._get_estado()
-
-        # Comprobar si el episodio ha terminado (puedes definir un criterio de finalización)
-        terminado = False  # En este ejemplo, el episodio nunca termina
-        truncado = False
-        # Información adicional (opcional)
-        info = {}
-
-        return estado, recompensa, terminado, truncado, info
-
-    def _get_estado(self):
-        # Obtener el estado actual del sistema
-        carga_servidores = [s.carga for s in self.asignador_recursos.servidores]
-        longitud_cola = self.asignador_recursos.cola_solicitudes.qsize()
-
-        # Asegurarse de que el estado tenga siempre la misma longitud
-        while len(carga_servidores) < NUM_SERVIDORES_MAX:
-            carga_servidores.append(0.0)  # Rellenar con ceros si hay menos servidores que el máximo
-
-        estado = np.array(carga_servidores + [longitud_cola], dtype=np.float32)
-        return estado
-
-# --- CARGA Y ENTRENAMIENTO DEL MODELO DE RL ---
-
-# Instanciar el predictor de demanda
-demand_predictor = DemandPredictor()
-
-# Cargar datos de entrenamiento desde el CSV
-def cargar_datos_entrenamiento(ruta_csv):
-    """
-    Carga los datos de entrenamiento desde un archivo CSV.
-
-    Args:
-        ruta_csv (str): La ruta al archivo CSV.
-
-    Returns:
-        tuple: Una tupla que contiene dos arrays de NumPy:
-               - X: Las características de entrenamiento.
-               - y: Las etiquetas de entrenamiento (demanda).
-    """
-    try:
-        df = pd.read_csv(ruta_csv)
-
-        # Asegurarse de que las columnas necesarias existen
-        if 'caracteristicas' not in df.columns or 'demanda_predicha' not in df.columns:
-            raise ValueError("El archivo CSV debe contener las columnas 'caracteristicas' y 'demanda_predicha'")
-
-        # Limpieza de datos: convertir la cadena JSON en la columna 'caracteristicas' a un diccionario
-        def limpiar_caracteristicas(x):
-            try:
-                # Asegurarse de que el valor sea una cadena antes de procesarlo
-                if isinstance(x, str):
-                    # Eliminar espacios en blanco y saltos de línea adicionales
-                    x = x.strip().replace('\n', '')
-                    # Reemplazar comillas simples por dobles para que sea un JSON válido
-                    x = x.replace("'", '"')
-                    # Convertir la cadena JSON a un diccionario
-                    return json.loads(x)
-                else:
-                    print(f"Advertencia: 'caracteristicas' no es una cadena: {x}")
-                    return {}  # Devolver un diccionario vacío en caso de error
-            except json.JSONDecodeError as e:
-                print(f"Error al decodificar JSON: {e}. Valor: {x}")
-                return {}  # Devolver un diccionario vacío en caso de error
-
-        # Aplicar la función de limpieza a la columna 'caracteristicas'
-        df['caracteristicas'] = df['caracteristicas'].apply(limpiar_caracteristicas)
-
-        # Extraer características y demanda
-        X = []
-        y = []
-        for _, row in df.iterrows():
-            caracteristicas = row['caracteristicas']
-            # Asegurarse de que las características se extraen correctamente
-            if not isinstance(caracteristicas, dict) or "longitud" not in caracteristicas or "tipo" not in caracteristicas:
-                print(f"Advertencia: Formato incorrecto en la fila: {row}")
-                continue
-
-            feature_vector = [
-                caracteristicas["longitud"],
-                1 if caracteristicas["tipo"] == "simple" else 0,
-                1 if caracteristicas["tipo"] == "compleja" else 0,
-                1 if caracteristicas["tipo"] == "codigo" else 0
-            ]
-            X.append(feature_vector)
-            y.append(row['demanda_predicha'])
+# Crear la instancia del asignador de recursos
+asignador_recursos = AsignadorRecursos(NUM_SERVIDORES_INICIAL, predictor_lotes, ESTRATEGIA_SELECCION,
+                                       tamano_reserva=TAMANO_RESERVA, num_servidores_max=NUM_SERVIDORES_MAX)
 
-        return np.array(X), np.array(y)
+# Agregados de espera y procesamiento por tipo y perfil en buckets de 1 s, 1 min y 1 h (ver /rollups)
+rollups = AlmacenRollups([tipo for tipo, _ in REGLAS_TIPO] + [TIPO_POR_DEFECTO], PERFILES)
+asignador_recursos.al_terminar_solicitud = lambda tipo, perfil, metricas_servidor: rollups.registrar(
+    tipo, perfil, metricas_servidor["tiempo_espera"], metricas_servidor["tiempo_procesamiento"])
 
-    except FileNotFoundError:
-        print(f"Error: No se encontró el archivo {ruta_csv}")
-        return None, None
-    except Exception as e:
-        print(f"Error al cargar los datos de entrenamiento: {e}")
-        return None, None
-
-# # Cargar datos de entrenamiento
-# X_train, y_train = cargar_datos_entrenamiento("datos_simulacion.csv")
-
-# if X_train is not None and y_train is not None:
-#     # Entrenar el modelo de predicción de demanda
-#     demand_predictor.train(X_train, y_train, epochs=100)
-
-#     # Crear la instancia del asignador de recursos
-#     asignador_recursos = AsignadorRecursos(NUM_SERVIDORES_INICIAL, demand_predictor)
-
-#     # Crear el entorno de RL
-#     entorno = EntornoBalanceo(asignador_recursos)
-
-#     # Cargar o crear el modelo de RL
-#     try:
-#         modelo_cargado = PPO.load("modelo_ppo_balanceo", env=entorno)
-#         print("Modelo de RL cargado.")
-#     except FileNotFoundError:
-#         print("No se encontró un modelo de RL guardado. Creando uno nuevo.")
-#         modelo_cargado = PPO("MlpPolicy", entorno, verbose=1)
-
-# else:
-#     print("No se pudieron cargar los datos de entrenamiento. Saliendo.")
-#     exit()
-
-# Cargar datos de entrenamiento
-X_train, y_train = None, None  # Inicializar como None
-if os.path.exists("datos_simulacion.csv"):
-    X_train, y_train = cargar_datos_entrenamiento("datos_simulacion.csv")
-
-if X_train is not None and y_train is not None:
-    # Entrenar el modelo de predicción de demanda
-    demand_predictor.train(X_train, y_train, epochs=100)
-else:
-    print("No se encontraron datos de entrenamiento en el CSV. Se usará un conjunto de datos predefinido.")
-    X_train = np.array([list(d[0].values()) for d in training_data_predefined])
-    y_train = np.array([d[1] for d in training_data_predefined])
-    demand_predictor.train(X_train, y_train, epochs=100)
-    
-# Crear la instancia del asignador de recursos
-asignador_recursos = AsignadorRecursos(NUM_SERVIDORES_INICIAL, demand_predictor)
+# Historial de instantáneas del estado, que se sirve en /instantaneas
+historial_instantaneas = HistorialInstantaneas(asignador_recursos.instantanea, intervalo=INTERVALO_INSTANTANEAS,
+                                               capacidad=CAPACIDAD_INSTANTANEAS)
+historial_instantaneas.iniciar()
 
 # Crear el entorno de RL
-entorno = EntornoBalanceo(asignador_recursos)
+entorno = EntornoBalanceo(asignador_recursos, modo_observacion=MODO_OBSERVACION)
+
+# La política del bundle solo sirve si se entrenó con la misma forma de observación que da el entorno
+# (en el modo 'servidores' depende de NUM_SERVIDORES_MAX); si no, se escala solo por umbrales
+politica_escalado = bundle.cargar_politica(MODO_OBSERVACION)
+ruta_politica_ppo = bundle.ruta_archivo(clave_politica("ppo", MODO_OBSERVACION))
+forma_politica = bundle.forma_politica(MODO_OBSERVACION)
+if forma_politica is not None and forma_politica != entorno.observation_space.shape:
+    print(f"Advertencia: la política de escalado del bundle espera observaciones de forma {forma_politica}, pero "
+          f"el entorno da {entorno.observation_space.shape} (MODO_OBSERVACION={MODO_OBSERVACION}, "
+          f"NUM_SERVIDORES_MAX={NUM_SERVIDORES_MAX}). Se escala solo por umbrales; usa MODO_OBSERVACION=agregada "
+          "para cualquier número de servidores.")
+    politica_escalado = ruta_politica_ppo = None
+
+# Lanzar el bucle de autoescalado en segundo plano (fuera de /solicitud). Es el único que escala:
+# con la política de RL si la hay y, mientras no, con los umbrales de carga del asignador
+autoescalador = Autoescalador(entorno, politica_escalado, intervalo=INTERVALO_AUTOESCALADO)
+autoescalador.iniciar()
+if RUTA_ESTADOS_AUTOESCALADO:
+    atexit.register(autoescalador.guardar_estados, RUTA_ESTADOS_AUTOESCALADO)
+
+def cargar_politica_escalado():
+    """Carga la política PPO del bundle (sin exportación a NumPy) y se la pasa al autoescalador."""
+    from stable_baselines3 import PPO  # Importar PyTorch es lento: se hace fuera del arranque
 
-# Cargar o crear el modelo de RL
-try:
-    modelo_cargado = PPO.load("modelo_ppo_balanceo", env=entorno)
+    try:
+        autoescalador.politica = PPO.load(ruta_politica_ppo, env=entorno)
+    except Exception as e:
+        print(f"No se pudo cargar el modelo de RL ({e}). Se escala solo por umbrales.")
+        return
     print("Modelo de RL cargado.")
-except FileNotFoundError:
-    print("No se encontró un modelo de RL guardado. Creando uno nuevo.")
-    modelo_cargado = PPO("MlpPolicy", entorno, verbose=1)
+
+if autoescalador.politica is not None:
+    # Política exportada a NumPy: decisiones en microsegundos y sin PyTorch en el proceso
+    print("Política de escalado cargada (NumPy).")
+elif ruta_politica_ppo is not None:
+    threading.Thread(target=cargar_politica_escalado, name="carga-politica", daemon=True).start()
+elif forma_politica is None:
+    print(f"El bundle no incluye una política de escalado para MODO_OBSERVACION={MODO_OBSERVACION}. "
+          "Se escala solo por umbrales.")
 
 # --- CONFIGURACIÓN DE LA APLICACIÓN FLASK ---
 
@@ -222,8 +134,46 @@ except FileNotFoundError:
 gestor_usuarios = GestorUsuarios()
 analizador_solicitudes = AnalizadorSolicitudes()
 
+# --- MÉTRICAS ---
+
+# Latencia de las etapas de /solicitud que ocurren aquí; el encolado, la decisión de
+# escalado, la espera en cola y el procesamiento se miden en asignador_recursos
+LATENCIA_ANALISIS = histograma_etapa("analisis")
+LATENCIA_PERFIL = histograma_etapa("perfil")
+LATENCIA_PREDICCION = histograma_etapa("prediccion")
+SOLICITUDES_INDIVIDUALES = metricas.contador("balanceador_solicitudes_total", "Solicitudes recibidas",
+                                             {"endpoint": "solicitud"})
+SOLICITUDES_LOTE = metricas.contador("balanceador_solicitudes_total", "Solicitudes recibidas",
+                                     {"endpoint": "solicitudes"})
+ERRORES_SOLICITUD = metricas.contador("balanceador_errores_total", "Solicitudes que terminaron con error interno")
+
+# Gauges del estado del asignador: se calculan al leer /metrics
+metricas.medidor("balanceador_cola_longitud", "Solicitudes en cola de espera",
+                 lambda: asignador_recursos.cola_solicitudes.qsize())
+metricas.medidor("balanceador_servidores", "Servidores en la flota (incluidos los que arrancan)",
+                 lambda: len(asignador_recursos.servidores))
+metricas.medidor("balanceador_servidores_arrancando", "Servidores de la flota que aún arrancan",
+                 lambda: sum(1 for s in list(asignador_recursos.servidores) if s.arrancando))
+metricas.medidor("balanceador_servidores_reserva", "Servidores listos en la reserva",
+                 lambda: len(asignador_recursos.reserva))
+metricas.medidor("balanceador_servidor_carga", "Carga actual de cada servidor (segundos de trabajo en curso)",
+                 lambda: [({"servidor": s.id}, s.carga) for s in list(asignador_recursos.servidores)])
+metricas.medidor("balanceador_servidor_pendientes", "Solicitudes entregadas a cada servidor",
+                 lambda: [({"servidor": s.id}, s.pendientes) for s in list(asignador_recursos.servidores)])
+metricas.medidor("balanceador_escalado_politica", "1 si decide el escalado la política de RL; 0 si solo los umbrales",
+                 lambda: int(autoescalador.politica is not None))
+metricas.medidor("balanceador_decisiones_escalado_total", "Decisiones tomadas por la política de escalado",
+                 lambda: autoescalador.num_decisiones, tipo="counter")
+metricas.medidor("balanceador_escalados_total", "Servidores añadidos por el escalado",
+                 lambda: asignador_recursos.num_escalados, tipo="counter")
+
 # --- RUTAS DE LA API ---
 
+@app.route('/metrics')
+def get_metrics():
+    """Métricas en el formato de texto de Prometheus."""
+    return Response(metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/num_servidores')
 def get_num_servidores():
     global asignador_recursos
@@ -232,73 +182,63 @@ def get_num_servidores():
 
 @app.route('/solicitud', methods=['POST'])
 def procesar_solicitud():
-    global modelo_cargado
     """
     Recibe una solicitud de usuario, la analiza, asigna un perfil y la enruta a un servidor.
+    Cada solicitud recibe un id (el de la cabecera X-Request-Id, si viene) que se
+    devuelve en la respuesta. Si la solicitud se traza, el id de su traza es
+    trazas.id_traza_de(id_solicitud) (el mismo id si ya tiene 32 caracteres
+    hexadecimales) y el tramo raíz lleva el atributo `id_solicitud`.
     """
+    id_solicitud = request.headers.get('X-Request-Id') or nuevo_id_solicitud()
+    traza = trazador.iniciar("POST /solicitud", id_solicitud)
     try:
         data = request.get_json()
 
         # Validar la entrada
         if not data or 'user_id' not in data or 'texto' not in data:
-            return jsonify({'error': 'Datos de solicitud no válidos'}), 400
+            if traza is not None:
+                traza.terminar(error='Datos de solicitud no válidos', id_solicitud=id_solicitud)
+            return jsonify({'error': 'Datos de solicitud no válidos', 'id_solicitud': id_solicitud}), 400
 
         user_id = data['user_id']
         texto_solicitud = data['texto']
 
+        SOLICITUDES_INDIVIDUALES.incrementar()
+        t0 = time.perf_counter()
+
         # Analizar la solicitud
         caracteristicas = analizador_solicitudes.analizar(texto_solicitud)
+        t1 = time.perf_counter()
+        LATENCIA_ANALISIS.observar(t1 - t0)
 
         # Registrar la solicitud en el historial del usuario
         gestor_usuarios.registrar_solicitud(user_id, caracteristicas)
 
         # Obtener el perfil del usuario
         perfil = gestor_usuarios.obtener_perfil(user_id)
+        t2 = time.perf_counter()
+        LATENCIA_PERFIL.observar(t2 - t1)
 
-        # Registrar el tiempo de inicio
-        inicio = time.time()
-        
         # Obtener el timestamp de llegada o usar el tiempo actual si no se proporciona
         timestamp_llegada = data.get('timestamp', time.time())
 
-        # Obtener el estado actual del sistema para el agente de RL
-        estado = entorno._get_estado()
-
-        # Obtener la acción del modelo de RL
-        accion, _ = modelo_cargado.predict(estado)
-
-        # Ejecutar la acción en el entorno (escalado)
-        nuevo_estado, recompensa, terminado, truncado, info = entorno.step(accion)
+        # El escalado (por política de RL o por umbrales) lo decide el autoescalador en segundo plano
 
-        # Asignar la solicitud a un servidor (usando la lógica de AsignadorRecursos)
-        servidor_id = asignador_recursos.asignar(user_id, caracteristicas)
+        # Obtener la predicción de la demanda (se agrupa en lotes con las solicitudes concurrentes)
+        demanda_predicha = predictor_lotes.predict(caracteristicas)
+        t3 = time.perf_counter()
+        LATENCIA_PREDICCION.observar(t3 - t2)
+        if traza is not None:
+            traza.tramo("analisis", t0, t1, tipo=caracteristicas['tipo'])
+            traza.tramo("perfil", t1, t2, perfil=perfil)
+            traza.tramo("prediccion", t2, t3, demanda_predicha=float(demanda_predicha))
 
-        # Registrar el tiempo de finalización
-        fin = time.time()
+        # Asignar la solicitud a un servidor (vuelve en cuanto queda encolada); con la
+        # traza, el asignador y el servidor registran el resto de etapas
+        futuro = asignador_recursos.asignar(user_id, caracteristicas, demanda_predicha, traza, perfil)
 
-        # Calcular el tiempo de asignación
-        tiempo_asignacion = fin - inicio
-
-        # Obtener la predicción de la demanda
-        demanda_predicha = demand_predictor.predict(caracteristicas)
-
-        # Actualizar el perfil del usuario basado en su historial
-        gestor_usuarios.actualizar_perfil(user_id)
-
-        # Registrar el tiempo de inicio
-        inicio = time.time()
-
-        # Obtener la predicción de la demanda
-        demanda_predicha = demand_predictor.predict(caracteristicas)
-
-        # Asignar la solicitud a un servidor
-        servidor_id = asignador_recursos.asignar(user_id, caracteristicas)
-
-        # Registrar el tiempo de finalización
-        fin = time.time()
-
-        # Calcular el tiempo de asignación
-        tiempo_asignacion = fin - inicio
+        # Tiempo de asignación: predicción más encolado
+        tiempo_asignacion = time.perf_counter() - t2
 
         # Actualizar el perfil del usuario basado en su historial
         gestor_usuarios.actualizar_perfil(user_id)
@@ -309,11 +249,16 @@ def procesar_solicitud():
             'demanda_predicha': float(demanda_predicha)  # Convertir a float
         }
 
+        if traza is not None:
+            traza.terminar(id_solicitud=id_solicitud, user_id=str(user_id), ticket=futuro.ticket)
+
         return jsonify({
             'mensaje': 'Solicitud procesada correctamente',
+            'id_solicitud': id_solicitud,
             'user_id': user_id,
             'perfil': perfil,
-            'servidor_asignado': servidor_id,
+            'servidor_asignado': 'encolada',
+            'ticket': futuro.ticket,
             'caracteristicas': caracteristicas_para_respuesta,
             'tiempo_asignacion': tiempo_asignacion,
             'demanda_predicha': float(demanda_predicha),
@@ -321,18 +266,284 @@ def procesar_solicitud():
         }), 200
 
     except Exception as e:
+        ERRORES_SOLICITUD.incrementar()
+        if traza is not None:
+            traza.terminar(error=e, id_solicitud=id_solicitud)
         print(f"Error al procesar la solicitud: {e}")
-        return jsonify({'error': 'Error interno del servidor'}), 500
+        return jsonify({'error': 'Error interno del servidor', 'id_solicitud': id_solicitud}), 500
+
+def _id_elemento(data, id_peticion, indice):
+    """Id de un elemento de /solicitudes: su `id_solicitud` si lo trae, si no `<id de la petición>-<indice>`."""
+    if isinstance(data, dict) and isinstance(data.get('id_solicitud'), str) and data['id_solicitud']:
+        return data['id_solicitud']
+    return f"{id_peticion}-{indice}"
+
+def _procesar_lote(datos, inicio_indice, id_peticion):
+    """
+    Procesa un lote de solicitudes de /solicitudes como /solicitud, pero con una
+    llamada por lote al analizador, al gestor de usuarios, al predictor y al
+    asignador. Devuelve un resultado por elemento, en orden, con el id de cada
+    solicitud (ver `_id_elemento`). Si el lote entra en el muestreo, se traza
+    entero: sus solicitudes comparten la traza del lote, cuyo tramo raíz lleva
+    `id_peticion` y la lista `ids_solicitud`.
+    """
+    resultados = [None] * len(datos)
+    ids = [_id_elemento(data, id_peticion, inicio_indice + i) for i, data in enumerate(datos)]
+    validos = []
+    for i, data in enumerate(datos):
+        if (isinstance(data, dict) and isinstance(data.get('texto'), str) and 'user_id' in data
+                and isinstance(data['user_id'], (str, int))):
+            validos.append(i)
+        else:
+            resultados[i] = {'indice': inicio_indice + i, 'id_solicitud': ids[i],
+                             'error': 'Datos de solicitud no válidos'}
+    if not validos:
+        return resultados
+
+    traza = trazador.iniciar("POST /solicitudes")
+    ids_validos = [ids[i] for i in validos]
+    try:
+        user_ids = [datos[i]['user_id'] for i in validos]
+        t0 = time.perf_counter()
+        lista_caracteristicas = analizador_solicitudes.analizar_batch([datos[i]['texto'] for i in validos])
+        t1 = time.perf_counter()
+        perfiles = gestor_usuarios.registrar_lote(user_ids, lista_caracteristicas)
+
+        inicio = time.time()
+        t2 = time.perf_counter()
+        demandas = predictor_lotes.predict_batch(lista_caracteristicas)
+        t3 = time.perf_counter()
+        futuros = asignador_recursos.asignar_lote(user_ids, lista_caracteristicas, demandas, traza, perfiles)
+        t4 = time.perf_counter()
+        tiempo_asignacion = t4 - t2
+    except Exception as e:
+        if traza is not None:
+            traza.terminar(error=e, tamano_lote=len(validos), id_peticion=id_peticion, ids_solicitud=ids_validos)
+        print(f"Error al procesar el lote de solicitudes: {e}")
+        for i in validos:
+            resultados[i] = {'indice': inicio_indice + i, 'id_solicitud': ids[i], 'error': 'Error interno del servidor'}
+        return resultados
+
+    if traza is not None:
+        traza.tramo("analisis", t0, t1)
+        traza.tramo("perfil", t1, t2)
+        traza.tramo("prediccion", t2, t3)
+        traza.tramo("encolado", t3, t4)
+        traza.terminar(tamano_lote=len(validos), indice_inicial=inicio_indice, id_peticion=id_peticion,
+                       ids_solicitud=ids_validos)
+
+    SOLICITUDES_LOTE.incrementar(len(validos))
+    for i, user_id, caracteristicas, perfil, demanda, futuro in zip(validos, user_ids, lista_caracteristicas,
+                                                                     perfiles, demandas, futuros):
+        resultados[i] = {
+            'indice': inicio_indice + i,
+            'id_solicitud': ids[i],
+            'mensaje': 'Solicitud procesada correctamente',
+            'user_id': user_id,
+            'perfil': perfil,
+            'servidor_asignado': 'encolada',
+            'ticket': futuro.ticket,
+            'caracteristicas': {
+                'longitud': caracteristicas['longitud'],
+                'tipo': caracteristicas['tipo'],
+                'demanda_predicha': float(demanda)
+            },
+            'tiempo_asignacion': tiempo_asignacion,
+            'demanda_predicha': float(demanda),
+            'timestamp_llegada': datos[i].get('timestamp', inicio)
+        }
+    return resultados
+
+def _leer_ndjson(flujo, tamano_bloque=65536):
+    """
+    Elementos de un cuerpo NDJSON (un objeto JSON por línea), leído por bloques a
+    medida que llega; las líneas que no son JSON válido dan None.
+    """
+    resto = b''
+    while True:
+        bloque = flujo.read(tamano_bloque)
+        lineas = (resto + bloque).split(b'\n')
+        resto = lineas.pop() if bloque else b''
+        for linea in lineas:
+            if linea.strip():
+                try:
+                    yield json.loads(linea)
+                except ValueError:
+                    yield None
+        if not bloque:
+            break
+
+@app.route('/solicitudes', methods=['POST'])
+def procesar_solicitudes():
+    """
+    Recibe muchas solicitudes en una sola llamada HTTP: un array JSON o, con
+    Content-Type application/x-ndjson, un objeto por línea (se leen a medida que
+    llegan). Se procesan en lotes de TAMANO_LOTE_SOLICITUDES y los resultados se
+    devuelven en streaming, en el mismo orden y formato que la entrada. Cada
+    resultado lleva su `indice` y su `id_solicitud`: el del elemento, si lo trae,
+    o `<X-Request-Id>-<indice>` (con un id nuevo si no viene la cabecera). Los
+    elementos no válidos dan un resultado con `error`.
+    """
+    id_peticion = request.headers.get('X-Request-Id') or nuevo_id_solicitud()
+    ndjson = request.mimetype in ('application/x-ndjson', 'application/jsonl')
+    if ndjson:
+        elementos = _leer_ndjson(request.stream)
+    else:
+        datos = request.get_json(silent=True)
+        if not isinstance(datos, list):
+            return jsonify({'error': 'Se esperaba un array JSON de solicitudes o un cuerpo NDJSON'}), 400
+        elementos = iter(datos)
+
+    def generar():
+        indice = 0
+        primero = True
+        if not ndjson:
+            yield '['
+        while True:
+            lote = list(islice(elementos, TAMANO_LOTE_SOLICITUDES))
+            if not lote:
+                break
+            for resultado in _procesar_lote(lote, indice, id_peticion):
+                if ndjson:
+                    yield json.dumps(resultado) + '\n'
+                else:
+                    yield ('' if primero else ',') + json.dumps(resultado)
+                primero = False
+            indice += len(lote)
+        if not ndjson:
+            yield ']'
+
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return Response(stream_with_context(generar()), mimetype=mimetype)
+
+@app.route('/estadisticas_inferencia')
+def get_estadisticas_inferencia():
+    estadisticas = predictor_lotes.estadisticas()
+    estadisticas['cache'] = predictor_servicio.cache.estadisticas()
+    return jsonify(estadisticas)
+
+@app.route('/estadisticas_aprovisionamiento')
+def get_estadisticas_aprovisionamiento():
+    return jsonify(asignador_recursos.estadisticas_aprovisionamiento())
+
+@app.route('/estadisticas_registro')
+def get_estadisticas_registro():
+    return jsonify(registro.estadisticas())
+
+@app.route('/instantaneas')
+def get_instantaneas():
+    """
+    Instantáneas del estado del balanceador posteriores al cursor `desde` (long-polling).
+    Si aún no hay ninguna, espera hasta `espera` segundos a que llegue. La respuesta
+    lleva el `cursor` que hay que pasar en la siguiente petición.
+    """
+    cursor = request.args.get('desde', 0, type=int)
+    espera = min(request.args.get('espera', 0.0, type=float), ESPERA_MAX_INSTANTANEAS)
+    instantaneas = historial_instantaneas.desde(cursor, espera)
+    nuevo_cursor = instantaneas[-1][0] if instantaneas else max(min(cursor, historial_instantaneas.ultima_secuencia), 0)
+    # Las instantáneas ya están serializadas: se concatenan sin volver a pasar por json
+    cuerpo = '{"cursor":%d,"instantaneas":[%s]}' % (nuevo_cursor, ','.join(texto for _, texto in instantaneas))
+    return Response(cuerpo, mimetype='application/json')
+
+@app.route('/instantaneas/eventos')
+def get_instantaneas_eventos():
+    """
+    Las mismas instantáneas como Server-Sent Events: una por evento, con su número
+    de secuencia como id, de modo que al reconectar (cabecera Last-Event-ID) se
+    continúa donde se dejó. Sin cursor, se empieza por las nuevas.
+    """
+    cursor = request.headers.get('Last-Event-ID', type=int)
+    if cursor is None:
+        cursor = request.args.get('desde', historial_instantaneas.ultima_secuencia, type=int)
+
+    def generar(cursor):
+        yield 'retry: 1000\n\n'
+        while True:
+            instantaneas = historial_instantaneas.desde(cursor, 15.0)
+            if not instantaneas:
+                yield ': sin cambios\n\n'  # Mantiene viva la conexión
+                continue
+            yield ''.join(f'id: {secuencia}\ndata: {texto}\n\n' for secuencia, texto in instantaneas)
+            cursor = instantaneas[-1][0]
+
+    return Response(generar(cursor), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/rollups')
+def get_rollups():
+    """
+    Espera y procesamiento agregados (cuenta, media, mínimo, máximo y cuantiles) en
+    puntos de `paso` segundos (múltiplo de 1, 60 o 3600) entre `desde` y `hasta`
+    (instantes Unix; por defecto, los 60 últimos pasos), opcionalmente de un solo
+    `tipo` y `perfil`.
+    """
+    paso = request.args.get('paso', 60, type=int)
+    hasta = request.args.get('hasta', time.time(), type=float)
+    desde = request.args.get('desde', hasta - 60 * paso, type=float)
+    try:
+        puntos = rollups.consultar(paso, desde, hasta, request.args.get('tipo'), request.args.get('perfil'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'paso': paso, 'puntos': puntos})
+
+@app.route('/estadisticas_rollups')
+def get_estadisticas_rollups():
+    return jsonify(rollups.estadisticas())
+
+@app.route('/estadisticas_instantaneas')
+def get_estadisticas_instantaneas():
+    return jsonify(historial_instantaneas.estadisticas())
+
+@app.route('/estadisticas_trazas')
+def get_estadisticas_trazas():
+    return jsonify(trazador.estadisticas())
+
+@app.route('/estados_autoescalado', methods=['POST'])
+def guardar_estados_autoescalado():
+    """
+    Guarda las últimas observaciones del autoescalador en RUTA_ESTADOS_AUTOESCALADO,
+    para verificar una política exportada con `politica_numpy.py --observaciones`.
+    """
+    if not RUTA_ESTADOS_AUTOESCALADO:
+        return jsonify({'error': 'RUTA_ESTADOS_AUTOESCALADO no está configurada'}), 400
+    num_estados = autoescalador.guardar_estados(RUTA_ESTADOS_AUTOESCALADO)
+    return jsonify({'ruta': RUTA_ESTADOS_AUTOESCALADO, 'num_estados': num_estados}), 200
+
+@app.route('/resultado/<int:ticket>')
+def obtener_resultado(ticket):
+    """
+    Consulta el estado de una solicitud encolada a partir de su ticket.
+    """
+    futuro = asignador_recursos.obtener_ticket(ticket)
+    if futuro is None:
+        return jsonify({'error': 'Ticket no encontrado'}), 404
+    if not futuro.done():
+        return jsonify({'ticket': ticket, 'estado': 'pendiente'}), 202
+    try:
+        resultado = futuro.result()
+    except Exception as e:
+        return jsonify({'ticket': ticket, 'estado': 'error', 'error': str(e)}), 200
+    return jsonify({'ticket': ticket, 'estado': 'completada', 'resultado': resultado}), 200
 
 # Nueva ruta para actualizar todos los perfiles
 @app.route('/actualizar_perfiles', methods=['POST'])
 def actualizar_perfiles():
+    """
+    Lanza el recálculo de todos los perfiles en segundo plano y vuelve en el acto
+    con el id del trabajo, que se consulta en /actualizar_perfiles/<id>.
+    """
     try:
-        gestor_usuarios.actualizar_perfiles()
-        return jsonify({'mensaje': 'Perfiles de usuario actualizados correctamente'}), 200
+        id_trabajo = gestor_usuarios.iniciar_actualizacion_perfiles()
+        return jsonify({'mensaje': 'Actualización de perfiles iniciada', 'trabajo': id_trabajo}), 202
     except Exception as e:
         print(f"Error al actualizar perfiles: {e}")
         return jsonify({'error': 'Error interno del servidor al actualizar perfiles'}), 500
 
+@app.route('/actualizar_perfiles/<int:id_trabajo>')
+def estado_actualizacion_perfiles(id_trabajo):
+    estado = gestor_usuarios.estado_actualizacion(id_trabajo)
+    if estado is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(estado), 200
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import time
+
+from asignador_recursos import PredictorNumPy
+from politica_numpy import PoliticaNumPy, exportar_politica
+
+DIRECTORIO_ARTEFACTOS = "artefactos"
+ARCHIVO_VERSION_ACTUAL = "ACTUAL"
+ARCHIVO_MANIFIESTO = "manifest.json"
+
+def clave_politica(formato, modo_observacion="servidores"):
+    """Clave en el manifiesto del archivo de la política ('ppo' o 'numpy') entrenada con un modo de observación."""
+    clave = f"politica_{formato}"
+    return clave if modo_observacion == "servidores" else f"{clave}_{modo_observacion}"
+
+class BundleArtefactos:
+    """
+    Conjunto versionado de artefactos que necesita la aplicación para servir:
+    pesos del predictor de demanda (con su normalización) y políticas de escalado
+    (el `.zip` de PPO y su exportación a NumPy), una por modo de observación
+    (ver entorno_rl.espacio_observacion) con la forma de observación que esperan.
+    """
+
+    def __init__(self, ruta, manifiesto):
+        self.ruta = ruta
+        self.manifiesto = manifiesto
+        self.version = manifiesto["version"]
+
+    def ruta_archivo(self, clave):
+        """Devuelve la ruta de uno de los archivos del manifiesto, o None si no está."""
+        nombre = self.manifiesto["archivos"].get(clave)
+        return os.path.join(self.ruta, nombre) if nombre else None
+
+    def cargar_predictor(self, tamano_cache=1024):
+        """Carga el predictor de demanda en NumPy (no importa TensorFlow)."""
+        return PredictorNumPy.cargar(self.ruta_archivo("predictor_numpy"), tamano_cache)
+
+    def cargar_politica(self, modo_observacion="servidores"):
+        """Carga la política de escalado de un modo en NumPy (no importa PyTorch), o None si no está."""
+        ruta = self.ruta_archivo(clave_politica("numpy", modo_observacion))
+        return PoliticaNumPy.cargar(ruta) if ruta else None
+
+    def forma_politica(self, modo_observacion="servidores"):
+        """Forma de las observaciones que espera la política de un modo, o None si no se conoce."""
+        politica = self.manifiesto.get("politicas", {}).get(modo_observacion)
+        if politica is not None:
+            return tuple(politica["forma_observacion"])
+        # Los manifiestos anteriores no la guardan: se lee de la exportación a NumPy
+        politica = self.cargar_politica(modo_observacion)
+        return politica.forma_observacion if politica is not None else None
+
+def guardar_bundle(demand_predictor, politicas=None, directorio=DIRECTORIO_ARTEFACTOS, version=None):
+    """
+    Guarda un predictor entrenado y las políticas de escalado como una nueva versión
+    del bundle y la marca como actual.
+
+    Args:
+        demand_predictor (DemandPredictor): Predictor ya entrenado.
+        politicas (dict): {modo de observación: ruta al `.zip` de la política PPO} que se incluyen.
+        directorio (str): Directorio raíz de los artefactos.
+        version (str): Nombre de la versión; por defecto, la fecha y hora actuales.
+
+    Returns:
+        BundleArtefactos: El bundle recién guardado.
+    """
+    version = version or time.strftime('%Y%m%d-%H%M%S')
+    ruta = os.path.join(directorio, version)
+    os.makedirs(ruta, exist_ok=True)
+
+    archivos = {
+        "predictor_numpy": "predictor_demanda.npz",
+        "predictor_keras": "predictor_demanda.h5"
+    }
+    demand_predictor.exportar_numpy(os.path.join(ruta, archivos["predictor_numpy"]))
+    demand_predictor.model.save(os.path.join(ruta, archivos["predictor_keras"]))
+
+    info_politicas = {}
+    for modo_observacion, ruta_politica in (politicas or {}).items():
+        if not os.path.exists(ruta_politica):
+            print(f"Advertencia: No se encontró la política {ruta_politica}; el bundle no la incluye.")
+            continue
+        sufijo = "" if modo_observacion == "servidores" else f"_{modo_observacion}"
+        clave_ppo, clave_numpy = clave_politica("ppo", modo_observacion), clave_politica("numpy", modo_observacion)
+        archivos[clave_ppo] = f"politica_ppo{sufijo}.zip"
+        shutil.copyfile(ruta_politica, os.path.join(ruta, archivos[clave_ppo]))
+        archivos[clave_numpy] = f"politica_escalado{sufijo}.npz"
+        exportar_politica(ruta_politica, os.path.join(ruta, archivos[clave_numpy]))
+        # La forma de observación se guarda para comprobarla contra el entorno al servir
+        forma = PoliticaNumPy.cargar(os.path.join(ruta, archivos[clave_numpy])).forma_observacion
+        info_politicas[modo_observacion] = {"forma_observacion": [int(n) for n in forma]}
+
+    manifiesto = {
+        "version": version,
+        "creado": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "archivos": archivos,
+        "politicas": info_politicas
+    }
+    with open(os.path.join(ruta, ARCHIVO_MANIFIESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=2)
+
+    # Actualizar el puntero a la versión actual al final, cuando el bundle ya está completo
+    ruta_actual = os.path.join(directorio, ARCHIVO_VERSION_ACTUAL)
+    with open(ruta_actual + ".tmp", 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(ruta_actual + ".tmp", ruta_actual)
+
+    print(f"Bundle de artefactos guardado en {ruta}")
+    return BundleArtefactos(ruta, manifiesto)
+
+def cargar_bundle(directorio=DIRECTORIO_ARTEFACTOS, version=None):
+    """
+    Carga el manifiesto de una versión del bundle (por defecto, la actual).
+
+    Returns:
+        BundleArtefactos: El bundle, o None si no hay ninguno guardado.
+    """
+    if version is None:
+        ruta_actual = os.path.join(directorio, ARCHIVO_VERSION_ACTUAL)
+        if not os.path.exists(ruta_actual):
+            return None
+        with open(ruta_actual, encoding='utf-8') as f:
+            version = f.read().strip()
+
+    ruta = os.path.join(directorio, version)
+    ruta_manifiesto = os.path.join(ruta, ARCHIVO_MANIFIESTO)
+    if not os.path.exists(ruta_manifiesto):
+        return None
+    with open(ruta_manifiesto, encoding='utf-8') as f:
+        return BundleArtefactos(ruta, json.load(f))
@@ -1,35 +1,200 @@
 import queue
 import time
 import random
+import threading
+import itertools
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 import numpy as np
-from tensorflow import keras
-from sklearn.model_selection import train_test_split
 import os
-import tensorflow as tf
 
-class DemandPredictor:
-    def __init__(self, model_path="demand_predictor_model.h5"):
+from estrategias_seleccion import crear_estrategia
+from estimador_tasa import EstimadorTasa
+from flota import EstadoFlota
+from metricas import histograma_etapa
+from registro_eventos import DEBUG, registro
+
+# Latencia de las etapas que ocurren en el asignador (ver metricas.py)
+LATENCIA_ENCOLADO = histograma_etapa("encolado")
+LATENCIA_ESPERA_COLA = histograma_etapa("espera_cola")
+LATENCIA_PROCESAMIENTO = histograma_etapa("procesamiento")
+
+# TensorFlow y scikit-learn se importan solo al crear o entrenar un DemandPredictor,
+# de modo que servir con PredictorNumPy no los necesita.
+
+class CachePredicciones:
+    """
+    Caché LRU acotada de predicciones de demanda, indexada por (longitud, tipo).
+    """
+
+    def __init__(self, capacidad=1024):
+        self.capacidad = capacidad
+        self.entradas = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # El lock no se puede serializar (p. ej. al enviar el predictor a otro proceso)
+        estado = self.__dict__.copy()
+        del estado["_lock"]
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, contar_fallo=True):
+        """Devuelve la predicción guardada para `clave`, o None si no está."""
+        with self._lock:
+            valor = self.entradas.get(clave)
+            if valor is None:
+                if contar_fallo:
+                    self.fallos += 1
+                return None
+            self.entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self.entradas[clave] = valor
+            self.entradas.move_to_end(clave)
+            while len(self.entradas) > self.capacidad:
+                self.entradas.popitem(last=False)
+
+    def invalidar(self):
+        """Vacía la caché (p. ej. tras reentrenar o cargar otro modelo)."""
+        with self._lock:
+            self.entradas.clear()
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "capacidad": self.capacidad,
+                "tamano": len(self.entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / total if total else 0.0,
+                "invalidaciones": self.invalidaciones
+            }
+
+class PredictorBase:
+    """
+    Lógica común a los predictores de demanda: vector de características,
+    normalización y caché. Las subclases implementan `_inferir`.
+    """
+
+    def __init__(self, tamano_cache=1024):
+        self.cache = CachePredicciones(tamano_cache)
+        self.trained = False
+        self.mean = None  # Media para normalizar
+        self.std = None   # Desviación estándar para normalizar
+
+    def _inferir(self, matriz):
+        """Devuelve la demanda predicha (array 1-D) para una matriz ya normalizada."""
+        raise NotImplementedError
+
+    def _vector_caracteristicas(self, features):
+        """Convierte las características de una solicitud en el vector de entrada del modelo."""
+        return [
+            features["longitud"],
+            1 if features["tipo"] == "simple" else 0,
+            1 if features["tipo"] == "compleja" else 0,
+            1 if features["tipo"] == "codigo" else 0
+        ]
+
+    def _clave_cache(self, features):
+        return (features["longitud"], features["tipo"])
+
+    def buscar_en_cache(self, features):
+        """Devuelve la predicción cacheada de una solicitud sin contar el fallo, o None."""
+        return self.cache.obtener(self._clave_cache(features), contar_fallo=False)
+
+    def predict(self, features):
+        """Predice la demanda de recursos para una solicitud."""
+        if not self.trained:
+            registro.advertencia("El modelo no ha sido entrenado. Se devuelve una predicción por defecto.")
+            return 1.0
+
+        # Las entradas repetidas se resuelven sin pasar por el modelo
+        clave = self._clave_cache(features)
+        predicted_demand = self.cache.obtener(clave)
+        if predicted_demand is not None:
+            return predicted_demand
+
+        feature_vector = np.array(self._vector_caracteristicas(features))
+
+        # Normalizar las características de entrada
+        feature_vector = (feature_vector - self.mean) / self.std
+
+        predicted_demand = self._inferir(np.array([feature_vector]))[0]
+        self.cache.guardar(clave, predicted_demand)
+        return predicted_demand
+
+    def predict_batch(self, lista_features):
+        """Predice la demanda de una lista de solicitudes con una única pasada del modelo."""
+        if not lista_features:
+            return np.zeros(0, dtype=np.float32)
+        if not self.trained:
+            registro.advertencia("El modelo no ha sido entrenado. Se devuelven predicciones por defecto.")
+            return np.ones(len(lista_features), dtype=np.float32)
+
+        predicciones = np.zeros(len(lista_features), dtype=np.float32)
+        pendientes = {}  # {clave: [posiciones en el lote]} de las entradas no cacheadas
+        for i, features in enumerate(lista_features):
+            clave = self._clave_cache(features)
+            valor = self.cache.obtener(clave)
+            if valor is not None:
+                predicciones[i] = valor
+            else:
+                pendientes.setdefault(clave, []).append(i)
+
+        if pendientes:
+            # Cada entrada distinta se predice una sola vez aunque se repita en el lote
+            claves = list(pendientes)
+            matriz = np.array([self._vector_caracteristicas({"longitud": longitud, "tipo": tipo})
+                               for longitud, tipo in claves], dtype=np.float64)
+            matriz = (matriz - self.mean) / self.std
+            resultados = self._inferir(matriz)
+            for clave, valor in zip(claves, resultados):
+                self.cache.guardar(clave, valor)
+                predicciones[pendientes[clave]] = valor
+
+        return predicciones
+
+class DemandPredictor(PredictorBase):
+    def __init__(self, model_path="demand_predictor_model.h5", tamano_cache=1024):
+        super().__init__(tamano_cache)
         self.model_path = model_path
+        # La normalización se guarda junto al modelo: sin ella el .h5 no sirve para predecir
+        self.ruta_normalizacion = os.path.splitext(model_path)[0] + "_normalizacion.npz"
         self.input_shape = (4,)  # Definir input_shape como atributo de la clase
         self.model = self.cargar_o_crear_modelo()
-        self.trained = os.path.exists(self.model_path)
-        self.mean = None  # Media para normalizar
-        self.std = None   # Desviación estándar para normalizar
 
     def cargar_o_crear_modelo(self):
         """Carga el modelo desde el archivo si existe, de lo contrario crea uno nuevo."""
+        from tensorflow import keras
+
         if os.path.exists(self.model_path):
             model = keras.models.load_model(self.model_path)
             print("Modelo cargado desde el archivo.")
             # Volver a compilar el modelo después de cargarlo
             model.compile(optimizer='adam', loss=keras.losses.MeanSquaredError())
-            self.trained = True
+            self.trained = self.cargar_normalizacion()
+            self.cache.invalidar()
             return model
         else:
             return self.crear_modelo()
 
     def crear_modelo(self):
         """Crea el modelo de red neuronal."""
+        from tensorflow import keras
+
         model = keras.Sequential([
             keras.layers.Dense(128, activation='relu', input_shape=self.input_shape),
             keras.layers.Dense(64, activation='relu'),
@@ -40,6 +205,8 @@ class DemandPredictor:
 
     def train(self, X, y, epochs=100, validation_split=0.2):
         """Entrena el modelo de red neuronal."""
+        from sklearn.model_selection import train_test_split
+
         X = np.array(X)
         y = np.array(y)
 
@@ -68,213 +235,586 @@ class DemandPredictor:
         try:
             self.model.fit(X_train, y_train, epochs=epochs, validation_data=(X_val, y_val))
             self.trained = True
+            self.cache.invalidar()  # Las predicciones anteriores ya no son válidas
             print("Modelo entrenado.")
         except Exception as e:
             print(f"Error durante el entrenamiento del modelo: {e}")
             return
 
-        # Guardar el modelo entrenado
+        # Guardar el modelo entrenado y su normalización
         try:
             self.model.save(self.model_path)
+            np.savez(self.ruta_normalizacion, mean=self.mean, std=self.std)
             print(f"Modelo guardado en {self.model_path}")
         except Exception as e:
             print(f"Error al guardar el modelo: {e}")
 
-    def predict(self, features):
-        """Predice la demanda de recursos para una solicitud."""
-        if not self.trained:
-            print("Advertencia: El modelo no ha sido entrenado. Se devuelve una predicción por defecto.")
-            return 1.0
-
-        feature_vector = np.array([
-            features["longitud"],
-            1 if features["tipo"] == "simple" else 0,
-            1 if features["tipo"] == "compleja" else 0,
-            1 if features["tipo"] == "codigo" else 0
-        ])
+    def cargar_normalizacion(self):
+        """Carga la media y desviación guardadas con el modelo. Devuelve False si no existen."""
+        if not os.path.exists(self.ruta_normalizacion):
+            print(f"Advertencia: No se encontró {self.ruta_normalizacion}. Hay que reentrenar el modelo antes de predecir.")
+            return False
+        with np.load(self.ruta_normalizacion) as datos:
+            self.mean = datos["mean"]
+            self.std = datos["std"]
+        return True
 
-        # Normalizar las características de entrada
-        feature_vector = (feature_vector - self.mean) / self.std
+    def _inferir(self, matriz):
+        return self.model.predict(matriz)[:, 0]
 
-        predicted_demand = self.model.predict(np.array([feature_vector]))[0][0]
-        return predicted_demand
+    def exportar_numpy(self, ruta=None):
+        """
+        Exporta los pesos de las capas Dense y la normalización a un `.npz`
+        que `PredictorNumPy` puede servir sin TensorFlow.
+        """
+        if self.mean is None or self.std is None:
+            raise ValueError("El modelo debe estar entrenado (mean/std) antes de exportarlo")
+        if ruta is None:
+            ruta = os.path.splitext(self.model_path)[0] + ".npz"
+
+        arrays = {"mean": np.asarray(self.mean, dtype=np.float64),
+                  "std": np.asarray(self.std, dtype=np.float64)}
+        activaciones = []
+        for i, capa in enumerate(self.model.layers):
+            kernel, bias = capa.get_weights()
+            arrays[f"kernel_{i}"] = kernel.astype(np.float32)
+            arrays[f"bias_{i}"] = bias.astype(np.float32)
+            activaciones.append(capa.get_config().get("activation", "linear"))
+        arrays["activaciones"] = np.array(activaciones)
+
+        np.savez(ruta, **arrays)
+        print(f"Modelo exportado para NumPy en {ruta}")
+        return ruta
+
+class PredictorNumPy(PredictorBase):
+    """
+    Predictor de demanda que ejecuta la red exportada con `DemandPredictor.exportar_numpy`
+    usando solo NumPy, sin importar TensorFlow.
+    """
+
+    ACTIVACIONES = {
+        "relu": lambda x: np.maximum(x, 0, out=x),
+        "linear": lambda x: x
+    }
+
+    def __init__(self, capas, mean, std, tamano_cache=1024):
+        super().__init__(tamano_cache)
+        self.capas = capas  # [(kernel, bias, activacion)]
+        self.mean = mean
+        self.std = std
+        self.trained = True
+
+    @classmethod
+    def cargar(cls, ruta, tamano_cache=1024):
+        """Carga un modelo exportado en formato `.npz`."""
+        with np.load(ruta) as datos:
+            activaciones = [str(a) for a in datos["activaciones"]]
+            capas = [(datos[f"kernel_{i}"], datos[f"bias_{i}"], activacion)
+                     for i, activacion in enumerate(activaciones)]
+            return cls(capas, datos["mean"], datos["std"], tamano_cache)
+
+    def _inferir(self, matriz):
+        x = np.asarray(matriz, dtype=np.float32)
+        for kernel, bias, activacion in self.capas:
+            x = x @ kernel
+            x += bias
+            x = self.ACTIVACIONES[activacion](x)
+        return x[:, 0]
+
+TIEMPO_ARRANQUE = 0.5  # Segundos que tarda un servidor nuevo en estar listo
+
+def calcular_tiempo_procesamiento(longitud, tipo, demanda_predicha, aleatorio=random):
+    """
+    Tiempo (en segundos) que tarda un servidor en procesar una solicitud.
+
+    Lo comparten ServidorSimulado y el simulador de eventos discretos, que pasa
+    su propio generador en `aleatorio` para ser reproducible.
+    """
+    # Cálculo del tiempo de procesamiento (incluyendo tipo de solicitud y demanda predicha)
+    tiempo_procesamiento = (longitud * 0.01 +
+                           (1 if tipo == "compleja" else 0) * 0.5 +
+                           (1 if tipo == "codigo" else 0) * 1 +
+                           demanda_predicha * 0.2 +
+                           aleatorio.uniform(-0.1, 0.1))  # Añadir un factor aleatorio
+
+    # Asegurarse de que el tiempo de procesamiento no sea negativo
+    tiempo_procesamiento = max(0, tiempo_procesamiento)
+
+    # Convertir tiempo_procesamiento a float estándar
+    return float(tiempo_procesamiento)
 
 class ServidorSimulado:
-    def __init__(self, id):
+    def __init__(self, id, capacidad=1.0):
         self.id = id
         self.carga = 0
-        self.arrancando = True  # Atributo para simular el arranque
-        self.tiempo_arranque = 0.5
-        print(f"Servidor {self.id}: Iniciando...")
+        self.capacidad = capacidad  # Velocidad relativa: el tiempo de procesamiento se divide por ella
+        self.al_cambiar_carga = None  # Llamada con el servidor cada vez que cambia su carga
+        self.arrancando = True  # Hasta que termine `arrancar` no se le entregan solicitudes
+        self.tiempo_arranque = TIEMPO_ARRANQUE
+        self.pendientes = 0  # Solicitudes entregadas al trabajador (en espera o en proceso)
+        # Trabajador propio del servidor: procesa sus solicitudes en paralelo al resto
+        self.ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"servidor-{self.id}")
+        registro.info("Servidor {}: Iniciando...", self.id)
+
+    def arrancar(self):
+        """Simula el arranque del servidor; bloquea durante `tiempo_arranque` segundos."""
         time.sleep(self.tiempo_arranque)
+
+    def marcar_listo(self):
         self.arrancando = False
-        print(f"Servidor {self.id}: Listo para procesar solicitudes.")
+        registro.info("Servidor {}: Listo para procesar solicitudes.", self.id)
 
-    def procesar_solicitud(self, longitud, tipo, demanda_predicha, timestamp_llegada):
-        """Simula el procesamiento de una solicitud."""
+    def enviar(self, longitud, tipo, demanda_predicha, timestamp_llegada, traza=None):
+        """Entrega una solicitud al trabajador del servidor y devuelve su futuro."""
+        return self.ejecutor.submit(self.procesar_solicitud, longitud, tipo, demanda_predicha, timestamp_llegada,
+                                    traza)
+
+    def detener(self):
+        """Deja de aceptar solicitudes; las ya entregadas se terminan de procesar."""
+        self.ejecutor.shutdown(wait=False)
+
+    def procesar_solicitud(self, longitud, tipo, demanda_predicha, timestamp_llegada, traza=None):
+        """Simula el procesamiento de una solicitud; si viene con `traza`, registra el tramo de procesamiento."""
         if self.arrancando:
-            print(f"Servidor {self.id}: No se puede procesar la solicitud, el servidor está arrancando.")
+            registro.advertencia("Servidor {}: No se puede procesar la solicitud, el servidor está arrancando.", self.id)
             return
 
         # Calcular el tiempo de espera en la cola
         tiempo_espera = time.time() - timestamp_llegada
 
-        print(f"Servidor {self.id}: Procesando solicitud. Longitud: {longitud}, Tipo: {tipo}, Demanda Predicha: {demanda_predicha}. Tiempo de espera en cola: {tiempo_espera:.4f}")
-        # Cálculo del tiempo de procesamiento (incluyendo tipo de solicitud y demanda predicha)
-        tiempo_procesamiento = (longitud * 0.01 +
-                               (1 if tipo == "compleja" else 0) * 0.5 +
-                               (1 if tipo == "codigo" else 0) * 1 +
-                               demanda_predicha * 0.2 +
-                               random.uniform(-0.1, 0.1))  # Añadir un factor aleatorio
-
-        # Asegurarse de que el tiempo de procesamiento no sea negativo
-        tiempo_procesamiento = max(0, tiempo_procesamiento)
-
-        # Convertir tiempo_procesamiento a float estándar
-        tiempo_procesamiento = float(tiempo_procesamiento)
+        registro.info("Servidor {}: Procesando solicitud. Longitud: {}, Tipo: {}, Demanda Predicha: {}. Tiempo de espera en cola: {:.4f}",
+                      self.id, longitud, tipo, demanda_predicha, tiempo_espera)
+        tiempo_procesamiento = calcular_tiempo_procesamiento(longitud, tipo, demanda_predicha) / self.capacidad
 
         self.carga += tiempo_procesamiento
+        if self.al_cambiar_carga:
+            self.al_cambiar_carga(self)
 
         # --- DEBUG ---
-        print(f"DEBUG - Servidor {self.id}: Iniciando procesamiento. Carga actual: {self.carga:.2f}")
+        registro.debug("DEBUG - Servidor {}: Iniciando procesamiento. Carga actual: {:.2f}", self.id, self.carga)
 
+        inicio = time.perf_counter()
         time.sleep(tiempo_procesamiento)  # Simular tiempo de procesamiento
+        fin = time.perf_counter()
+        LATENCIA_PROCESAMIENTO.observar(fin - inicio)
+        if traza is not None:
+            traza.tramo("procesamiento", inicio, fin, servidor=self.id, tiempo_espera=tiempo_espera)
 
         self.carga -= tiempo_procesamiento
+        if self.al_cambiar_carga:
+            self.al_cambiar_carga(self)
 
         # --- DEBUG ---
-        print(f"DEBUG - Servidor {self.id}: Terminando procesamiento. Carga actual: {self.carga:.2f}")
+        registro.debug("DEBUG - Servidor {}: Terminando procesamiento. Carga actual: {:.2f}", self.id, self.carga)
 
         # Calcular y registrar métricas de latencia
         tiempo_respuesta = time.time() - timestamp_llegada
-        print(f"Servidor {self.id}: Solicitud completada. Tiempo de respuesta: {tiempo_respuesta:.4f} segundos. Carga actual: {self.carga:.2f}")
+        registro.info("Servidor {}: Solicitud completada. Tiempo de respuesta: {:.4f} segundos. Carga actual: {:.2f}",
+                      self.id, tiempo_respuesta, self.carga)
+
+        return {
+            "servidor": self.id,
+            "tiempo_espera": tiempo_espera,
+            "tiempo_procesamiento": tiempo_procesamiento,
+            "tiempo_respuesta": tiempo_respuesta
+        }
 
 class AsignadorRecursos:
-    def __init__(self, num_servidores_inicial, demand_predictor):
-        self.num_servidores_max = 5
-        self.servidores = [ServidorSimulado(i) for i in range(num_servidores_inicial)]
+    def __init__(self, num_servidores_inicial, demand_predictor, estrategia="menor_carga", capacidades=None,
+                 tamano_reserva=0, num_servidores_max=5):
+        self.num_servidores_max = num_servidores_max
+        self.capacidades = capacidades  # Capacidad de cada servidor según su ID (cíclica); por defecto 1.0
+        self.servidores = []
+        # Reserva de servidores ya arrancados y sin uso que se activan al instante al escalar
+        self.tamano_reserva = tamano_reserva
+        self.reserva = []
+        self._arrancando_reserva = 0
+        self._contador_servidores = itertools.count()
+        self.num_escalados = 0
+        self.num_escalados_reserva = 0
+        self.tiempos_hasta_listo = deque(maxlen=1000)  # Segundos desde que se pide un servidor hasta que está listo
         self.demand_predictor = demand_predictor
         self.umbral_escalado_superior = 5
         self.umbral_escalado_inferior = 1
         self.cola_solicitudes = queue.Queue()
         self.intervalo_impresion = 10
         self.ultimo_tiempo_impresion = time.time()
-        self.tiempos_llegada = []
+        self.estimador_llegadas = EstimadorTasa()  # Tasa de llegadas en O(1) por solicitud y memoria constante
+        self.factor_tendencia_subida = 1.5  # No se reduce la flota si la tasa de 1 s supera la de 60 s por este factor
+        self.max_pendientes_servidor = 2  # Solicitudes que puede tener entregadas cada servidor
+        # Llamada con (tipo, perfil, métricas del servidor) cada vez que termina una solicitud
+        self.al_terminar_solicitud = None
+        self.condicion = threading.Condition()  # Protege la lista de servidores y sus pendientes
+        self.estrategia = crear_estrategia(estrategia, self.max_pendientes_servidor)
+        self.flota = EstadoFlota()  # Estado de los servidores en arrays, para agregados vectoriales
+        with self.condicion:
+            for _ in range(num_servidores_inicial):
+                self._aprovisionar()
+            self._reponer_reserva()
+        self.tickets = OrderedDict()  # {ticket: futuro} de las solicitudes más recientes
+        self.max_tickets = 10000
+        self._contador_tickets = itertools.count()
+        self.despachador = threading.Thread(target=self.procesar_solicitudes, name="despachador", daemon=True)
+        self.despachador.start()
+
+    def asignar(self, user_id, caracteristicas, demanda_predicha=None, traza=None, perfil=None):
+        """
+        Asigna una solicitud a la cola y devuelve inmediatamente un futuro.
 
-    def asignar(self, user_id, caracteristicas):
-        """Asigna una solicitud a la cola."""
-        predicted_demand = self.demand_predictor.predict(caracteristicas)
+        El futuro tiene un atributo `ticket` para consultarlo más tarde con
+        `obtener_ticket` y se resuelve con las métricas del servidor que la procesa.
+        Si ya se conoce `demanda_predicha` no se vuelve a consultar el predictor.
+        Con `traza` (ver trazas.py), cada etapa de la solicitud queda registrada en ella.
+        `perfil` (el del usuario) solo se usa para `al_terminar_solicitud`.
+        """
+        if demanda_predicha is None:
+            demanda_predicha = self.demand_predictor.predict(caracteristicas)
+        predicted_demand = demanda_predicha
+        inicio = time.perf_counter()
+        timestamp_llegada = time.time()
+        futuro = Future()
+        futuro.ticket = next(self._contador_tickets)
+        self._registrar_ticket(futuro)
+        self.cola_solicitudes.put((user_id, caracteristicas, predicted_demand, timestamp_llegada, futuro, traza,
+                                   perfil))
+        self.estimador_llegadas.registrar(timestamp_llegada)
+        registro.info("Solicitud de usuario {} encolada. Demanda predicha: {:.2f}", user_id, predicted_demand)
+        encolada = time.perf_counter()
+        LATENCIA_ENCOLADO.observar(encolada - inicio)
+        if traza is not None:
+            traza.tramo("encolado", inicio, encolada, ticket=futuro.ticket)
+        return futuro
+
+    def asignar_lote(self, user_ids, lista_caracteristicas, demandas_predichas=None, traza=None, perfiles=None):
+        """
+        Versión por lotes de `asignar`: predice la demanda del lote en una sola
+        pasada (si no se da) y encola todas las solicitudes con el mismo instante de
+        llegada. Devuelve los futuros en orden.
+        Todas las solicitudes del lote comparten la `traza` del lote, si la hay.
+        `perfiles`, si se da, tiene el perfil del usuario de cada solicitud.
+        """
+        if demandas_predichas is None:
+            demandas_predichas = self.demand_predictor.predict_batch(lista_caracteristicas)
         timestamp_llegada = time.time()
-        self.cola_solicitudes.put((user_id, caracteristicas, predicted_demand, timestamp_llegada))
-        self.tiempos_llegada.append(timestamp_llegada)
-        print(f"Solicitud de usuario {user_id} encolada. Demanda predicha: {predicted_demand:.2f}")
-        self.procesar_solicitudes()
-        self.comprobar_escalado()
-        return "encolada"
+        futuros = []
+        with self.condicion:
+            for _ in user_ids:
+                futuro = Future()
+                futuro.ticket = next(self._contador_tickets)
+                self.tickets[futuro.ticket] = futuro
+                futuros.append(futuro)
+            while len(self.tickets) > self.max_tickets:
+                self.tickets.popitem(last=False)
+        if perfiles is None:
+            perfiles = [None] * len(futuros)
+        for user_id, caracteristicas, demanda, futuro, perfil in zip(user_ids, lista_caracteristicas,
+                                                                      demandas_predichas, futuros, perfiles):
+            self.cola_solicitudes.put((user_id, caracteristicas, float(demanda), timestamp_llegada, futuro, traza,
+                                       perfil))
+            self.estimador_llegadas.registrar(timestamp_llegada)
+        registro.info("Lote de {} solicitudes encolado.", len(futuros))
+        return futuros
+
+    def descartar_cola(self, motivo="Solicitud descartada"):
+        """
+        Vacía la cola de solicitudes en espera. El futuro de cada una falla con
+        `motivo` (quien lo espera no se queda bloqueado) y la cuenta de tareas de
+        la cola queda al día. Las ya entregadas a un servidor siguen su curso.
+        Devuelve cuántas se descartaron.
+        """
+        descartadas = 0
+        with self.condicion:
+            while True:
+                try:
+                    futuro = self.cola_solicitudes.get_nowait()[4]
+                except queue.Empty:
+                    break
+                futuro.set_exception(RuntimeError(motivo))
+                self.cola_solicitudes.task_done()
+                descartadas += 1
+        if descartadas:
+            registro.advertencia("{} solicitudes en cola descartadas: {}", descartadas, motivo)
+        return descartadas
+
+    def _registrar_ticket(self, futuro):
+        with self.condicion:
+            self.tickets[futuro.ticket] = futuro
+            while len(self.tickets) > self.max_tickets:
+                self.tickets.popitem(last=False)
+
+    def obtener_ticket(self, ticket):
+        """Devuelve el futuro asociado a un ticket, o None si no existe o ya se descartó."""
+        with self.condicion:
+            return self.tickets.get(ticket)
+
+    def _nuevo_servidor(self, id):
+        capacidad = self.capacidades[id % len(self.capacidades)] if self.capacidades else 1.0
+        servidor = ServidorSimulado(id, capacidad)
+        servidor.al_cambiar_carga = self.servidor_actualizado
+        return servidor
+
+    def servidor_actualizado(self, servidor):
+        """Avisa a la estrategia de selección y a la flota de que ha cambiado el estado de un servidor."""
+        with self.condicion:
+            self._actualizar_servidor(servidor)
+
+    # Los tres métodos siguientes se llaman con la condición adquirida
+    def _agregar_servidor(self, servidor):
+        self.estrategia.agregar(servidor)
+        self.flota.agregar(servidor)
+
+    def _quitar_servidor(self, servidor):
+        self.estrategia.quitar(servidor)
+        self.flota.quitar(servidor)
+
+    def _actualizar_servidor(self, servidor):
+        self.estrategia.actualizar(servidor)
+        self.flota.actualizar(servidor)
+
+    def _elegir_servidor(self):
+        """Devuelve el servidor listo que elige la estrategia, o None si ninguno admite solicitudes."""
+        return self.estrategia.elegir()
 
     def procesar_solicitudes(self):
         """
-        Procesa solicitudes de la cola, asignándolas a servidores libres.
+        Bucle del despachador: saca solicitudes de la cola y las entrega al
+        trabajador del servidor que elige la estrategia de selección.
         """
-        servidor_elegido = min(self.servidores, key=lambda s: s.carga)
-        # Solo asignar la solicitud si el servidor no está arrancando y hay solicitudes en la cola
-        if not servidor_elegido.arrancando and not self.cola_solicitudes.empty():
-            user_id, caracteristicas, predicted_demand, timestamp_llegada = self.cola_solicitudes.get()
-
-            # Extraer 'longitud' y 'tipo' de 'caracteristicas'
-            longitud = caracteristicas['longitud']
-            tipo = caracteristicas['tipo']
-
-            # Calcular el tiempo de espera en la cola
-            tiempo_espera = time.time() - timestamp_llegada
+        while True:
+            (user_id, caracteristicas, predicted_demand, timestamp_llegada, futuro, traza,
+             perfil) = self.cola_solicitudes.get()
+            try:
+                # Extraer 'longitud' y 'tipo' de 'caracteristicas'
+                longitud = caracteristicas['longitud']
+                tipo = caracteristicas['tipo']
+
+                # Esperar a que algún servidor listo tenga hueco y entregarle la solicitud
+                with self.condicion:
+                    servidor_elegido = self._elegir_servidor()
+                    while servidor_elegido is None:
+                        self.condicion.wait()
+                        servidor_elegido = self._elegir_servidor()
+                    servidor_elegido.pendientes += 1
+                    self._actualizar_servidor(servidor_elegido)
+                    resultado = servidor_elegido.enviar(longitud, tipo, predicted_demand, timestamp_llegada, traza)
+
+                # Calcular el tiempo de espera en la cola
+                tiempo_espera = time.time() - timestamp_llegada
+                LATENCIA_ESPERA_COLA.observar(tiempo_espera)
+                if traza is not None:
+                    despachada = time.perf_counter()
+                    traza.tramo("espera_cola", despachada - tiempo_espera, despachada,
+                                servidor=servidor_elegido.id, ticket=futuro.ticket)
+                registro.info("Asignando solicitud de usuario {} al servidor {} con demanda predicha de: {}, tiempo de espera en cola: {:.4f}",
+                              user_id, servidor_elegido.id, predicted_demand, tiempo_espera)
+
+                resultado.add_done_callback(partial(self._solicitud_terminada, servidor_elegido, futuro, tiempo_espera,
+                                                    tipo, perfil))
+
+                # --- DEBUG ---
+                if registro.activo(DEBUG):
+                    registro.debug("DEBUG - Servidor elegido: {}, Carga del servidor: {:.2f}",
+                                   servidor_elegido.id, servidor_elegido.carga)
+                    registro.debug("DEBUG - Tamaño de la cola después de asignar: {}", self.cola_solicitudes.qsize())
 
-            # --- DEBUG ---
-            print(f"DEBUG - Intentando asignar solicitud de usuario {user_id} al servidor {servidor_elegido.id}")
+            except Exception as e:
+                registro.error("Error al asignar la solicitud del usuario {}: {}", user_id, e)
+                futuro.set_exception(e)
 
-            # Comprobación adicional de 'arrancando' dentro de procesar_solicitud
-            if servidor_elegido.arrancando:
-                print(f"ERROR - Servidor {servidor_elegido.id} está arrancando, pero fue seleccionado para asignación.")
-                self.cola_solicitudes.put((user_id, caracteristicas, predicted_demand, timestamp_llegada))  # Devolver la solicitud a la cola
+            finally:
                 self.cola_solicitudes.task_done()
-                return
-
-            print(f"Asignando solicitud de usuario {user_id} al servidor {servidor_elegido.id} con demanda predicha de: {predicted_demand}, tiempo de espera en cola: {tiempo_espera:.4f}")
 
+    def _solicitud_terminada(self, servidor, futuro, tiempo_espera_cola, tipo, perfil, resultado):
+        """
+        Libera el hueco del servidor y resuelve el futuro devuelto por `asignar`
+        con las métricas del servidor y el tiempo que la solicitud esperó en la cola.
+        """
+        with self.condicion:
+            servidor.pendientes -= 1
+            self._actualizar_servidor(servidor)
+            self.condicion.notify_all()
+        try:
+            metricas_servidor = resultado.result()
+            if metricas_servidor is not None:
+                metricas_servidor["tiempo_espera_cola"] = tiempo_espera_cola
+            futuro.set_result(metricas_servidor)
+        except Exception as e:
+            registro.error("Error al procesar la solicitud en el servidor {}: {}", servidor.id, e)
+            futuro.set_exception(e)
+            return
+        if metricas_servidor is not None and self.al_terminar_solicitud:
             try:
-                # Registrar el tiempo de inicio de la asignación
-                tiempo_inicio_asignacion = time.time()
-
-                # Asignar la solicitud al servidor
-                servidor_elegido.procesar_solicitud(longitud, tipo, predicted_demand, timestamp_llegada)
-
-                # Registrar el tiempo de finalización de la asignación
-                tiempo_fin_asignacion = time.time()
-
-                # Calcular y registrar el tiempo de asignación
-                tiempo_asignacion = tiempo_fin_asignacion - tiempo_inicio_asignacion
-                print(f"Tiempo de asignación para usuario {user_id}: {tiempo_asignacion:.4f} segundos")
-
+                self.al_terminar_solicitud(tipo, perfil, metricas_servidor)
             except Exception as e:
-                print(f"Error al procesar la solicitud del usuario {user_id}: {e}")
-                # Considera la posibilidad de volver a encolar la solicitud o manejar el error de otra manera
+                registro.error("Error al anotar la solicitud terminada: {}", e)
 
-            finally:
-                self.cola_solicitudes.task_done()
+    def _aprovisionar(self, para_reserva=False):
+        """
+        Crea un servidor que arranca en un hilo aparte. Si no es para la reserva,
+        entra ya en la lista de servidores, pero no se elige hasta que esté listo.
+        Se llama con la condición adquirida.
+        """
+        servidor = self._nuevo_servidor(next(self._contador_servidores))
+        if para_reserva:
+            self._arrancando_reserva += 1
+        else:
+            self.servidores.append(servidor)
+            self._agregar_servidor(servidor)
+        threading.Thread(target=self._arrancar, args=(servidor, para_reserva, time.time()),
+                         name=f"arranque-{servidor.id}", daemon=True).start()
+        return servidor
+
+    def _arrancar(self, servidor, para_reserva, inicio):
+        servidor.arrancar()
+        with self.condicion:
+            # El estado de arranque solo cambia con la condición adquirida
+            servidor.marcar_listo()
+            if para_reserva:
+                self._arrancando_reserva -= 1
+            if servidor in self.flota:
+                self._actualizar_servidor(servidor)
+                self.tiempos_hasta_listo.append(time.time() - inicio)
+                self.condicion.notify_all()
+                return
+            # Se eliminó mientras arrancaba, o se arrancó para la reserva
+            if len(self.reserva) < self.tamano_reserva:
+                self.reserva.append(servidor)
+                return
+        servidor.detener()
 
-            # --- DEBUG ---
-            print(f"DEBUG - Servidor elegido: {servidor_elegido.id}, Carga del servidor: {servidor_elegido.carga:.2f}")
-            print(f"DEBUG - Tamaño de la cola después de asignar: {self.cola_solicitudes.qsize()}")
+    def _reponer_reserva(self):
+        """Arranca servidores hasta completar la reserva. Se llama con la condición adquirida."""
+        while len(self.reserva) + self._arrancando_reserva < self.tamano_reserva:
+            self._aprovisionar(para_reserva=True)
 
     def crear_servidor(self):
-        """Añade un nuevo servidor a la lista de servidores."""
-        if len(self.servidores) < self.num_servidores_max:
-            nuevo_servidor_id = len(self.servidores)
-            self.servidores.append(ServidorSimulado(nuevo_servidor_id))
-            print(f"Nuevo servidor creado con ID {nuevo_servidor_id}. Total de servidores: {len(self.servidores)}")
-        else:
-            print(f"No se pueden crear más servidores. Se ha alcanzado el límite máximo de {self.num_servidores_max} servidores.")
+        """
+        Añade un servidor a la lista de servidores sin bloquear: se activa uno de la
+        reserva si lo hay y, si no, se crea uno que arranca en segundo plano.
+        """
+        with self.condicion:
+            if len(self.servidores) >= self.num_servidores_max:
+                registro.info("No se pueden crear más servidores. Se ha alcanzado el límite máximo de {} servidores.",
+                              self.num_servidores_max)
+                return None
+            self.num_escalados += 1
+            if self.reserva:
+                nuevo_servidor = self.reserva.pop()
+                self.servidores.append(nuevo_servidor)
+                self._agregar_servidor(nuevo_servidor)
+                self.num_escalados_reserva += 1
+                self.tiempos_hasta_listo.append(0.0)
+                self.condicion.notify_all()
+                origen = "activado desde la reserva"
+            else:
+                nuevo_servidor = self._aprovisionar()
+                origen = "arrancando"
+            self._reponer_reserva()
+            total = len(self.servidores)
+        registro.info("Nuevo servidor con ID {} ({}). Total de servidores: {}", nuevo_servidor.id, origen, total)
+        return nuevo_servidor
 
     def eliminar_servidor(self):
-        """Elimina un servidor de la lista de servidores, si hay más de uno."""
-        if len(self.servidores) > 1:
+        """
+        Elimina un servidor de la lista de servidores, si hay más de uno. Si ya
+        estaba listo y queda hueco en la reserva, pasa a ella en lugar de detenerse.
+        """
+        with self.condicion:
+            if len(self.servidores) <= 1:
+                registro.info("No se pueden eliminar más servidores. Se ha alcanzado el mínimo de 1 servidor.")
+                return
             servidor_a_eliminar = self.servidores.pop()
-            print(f"Servidor {servidor_a_eliminar.id} eliminado. Total de servidores: {len(self.servidores)}")
-        else:
-            print("No se pueden eliminar más servidores. Se ha alcanzado el mínimo de 1 servidor.")
+            self._quitar_servidor(servidor_a_eliminar)
+            # Si aún arranca, `_arrancar` decide su destino al terminar
+            listo = not servidor_a_eliminar.arrancando
+            a_reserva = listo and len(self.reserva) < self.tamano_reserva
+            if a_reserva:
+                self.reserva.append(servidor_a_eliminar)
+            total = len(self.servidores)
+        if listo and not a_reserva:
+            servidor_a_eliminar.detener()
+        registro.info("Servidor {} eliminado. Total de servidores: {}", servidor_a_eliminar.id, total)
+
+    def estadisticas_aprovisionamiento(self):
+        """Tiempo hasta que los servidores pedidos están listos y uso de la reserva."""
+        with self.condicion:
+            tiempos = list(self.tiempos_hasta_listo)
+            return {
+                "servidores": len(self.servidores),
+                "arrancando": sum(1 for s in self.servidores if s.arrancando),
+                "reserva": len(self.reserva),
+                "tamano_reserva": self.tamano_reserva,
+                "escalados": self.num_escalados,
+                "escalados_desde_reserva": self.num_escalados_reserva,
+                "tasa_reserva": self.num_escalados_reserva / self.num_escalados if self.num_escalados else 0.0,
+                "tiempo_hasta_listo_medio": sum(tiempos) / len(tiempos) if tiempos else 0.0,
+                "tiempo_hasta_listo_max": max(tiempos, default=0.0)
+            }
+
+    def instantanea(self):
+        """
+        Estado actual para el historial de instantáneas (ver instantaneas.py): carga,
+        arranque y pendientes de cada servidor, cola y tasa de llegadas.
+        """
+        with self.condicion:
+            servidores = [{"id": s.id, "carga": s.carga, "arrancando": s.arrancando, "pendientes": s.pendientes}
+                          for s in self.servidores]
+            reserva = len(self.reserva)
+        return {
+            "tiempo": time.time(),
+            "servidores": servidores,
+            "num_servidores": len(servidores),
+            "arrancando": sum(1 for s in servidores if s["arrancando"]),
+            "reserva": reserva,
+            "cola": self.cola_solicitudes.qsize(),
+            "tasa_llegadas": self.estimador_llegadas.tasa_ewma(1.0)
+        }
 
     def comprobar_escalado(self):
-        """Comprueba la carga total y escala el número de servidores si es necesario."""
-        carga_total = sum(s.carga for s in self.servidores if not s.arrancando)
-        num_servidores_activos = sum(1 for s in self.servidores if not s.arrancando)
-        print(f"Carga total del sistema: {carga_total:.2f}, servidores activos: {num_servidores_activos}")
+        """
+        Comprueba la carga total y escala el número de servidores si es necesario.
+        Devuelve la acción aplicada con la codificación de la política de RL
+        (0 = nada, 1 = añadir servidor, 2 = quitar servidor).
+
+        No se llama al encolar: lo usa el Autoescalador cuando no hay política.
+        """
+        with self.condicion:
+            carga_total = self.flota.carga_total()
+            num_servidores_activos = len(self.flota) - self.flota.num_arrancando()
+        registro.debug("Carga total del sistema: {:.2f}, servidores activos: {}", carga_total, num_servidores_activos)
 
+        accion = 0
         if carga_total > self.umbral_escalado_superior and len(self.servidores) < self.num_servidores_max:
             self.crear_servidor()
-        elif carga_total < self.umbral_escalado_inferior and len(self.servidores) > 1:
+            accion = 1
+        elif (carga_total < self.umbral_escalado_inferior and len(self.servidores) > 1
+              and not self.trafico_en_aumento()):
             self.eliminar_servidor()
+            accion = 2
         self.imprimir_estado()
+        return accion
+
+    def trafico_en_aumento(self):
+        """True si la tasa de llegadas reciente (1 s) supera claramente a la de largo plazo (60 s)."""
+        tasas = self.estimador_llegadas.tasas_ewma()
+        return tasas[-1] > 0 and tasas[0] > self.factor_tendencia_subida * tasas[-1]
 
     def imprimir_estado(self):
         """Imprime el estado actual de los servidores y la cola de solicitudes."""
         ahora = time.time()
         if ahora - self.ultimo_tiempo_impresion > self.intervalo_impresion:
-            print("\n--- Estado del Sistema ---")
+            registro.info("\n--- Estado del Sistema ---")
             for servidor in self.servidores:
-                print(f"Servidor {servidor.id}: Carga actual = {servidor.carga:.2f}, Arrancando = {servidor.arrancando}")
-            print(f"Longitud de la cola de solicitudes: {self.cola_solicitudes.qsize()}")
-            print("--------------------------\n")
+                registro.info("Servidor {}: Carga actual = {:.2f}, Arrancando = {}", servidor.id, servidor.carga,
+                              servidor.arrancando)
+            registro.info("Longitud de la cola de solicitudes: {}", self.cola_solicitudes.qsize())
+            registro.info("Servidores en reserva: {}/{}", len(self.reserva), self.tamano_reserva)
+            registro.info("--------------------------\n")
             self.ultimo_tiempo_impresion = ahora
             
-    def calcular_tasa_llegadas(self):
+    def calcular_tasa_llegadas(self, horizonte=10.0):
         """
-        Calcula la tasa de llegadas promedio (lambda) en solicitudes por segundo.
+        Calcula la tasa de llegadas (lambda) en solicitudes por segundo, como media
+        exponencial sobre el horizonte indicado (1, 10 o 60 segundos).
         """
-        if len(self.tiempos_llegada) < 2:
-            return 0  # No hay suficientes datos para calcular la tasa
-
-        # Calcular las diferencias de tiempo entre llegadas consecutivas
-        diferencias_tiempo = np.diff(self.tiempos_llegada)
-
-        # Calcular la tasa de llegadas promedio (lambda)
-        tasa_llegadas = 1 / np.mean(diferencias_tiempo)
-        return tasa_llegadas
\ No newline at end of file
+        return self.estimador_llegadas.tasa_ewma(horizonte)
\ No newline at end of file
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class Autoescalador:
+    """
+    Bucle de control que decide el escalado en segundo plano, fuera del camino
+    de las solicitudes HTTP.
+
+    Cada `intervalo` segundos toma el estado del entorno, consulta la política
+    de RL y aplica la acción sobre el asignador de recursos. Sin política
+    (`politica=None`) aplica en su lugar los umbrales de carga de
+    `AsignadorRecursos.comprobar_escalado`: en ambos casos hay un único
+    controlador del escalado.
+    """
+
+    def __init__(self, entorno, politica, intervalo=1.0, max_estados_grabados=10000):
+        self.entorno = entorno
+        self.politica = politica
+        self.intervalo = intervalo
+        self.num_decisiones = 0
+        self.ultima_accion = None
+        self.estados_recientes = deque(maxlen=max_estados_grabados)  # Para verificar políticas exportadas
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        """Arranca el hilo del bucle de control si no está ya en marcha."""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="autoescalador", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Detiene el bucle de control y espera a que termine."""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def decidir(self):
+        """Ejecuta una única decisión de escalado y devuelve la acción aplicada."""
+        asignador_recursos = self.entorno.asignador_recursos
+        politica = self.politica  # Se puede asignar desde otro hilo al terminar de cargarla
+        # Se graba también con umbrales: sirve para verificar una política antes de activarla
+        estado = self.entorno._get_estado()
+        self.estados_recientes.append(estado)
+        if politica is None:
+            accion = asignador_recursos.comprobar_escalado()
+        else:
+            accion, _ = politica.predict(estado, deterministic=True)
+            accion = int(accion)
+            if accion == 1:
+                asignador_recursos.crear_servidor()
+            elif accion == 2:
+                asignador_recursos.eliminar_servidor()
+
+        self.num_decisiones += 1
+        self.ultima_accion = accion
+        return accion
+
+    def guardar_estados(self, ruta):
+        """
+        Guarda en un `.npy` las últimas observaciones vistas por el bucle de control
+        (las que admite `politica_numpy.py --observaciones`). Devuelve cuántas son.
+        """
+        estados = list(self.estados_recientes)  # Copia: el bucle puede seguir añadiendo
+        forma = (len(estados),) + self.entorno.observation_space.shape
+        np.save(ruta, np.array(estados, dtype=np.float32).reshape(forma))
+        return len(estados)
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            inicio = time.time()
+            try:
+                self.decidir()
+            except Exception as e:
+                print(f"Error en el bucle de autoescalado: {e}")
+            # Mantener la cadencia descontando el tiempo de la propia decisión
+            espera = self.intervalo - (time.time() - inicio)
+            self._detener.wait(max(0.0, espera))
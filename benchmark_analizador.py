@@ -0,0 +1,88 @@
+import argparse
+import ast
+import glob
+import time
+
+from analizador_solicitudes import AnalizadorSolicitudes
+
+class AnalizadorLegado:
+    """Implementación anterior: minúsculas y búsqueda de subcadenas en cada comprobación (referencia)."""
+
+    def analizar(self, texto_solicitud):
+        longitud = len(texto_solicitud)
+        tipo = "simple"
+        if "código" in texto_solicitud.lower() or "ejecutar" in texto_solicitud.lower():
+            tipo = "codigo"
+        elif "análisis" in texto_solicitud.lower() or "predicción" in texto_solicitud.lower():
+            tipo = "compleja"
+        return {"longitud": longitud, "tipo": tipo}
+
+def textos_de_script(ruta):
+    """
+    Textos de la variable `texts` (diccionario por tipo o lista) de un script de carga.
+    Se leen con ast, sin importarlo: los scripts lanzan peticiones HTTP al ejecutarse.
+    """
+    with open(ruta, encoding="utf-8") as f:
+        arbol = ast.parse(f.read(), filename=ruta)
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "texts" for t in nodo.targets):
+            valor = ast.literal_eval(nodo.value)
+            return [texto for lista in valor.values() for texto in lista] if isinstance(valor, dict) else list(valor)
+    return []
+
+def cargar_textos():
+    textos = []
+    for ruta in ["generador_carga.py"] + sorted(glob.glob("usuario_*.py")):
+        textos.extend(textos_de_script(ruta))
+    return textos
+
+def medir(funcion, repeticiones):
+    """Segundos por llamada (mejor de `repeticiones`)."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendimiento y paridad del clasificador de solicitudes.")
+    parser.add_argument("--textos", type=int, default=100_000, help="Textos por medida (se repiten los de los scripts)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    base = cargar_textos()
+    textos = (base * (args.textos // len(base) + 1))[:args.textos]
+    # Los mismos textos, todos distintos: analizar_batch no puede reutilizar clasificaciones
+    unicos = [f"{texto} #{i}" for i, texto in enumerate(textos)]
+    print(f"{len(base)} textos distintos de generador_carga.py y usuario_*.py, {len(textos):,} por medida")
+
+    legado = AnalizadorLegado()
+    analizador = AnalizadorSolicitudes()
+    sin_acentos = AnalizadorSolicitudes(insensible_acentos=True)
+
+    # Con la tabla por defecto la clasificación debe ser idéntica a la anterior
+    esperado = [legado.analizar(t) for t in base]
+    if analizador.analizar_batch(base) != esperado:
+        raise AssertionError("La clasificación no coincide con la implementación anterior")
+    cambios = [(t, e["tipo"], r["tipo"]) for t, e, r in zip(base, esperado, sin_acentos.analizar_batch(base))
+               if e["tipo"] != r["tipo"]]
+    print(f"Sin acentos cambian {len(cambios)} textos:")
+    for texto, antes, despues in cambios:
+        print(f"  {texto!r}: {antes} -> {despues}")
+
+    medidas = {
+        "anterior (analizar)": lambda: [legado.analizar(t) for t in textos],
+        "reglas (analizar)": lambda: [analizador.analizar(t) for t in textos],
+        "reglas (analizar_batch)": lambda: analizador.analizar_batch(textos),
+        "anterior, textos únicos": lambda: [legado.analizar(t) for t in unicos],
+        "reglas, textos únicos (analizar_batch)": lambda: analizador.analizar_batch(unicos),
+        "reglas sin acentos (analizar_batch)": lambda: sin_acentos.analizar_batch(textos)
+    }
+    print(f"\n{'clasificador':<38}{'textos/s':>12}{'µs/texto':>10}")
+    for nombre, funcion in medidas.items():
+        segundos = medir(funcion, args.repeticiones)
+        print(f"{nombre:<38}{len(textos) / segundos:>12,.0f}{segundos / len(textos) * 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# Importa la aplicación y mide hasta que queda lista para atender solicitudes
+CODIGO_ARRANQUE = "import app; app.app.test_client().get('/num_servidores')"
+
+def medir_arranque():
+    """Lanza un proceso nuevo que importa app.py y devuelve los segundos que tarda."""
+    inicio = time.perf_counter()
+    resultado = subprocess.run([sys.executable, "-c", CODIGO_ARRANQUE],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    duracion = time.perf_counter() - inicio
+    if resultado.returncode != 0:
+        raise RuntimeError(f"La aplicación no arrancó:\n{resultado.stderr}")
+    return duracion
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el tiempo de arranque de app.py en modo servicio.")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--limite", type=float, default=1.0, help="Segundos máximos (mediana) antes de fallar")
+    args = parser.parse_args()
+
+    tiempos = [medir_arranque() for _ in range(args.repeticiones)]
+    mediana = statistics.median(tiempos)
+    print(f"Arranque de app.py ({args.repeticiones} repeticiones): "
+          f"mediana {mediana:.3f} s, mínimo {min(tiempos):.3f} s, máximo {max(tiempos):.3f} s")
+
+    if mediana > args.limite:
+        print(f"REGRESIÓN: el arranque supera el límite de {args.limite:.2f} s")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from carga_datos import cargar_datos_entrenamiento
+
+TIPOS = ["simple", "compleja", "codigo", "desconocido"]
+
+def generar_csv(ruta, num_filas, semilla=0):
+    """CSV con las columnas que escribe la simulación; una de cada 1000 filas sin 'caracteristicas' válidas."""
+    rng = np.random.default_rng(semilla)
+    longitud = rng.integers(5, 200, num_filas)
+    tipo = rng.choice(TIPOS, num_filas)
+    demanda = rng.gamma(2.0, 1.0, num_filas)
+    caracteristicas = pd.Series([f'{{"demanda_predicha": {d}, "longitud": {l}, "tipo": "{t}"}}'
+                                 for d, l, t in zip(demanda, longitud, tipo)])
+    caracteristicas[::1000] = "{}"
+    pd.DataFrame({
+        "tiempo_inicio": "2024-12-24 00:00:00",
+        "user_id": "user_basico_1",
+        "texto_solicitud": "Duda sobre la factura",
+        "caracteristicas": caracteristicas,
+        "demanda_predicha": demanda,
+        "servidor_asignado": "encolada"
+    }).to_csv(ruta, index=False)
+
+def cargar_antes(ruta_csv):
+    """Lo que hacía cargar_datos_entrenamiento antes: json.loads e iterrows fila a fila (sin los print)."""
+    df = pd.read_csv(ruta_csv)
+
+    def limpiar(x):
+        try:
+            return json.loads(x.strip().replace('\n', '').replace("'", '"')) if isinstance(x, str) else {}
+        except json.JSONDecodeError:
+            return {}
+
+    df['caracteristicas'] = df['caracteristicas'].apply(limpiar)
+    X, y = [], []
+    for _, row in df.iterrows():
+        c = row['caracteristicas']
+        if "longitud" not in c or "tipo" not in c:
+            continue
+        X.append([c["longitud"], 1 if c["tipo"] == "simple" else 0, 1 if c["tipo"] == "compleja" else 0,
+                  1 if c["tipo"] == "codigo" else 0])
+        y.append(row['demanda_predicha'])
+    return np.array(X), np.array(y)
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return time.perf_counter() - inicio, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de carga de los datos de entrenamiento, antes y ahora.")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-antes", type=int, default=100_000,
+                        help="Tamaño máximo al que se mide la carga fila a fila")
+    parser.add_argument("--csv", nargs="*", default=[], help="CSV existentes con los que comprobar que X e y coinciden")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="benchmark_carga_datos_")
+    cache = os.path.join(directorio, "cache")
+    try:
+        for ruta in args.csv:
+            X_antes, y_antes = cargar_antes(ruta)
+            X, y = cargar_datos_entrenamiento(ruta, directorio_cache=cache)
+            iguales = np.array_equal(X_antes, X) and np.array_equal(y_antes, y, equal_nan=True)
+            print(f"{ruta}: {len(y)} filas, {'coinciden' if iguales else 'NO coinciden'}")
+
+        print(f"{'filas':>12}{'MB':>8}{'antes (s)':>11}{'sin caché (s)':>15}{'1ª carga (s)':>14}{'con caché (ms)':>16}")
+        for num_filas in args.filas:
+            ruta = os.path.join(directorio, f"datos_{num_filas}.csv")
+            generar_csv(ruta, num_filas)
+            megas = os.path.getsize(ruta) / 1e6
+            antes = "-"
+            if num_filas <= args.max_antes:
+                antes, (X_antes, y_antes) = medir(lambda: cargar_antes(ruta))
+                antes = f"{antes:.2f}"
+            sin_cache, (X, y) = medir(lambda: cargar_datos_entrenamiento(ruta, directorio_cache=None))
+            if num_filas <= args.max_antes:
+                assert np.array_equal(X_antes, X) and np.array_equal(y_antes, y)
+            primera, _ = medir(lambda: cargar_datos_entrenamiento(ruta, directorio_cache=cache))
+            cacheada, (X_cache, y_cache) = medir(lambda: cargar_datos_entrenamiento(ruta, directorio_cache=cache))
+            assert np.array_equal(X, X_cache) and np.array_equal(y, y_cache)
+            print(f"{num_filas:>12,}{megas:>8.1f}{antes:>11}{sin_cache:>15.2f}{primera:>14.2f}{cacheada * 1000:>16.2f}",
+                  flush=True)
+            os.remove(ruta)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
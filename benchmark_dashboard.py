@@ -0,0 +1,91 @@
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from almacen_datos import AlmacenDatos
+
+COLUMNAS = ["tiempo_inicio", "demanda_predicha", "tiempo_espera", "tiempo_respuesta"]
+CALLBACKS_POR_INTERVALO = 4
+
+def obtener_datos_completo(ruta):
+    """El obtener_datos() anterior del dashboard: relee y analiza el CSV entero."""
+    df = pd.read_csv(ruta)
+    df = df.replace([np.inf, -np.inf], np.nan).dropna()
+    if 'caracteristicas' in df.columns:
+        df['caracteristicas'] = df['caracteristicas'].apply(lambda x: json.loads(x.replace("'", '"')) if isinstance(x, str) else x)
+    df['tiempo_inicio'] = pd.to_datetime(df['tiempo_inicio'])
+    df['tiempo_respuesta'] = 0.0
+    return df
+
+class GeneradorFilas:
+    """Añade al CSV filas tomadas en bucle de una simulación real."""
+
+    def __init__(self, ruta_origen):
+        with open(ruta_origen, "rb") as archivo:
+            lineas = archivo.readlines()
+        self.cabecera = lineas[0]
+        self._filas = itertools.cycle(lineas[1:])
+
+    def anadir(self, ruta, num_filas):
+        with open(ruta, "ab") as archivo:
+            archivo.write(b"".join(itertools.islice(self._filas, num_filas)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de refresco del dashboard según crece el CSV de la simulación.")
+    parser.add_argument("--origen", default="datos_simulacion.csv", help="CSV del que se copian las filas")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--filas-por-intervalo", type=int, default=1000, help="Filas añadidas entre dos refrescos")
+    parser.add_argument("--max-completo", type=int, default=1_000_000,
+                        help="Tamaño máximo al que se mide la relectura completa (tarda y ocupa mucha memoria)")
+    parser.add_argument("--max-filas", type=int, default=200_000)
+    parser.add_argument("--intervalos", type=int, default=5)
+    args = parser.parse_args()
+
+    generador = GeneradorFilas(args.origen)
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "datos_simulacion.csv")
+        with open(ruta, "wb") as archivo:
+            archivo.write(generador.cabecera)
+        almacen = AlmacenDatos(ruta, max_filas=args.max_filas, columnas=COLUMNAS, vigencia=0)
+        almacen.refrescar()
+        filas = 0
+
+        print(f"{'filas':>12}{'MB':>8}{'arranque (s)':>14}{'refresco (ms)':>15}{'relectura x4 (s)':>18}")
+        for tamano in args.tamanos:
+            generador.anadir(ruta, tamano - filas)
+            filas = tamano
+
+            # Arranque en frío: solo se leen las últimas max_filas filas
+            inicio = time.perf_counter()
+            AlmacenDatos(ruta, max_filas=args.max_filas, columnas=COLUMNAS).obtener()
+            arranque = time.perf_counter() - inicio
+
+            # Refresco en caliente por intervalo (los cuatro callbacks comparten uno)
+            almacen.refrescar()
+            tiempos = []
+            for _ in range(args.intervalos):
+                generador.anadir(ruta, args.filas_por_intervalo)
+                inicio = time.perf_counter()
+                for _ in range(CALLBACKS_POR_INTERVALO):
+                    almacen.obtener()
+                tiempos.append(time.perf_counter() - inicio)
+                filas += args.filas_por_intervalo
+            refresco = np.median(tiempos) * 1000
+
+            completo = "-"
+            if tamano <= args.max_completo:
+                inicio = time.perf_counter()
+                for _ in range(CALLBACKS_POR_INTERVALO):
+                    obtener_datos_completo(ruta)
+                completo = f"{time.perf_counter() - inicio:.2f}"
+            megas = os.path.getsize(ruta) / 1e6
+            print(f"{filas:>12,}{megas:>8,.0f}{arranque:>14.3f}{refresco:>15.1f}{completo:>18}", flush=True)
+
+if __name__ == "__main__":
+    main()
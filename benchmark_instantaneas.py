@@ -0,0 +1,37 @@
+import argparse
+import time
+
+from asignador_recursos import AsignadorRecursos
+from instantaneas import HistorialInstantaneas
+from registro_eventos import DESACTIVADO, registro
+
+def medir_captura(num_servidores, repeticiones):
+    """Microsegundos por captura (estado del asignador serializado a JSON) y por consulta de 50 nuevas."""
+    asignador = AsignadorRecursos(num_servidores, demand_predictor=None, num_servidores_max=num_servidores)
+    historial = HistorialInstantaneas(asignador.instantanea, capacidad=repeticiones)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        historial.capturar_ahora()
+    captura = (time.perf_counter() - inicio) / repeticiones * 1e6
+
+    cursor = historial.ultima_secuencia - 50
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        historial.desde(cursor)
+    consulta = (time.perf_counter() - inicio) / repeticiones * 1e6
+    return captura, consulta, len(historial.desde(cursor)[-1][1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste de capturar y servir las instantáneas del balanceador.")
+    parser.add_argument("--servidores", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    args = parser.parse_args()
+
+    registro.configurar(DESACTIVADO)
+    print(f"{'servidores':>10}{'captura (µs)':>14}{'% de CPU a 10 Hz':>18}{'50 nuevas (µs)':>16}{'bytes':>8}")
+    for num_servidores in args.servidores:
+        captura, consulta, tamano = medir_captura(num_servidores, args.repeticiones)
+        print(f"{num_servidores:>10}{captura:>14.1f}{captura * 10 / 1e4:>18.3f}{consulta:>16.1f}{tamano:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from asignador_recursos import DemandPredictor, PredictorNumPy
+
+TAMANOS_LOTE = [1, 32, 1024]
+
+def generar_caracteristicas(n, rng):
+    """Genera `n` solicitudes sintéticas con la misma forma que las del analizador."""
+    tipos = ["simple", "compleja", "codigo"]
+    return [{"longitud": int(rng.integers(5, 150)), "tipo": tipos[rng.integers(0, 3)]} for _ in range(n)]
+
+def verificar_paridad(predictor_keras, predictor_numpy, caracteristicas, tolerancia=1e-4):
+    """
+    Compara las predicciones de Keras y de NumPy sobre las mismas entradas.
+
+    Returns:
+        float: La diferencia absoluta máxima encontrada.
+    """
+    matriz = np.array([predictor_keras._vector_caracteristicas(f) for f in caracteristicas], dtype=np.float64)
+    matriz = (matriz - predictor_keras.mean) / predictor_keras.std
+
+    esperado = predictor_keras.model.predict(matriz, verbose=0)[:, 0]
+    obtenido = predictor_numpy._inferir(matriz)
+
+    diferencia = float(np.max(np.abs(esperado - obtenido)))
+    if diferencia > tolerancia:
+        raise AssertionError(f"Paridad Keras/NumPy fallida: diferencia máxima {diferencia:.2e} > {tolerancia:.0e}")
+    return diferencia
+
+def medir(funcion, repeticiones):
+    """Devuelve el tiempo medio por llamada en microsegundos."""
+    funcion()  # Calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Paridad y latencia del predictor NumPy frente a Keras.")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directorio:
+        # Entrenar un modelo de referencia sin tocar el modelo real del proyecto
+        predictor_keras = DemandPredictor(model_path=os.path.join(directorio, "modelo.h5"))
+        caracteristicas = generar_caracteristicas(500, rng)
+        X = np.array([predictor_keras._vector_caracteristicas(f) for f in caracteristicas])
+        y = 1 + X[:, 0] * 0.02 + X[:, 2] * 2 + X[:, 3] * 4
+        predictor_keras.train(X, y, epochs=args.epochs)
+
+        ruta_npz = predictor_keras.exportar_numpy(os.path.join(directorio, "modelo.npz"))
+        predictor_numpy = PredictorNumPy.cargar(ruta_npz)
+
+        diferencia = verificar_paridad(predictor_keras, predictor_numpy, generar_caracteristicas(2048, rng))
+        print(f"\nParidad Keras/NumPy correcta. Diferencia máxima: {diferencia:.2e}")
+
+        print(f"\n{'lote':>6} {'keras (us)':>12} {'numpy (us)':>12} {'aceleración':>12}")
+        for tamano in TAMANOS_LOTE:
+            matriz = np.array([predictor_keras._vector_caracteristicas(f)
+                               for f in generar_caracteristicas(tamano, rng)], dtype=np.float64)
+            matriz = (matriz - predictor_keras.mean) / predictor_keras.std
+            repeticiones = max(10, args.repeticiones // max(1, tamano // 32))
+
+            t_keras = medir(lambda: predictor_keras.model.predict(matriz, verbose=0), max(10, repeticiones // 10))
+            t_numpy = medir(lambda: predictor_numpy._inferir(matriz), repeticiones)
+            print(f"{tamano:>6} {t_keras:>12.1f} {t_numpy:>12.1f} {t_keras / t_numpy:>11.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+from benchmark_solicitudes import medir_individual
+from registro_eventos import DEBUG, DESACTIVADO, INFO, RegistroEventos, registro
+
+# (nombre, nivel, muestreo, síncrono); el primero reproduce los print() anteriores
+MODOS = [
+    ("print síncrono, todo (antes)", DEBUG, {}, True),
+    ("asíncrono, DEBUG", DEBUG, {}, False),
+    ("asíncrono, INFO", INFO, {}, False),
+    ("asíncrono, INFO al 1%", INFO, {INFO: 0.01}, False),
+    ("desactivado", DESACTIVADO, {}, False)
+]
+
+def coste_evento(nivel, muestreo, sincrono, salida, repeticiones=200_000):
+    """Nanosegundos por llamada a `info` desde el hilo que la hace (sin contar el hilo escritor)."""
+    r = RegistroEventos(nivel=nivel, muestreo=muestreo, salida=salida, sincrono=sincrono,
+                        capacidad=repeticiones + 1, intervalo=3600)
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        r.info("Solicitud de usuario {} encolada. Demanda predicha: {:.2f}", i, 1.2345)
+    return (time.perf_counter() - inicio) / repeticiones * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste del registro de eventos y su efecto en /solicitud.")
+    parser.add_argument("--solicitudes", type=int, default=2000)
+    parser.add_argument("--puerto", type=int, default=5058)
+    args = parser.parse_args()
+
+    salida = sys.stdout
+    with tempfile.TemporaryFile("w") as archivo:
+        # Los eventos van a un archivo, como en un despliegue con la salida redirigida
+        print(f"{'modo':<32}{'ns/evento':>10}", file=salida)
+        for nombre, nivel, muestreo, sincrono in MODOS:
+            print(f"{nombre:<32}{coste_evento(nivel, muestreo, sincrono, archivo):>10,.0f}", file=salida)
+
+        # El resto de mensajes de la aplicación (arranque, etc.) no se miden
+        sys.stdout = open(os.devnull, "w")
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        import app
+
+        servidor = make_server("127.0.0.1", args.puerto, app.app, threaded=True)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{args.puerto}"
+        sesion = requests.Session()
+        registro.salida = archivo
+
+        print(f"\n{'modo':<32}{'/solicitud por s':>17}{'eventos escritos':>18}", file=salida)
+        for nombre, nivel, muestreo, sincrono in MODOS:
+            registro.configurar(nivel, muestreo, sincrono)
+            escritos = registro.escritos
+            tasa = medir_individual(sesion, url, args.solicitudes)
+            registro.vaciar()
+            print(f"{nombre:<32}{tasa:>17,.0f}{registro.escritos - escritos:>18,}", file=salida, flush=True)
+        servidor.shutdown()
+        registro.configurar(DESACTIVADO)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import time
+
+import numpy as np
+
+from analizador_solicitudes import REGLAS_TIPO, TIPO_POR_DEFECTO
+from gestor_usuarios import PERFILES
+from rollups import AlmacenRollups
+
+TIPOS = [tipo for tipo, _ in REGLAS_TIPO] + [TIPO_POR_DEFECTO]
+
+def poblar(rollups, num_solicitudes, inicio, duracion, semilla=0):
+    """Registra `num_solicitudes` repartidas en `duracion` segundos; devuelve µs por `registrar` y por agregación."""
+    rng = np.random.default_rng(semilla)
+    tiempos = (inicio + np.sort(rng.random(num_solicitudes)) * duracion).tolist()
+    tipos = rng.choice(TIPOS, num_solicitudes).tolist()
+    perfiles = rng.choice(PERFILES, num_solicitudes).tolist()
+    esperas = rng.lognormal(-2, 1, num_solicitudes).tolist()
+    procesamientos = rng.lognormal(0, 0.5, num_solicitudes).tolist()
+
+    rollups._hilo = False  # Sin hilo de fondo: se agrega a mano para medirlo aparte
+    registrar = rollups.registrar
+    coste_registro = coste_agregacion = 0.0
+    for bloque in range(0, num_solicitudes, 100_000):
+        fin = min(bloque + 100_000, num_solicitudes)
+        t = time.perf_counter()
+        for i in range(bloque, fin):
+            registrar(tipos[i], perfiles[i], esperas[i], procesamientos[i], tiempos[i])
+        coste_registro += time.perf_counter() - t
+        t = time.perf_counter()
+        rollups.vaciar()
+        coste_agregacion += time.perf_counter() - t
+    return coste_registro / num_solicitudes * 1e6, coste_agregacion / num_solicitudes * 1e6
+
+def medir_consulta(rollups, paso, desde, hasta, repeticiones=20):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        puntos = rollups.consultar(paso, desde, hasta)
+    return (time.perf_counter() - inicio) / repeticiones * 1000, len(puntos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste de los rollups y de sus consultas según el volumen registrado.")
+    parser.add_argument("--solicitudes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--duracion", type=float, default=6 * 3600, help="Segundos que abarcan las solicitudes")
+    args = parser.parse_args()
+
+    inicio = 1_700_000_000.0
+    fin = inicio + args.duracion
+    consultas = [("15 min a 1 s", 1, fin - 900), ("6 h a 1 min", 60, inicio), ("6 h a 1 h", 3600, inicio)]
+    cabecera = "".join(f"{nombre + ' (ms)':>20}" for nombre, _, _ in consultas)
+    print(f"{'solicitudes':>12}{'registrar (µs)':>16}{'agregar (µs)':>14}{cabecera}")
+    for num_solicitudes in args.solicitudes:
+        rollups = AlmacenRollups(TIPOS, PERFILES)
+        registro, agregacion = poblar(rollups, num_solicitudes, inicio, args.duracion)
+        tiempos = "".join(f"{medir_consulta(rollups, paso, desde, fin)[0]:>20.2f}" for _, paso, desde in consultas)
+        print(f"{num_solicitudes:>12,}{registro:>16.2f}{agregacion:>14.2f}{tiempos}", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from estrategias_seleccion import ESTRATEGIAS, crear_estrategia
+from simulador_eventos import ServidorVirtual, SimuladorEventos, llegadas_poisson
+
+MAX_PENDIENTES = 2
+TIEMPO_MEDIO_PROCESAMIENTO = 0.875  # Media de calcular_tiempo_procesamiento con las llegadas de llegadas_poisson
+
+class BarridoLineal:
+    """Selección anterior: recorre todos los servidores en cada reparto (referencia)."""
+
+    def __init__(self, servidores):
+        self.servidores = servidores
+
+    def agregar(self, servidor):
+        pass
+
+    def actualizar(self, servidor):
+        pass
+
+    def elegir(self):
+        candidatos = [s for s in self.servidores if not s.arrancando and s.pendientes < MAX_PENDIENTES]
+        if not candidatos:
+            return None
+        return min(candidatos, key=lambda s: (s.carga, s.pendientes))
+
+def medir_coste_reparto(nombre, num_servidores, operaciones, semilla=0):
+    """
+    Microsegundos por reparto: elegir servidor, entregarle la solicitud y, después,
+    terminar una solicitud entregada antes (cada una actualiza la estructura).
+    """
+    rng = random.Random(semilla)
+    servidores = [ServidorVirtual(i, capacidad=rng.choice((0.5, 1.0, 2.0))) for i in range(num_servidores)]
+    estrategia = BarridoLineal(servidores) if nombre == "lineal" else crear_estrategia(nombre, MAX_PENDIENTES, semilla)
+    for servidor in servidores:
+        estrategia.agregar(servidor)
+
+    en_curso = []
+    inicio = time.perf_counter()
+    for _ in range(operaciones):
+        # Mantener ocupada la mitad de la capacidad para que haya servidores llenos y libres
+        if len(en_curso) >= num_servidores:
+            servidor, tiempo = en_curso.pop(rng.randrange(len(en_curso)))
+            servidor.pendientes -= 1
+            servidor.carga -= tiempo
+            estrategia.actualizar(servidor)
+        servidor = estrategia.elegir()
+        tiempo = rng.uniform(0.3, 1.5)
+        servidor.pendientes += 1
+        servidor.carga += tiempo
+        estrategia.actualizar(servidor)
+        en_curso.append((servidor, tiempo))
+    return (time.perf_counter() - inicio) / operaciones * 1e6
+
+def medir_latencia(nombre, num_servidores, utilizacion, duracion, semilla=0):
+    """Simula `duracion` segundos virtuales con la estrategia y devuelve percentiles del tiempo de respuesta."""
+    capacidades = (0.5, 1.0, 2.0)
+    capacidad_total = sum(capacidades[i % len(capacidades)] for i in range(num_servidores))
+    tasa = utilizacion * capacidad_total / TIEMPO_MEDIO_PROCESAMIENTO
+    simulador = SimuladorEventos(llegadas_poisson(tasa, semilla), num_servidores, num_servidores,
+                                 escalado_por_umbral=False, semilla=semilla, estrategia=nombre,
+                                 capacidades=capacidades, guardar_tiempos_respuesta=True)
+    inicio = time.perf_counter()
+    simulador.avanzar(duracion)
+    tiempo_real = time.perf_counter() - inicio
+    tiempos = np.array(simulador.tiempos_respuesta)
+    return {
+        "completadas": len(tiempos),
+        "en_cola": len(simulador.cola_solicitudes),
+        "p50": float(np.percentile(tiempos, 50)),
+        "p99": float(np.percentile(tiempos, 99)),
+        "max": float(tiempos.max()),
+        "us_por_llegada": tiempo_real / max(simulador.num_llegadas, 1) * 1e6
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el coste de reparto y la latencia de cola de cada estrategia de selección.")
+    parser.add_argument("--servidores", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--operaciones", type=int, default=20000)
+    parser.add_argument("--servidores-latencia", type=int, default=300)
+    parser.add_argument("--utilizacion", type=float, default=0.9)
+    parser.add_argument("--duracion", type=float, default=60.0, help="Segundos virtuales simulados")
+    args = parser.parse_args()
+
+    nombres = ["lineal"] + list(ESTRATEGIAS)
+    print("Coste de reparto (µs por solicitud)")
+    print(f"{'estrategia':<24}" + "".join(f"{n:>10}" for n in args.servidores))
+    for nombre in nombres:
+        costes = [medir_coste_reparto(nombre, n, args.operaciones) for n in args.servidores]
+        print(f"{nombre:<24}" + "".join(f"{c:>10.2f}" for c in costes))
+
+    print(f"\nLatencia con {args.servidores_latencia} servidores heterogéneos (capacidad 0.5/1/2) "
+          f"al {args.utilizacion:.0%} de utilización, {args.duracion:.0f} s virtuales")
+    print(f"{'estrategia':<24}{'completadas':>12}{'en cola':>9}{'p50 (s)':>9}{'p99 (s)':>9}{'max (s)':>9}{'µs/llegada':>12}")
+    for nombre in nombres[1:]:
+        r = medir_latencia(nombre, args.servidores_latencia, args.utilizacion, args.duracion)
+        print(f"{nombre:<24}{r['completadas']:>12}{r['en_cola']:>9}{r['p50']:>9.3f}{r['p99']:>9.3f}"
+              f"{r['max']:>9.3f}{r['us_por_llegada']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+TEXTOS = ["Consulta general", "Análisis de datos y predicciones", "Ejecución de código Python",
+          "Estado de mi pedido", "Informe detallado", "Depuración de código"]
+
+def solicitud(i):
+    return {"user_id": f"usuario_{i % 1000}", "texto": TEXTOS[i % len(TEXTOS)]}
+
+def medir_individual(sesion, url, num_solicitudes):
+    """Solicitudes/s enviando cada una en su propia llamada a /solicitud."""
+    inicio = time.perf_counter()
+    for i in range(num_solicitudes):
+        respuesta = sesion.post(f"{url}/solicitud", json=solicitud(i))
+        respuesta.raise_for_status()
+    return num_solicitudes / (time.perf_counter() - inicio)
+
+def medir_lotes(sesion, url, tamano_lote, num_solicitudes, ndjson):
+    """Solicitudes/s enviando lotes de `tamano_lote` a /solicitudes (array JSON o NDJSON)."""
+    num_lotes = max(num_solicitudes // tamano_lote, 1)
+    inicio = time.perf_counter()
+    for n in range(num_lotes):
+        lote = [solicitud(n * tamano_lote + i) for i in range(tamano_lote)]
+        if ndjson:
+            cuerpo = "".join(json.dumps(s) + "\n" for s in lote)
+            respuesta = sesion.post(f"{url}/solicitudes", data=cuerpo.encode(),
+                                    headers={"Content-Type": "application/x-ndjson"})
+            resultados = [json.loads(linea) for linea in respuesta.content.splitlines()]
+        else:
+            respuesta = sesion.post(f"{url}/solicitudes", json=lote)
+            resultados = respuesta.json()
+        respuesta.raise_for_status()
+        if len(resultados) != tamano_lote or any("error" in r for r in resultados):
+            raise AssertionError(f"Respuesta incompleta o con errores en un lote de {tamano_lote}")
+    return num_lotes * tamano_lote / (time.perf_counter() - inicio)
+
+def main():
+    parser = argparse.ArgumentParser(description="Solicitudes/s de /solicitudes por lotes frente a /solicitud.")
+    parser.add_argument("--solicitudes", type=int, default=2000, help="Solicitudes por medida")
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--puerto", type=int, default=5057)
+    args = parser.parse_args()
+
+    # La aplicación imprime varias líneas por solicitud (también al procesarlas en
+    # segundo plano): se descartan hasta el final para no medir la consola
+    salida = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # Sin una línea de log por petición
+    import app
+
+    servidor = make_server("127.0.0.1", args.puerto, app.app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{args.puerto}"
+    sesion = requests.Session()
+
+    print(f"{'endpoint':<28}{'lote':>6}{'solicitudes/s':>15}", file=salida)
+    tasa = medir_individual(sesion, url, args.solicitudes)
+    print(f"{'/solicitud':<28}{'-':>6}{tasa:>15,.0f}", file=salida, flush=True)
+    for tamano in args.lotes:
+        for ndjson in (False, True):
+            formato = "NDJSON" if ndjson else "array JSON"
+            tasa = medir_lotes(sesion, url, tamano, max(args.solicitudes, tamano), ndjson)
+            print(f"{f'/solicitudes ({formato})':<28}{tamano:>6}{tasa:>15,.0f}", file=salida, flush=True)
+    servidor.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+import dashboard
+
+def historial(num_filas, semilla=0):
+    """Filas como las del CSV de la simulación: una solicitud cada ~10 ms durante num_filas."""
+    rng = np.random.default_rng(semilla)
+    tiempos = np.datetime64("2024-12-24T00:00:00") + np.cumsum(rng.exponential(10, num_filas)).astype("timedelta64[ms]")
+    return pd.DataFrame({
+        "tiempo_inicio": tiempos.astype("datetime64[ns]"),
+        "demanda_predicha": rng.gamma(2.0, 1.0, num_filas),
+        "tiempo_espera": np.abs(np.cumsum(rng.normal(0, 0.05, num_filas))),
+        "tiempo_respuesta": rng.gamma(2.0, 0.5, num_filas)
+    })
+
+def figura_sin_submuestreo(df):
+    """Lo que hacía el callback antes: todos los puntos, con líneas y marcadores."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=df['tiempo_inicio'], y=df['tiempo_respuesta'], mode='lines+markers',
+                             name='Tiempo de Respuesta'))
+    return fig
+
+def medir(funcion):
+    """(segundos del callback, segundos de serialización, MB enviados al navegador)."""
+    inicio = time.perf_counter()
+    fig = funcion()
+    callback = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    carga = fig.to_json()
+    return callback, time.perf_counter() - inicio, len(carga) / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamaño enviado y tiempo de los callbacks del dashboard con submuestreo.")
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--max-sin-submuestreo", type=int, default=1_000_000,
+                        help="Tamaño máximo al que se mide la figura con todos los puntos")
+    args = parser.parse_args()
+
+    # El almacén sirve el historial generado en lugar de leer el CSV
+    dashboard.almacen.vigencia = float("inf")
+    dashboard.almacen._ultimo_refresco = time.monotonic()
+
+    print(f"{'filas':>12}  {'gráfica':<34}{'callback (ms)':>14}{'JSON (ms)':>11}{'MB':>9}")
+    for num_filas in args.filas:
+        df = historial(num_filas)
+        dashboard.almacen.df = df
+        inicio, fin = df['tiempo_inicio'].iloc[0], df['tiempo_inicio'].iloc[-1]
+        zoom = {'xaxis.range[0]': str(inicio + (fin - inicio) * 0.5), 'xaxis.range[1]': str(inicio + (fin - inicio) * 0.51)}
+        casos = [
+            ("respuesta, todos los puntos (antes)", lambda: figura_sin_submuestreo(df)),
+            ("respuesta, LTTB", lambda: dashboard.actualizar_grafica_respuesta(0, None)),
+            ("respuesta, LTTB, zoom al 1%", lambda: dashboard.actualizar_grafica_respuesta(0, zoom)),
+            ("demanda y espera, LTTB", lambda: dashboard.actualizar_grafica_demanda(0, None))
+        ]
+        for nombre, funcion in casos:
+            if nombre.endswith("(antes)") and num_filas > args.max_sin_submuestreo:
+                print(f"{num_filas:>12,}  {nombre:<34}{'-':>14}{'-':>11}{'-':>9}")
+                continue
+            callback, serializacion, megas = medir(funcion)
+            print(f"{num_filas:>12,}  {nombre:<34}{callback * 1000:>14.0f}{serializacion * 1000:>11.0f}{megas:>9.2f}",
+                  flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import argparse
+import resource
+import time
+from array import array
+
+import numpy as np
+
+from gestor_usuarios import GestorUsuarios
+
+TIPOS = ("simple", "compleja", "codigo")
+TAMANO_BLOQUE = 1_000_000
+
+class GestorUsuariosHistorial:
+    """Implementación anterior: guarda cada solicitud y recuenta el historial en cada actualización (referencia)."""
+
+    def __init__(self):
+        self.perfiles = {}
+        self.historial = {}
+
+    def obtener_perfil(self, user_id):
+        if user_id not in self.perfiles:
+            self.perfiles[user_id] = "basico"
+            self.historial[user_id] = []
+        return self.perfiles[user_id]
+
+    def registrar_solicitud(self, user_id, solicitud):
+        if user_id not in self.historial:
+            self.historial[user_id] = []
+        self.historial[user_id].append(solicitud)
+
+    def actualizar_perfil(self, user_id):
+        historial = self.historial[user_id]
+        num_solicitudes = len(historial)
+        num_complejas = sum(1 for s in historial if s["tipo"] == "compleja")
+        num_codigo = sum(1 for s in historial if s["tipo"] == "codigo")
+        if num_solicitudes >= 15 and num_codigo >= 5:
+            self.perfiles[user_id] = "avanzado"
+        elif num_solicitudes >= 10 and num_complejas >= 3:
+            self.perfiles[user_id] = "intermedio"
+        else:
+            self.perfiles[user_id] = "basico"
+
+def rss_mb():
+    """Memoria residente actual del proceso en MB (máximo histórico si no hay /proc)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def ejecutar(gestor, num_usuarios, num_solicitudes, num_medidas, semilla=0):
+    """
+    Reproduce el camino de /solicitud (registrar, obtener perfil, actualizar perfil)
+    e imprime el coste por solicitud y la memoria en `num_medidas` puntos.
+    """
+    rng = np.random.default_rng(semilla)
+    solicitudes = [{"longitud": 50, "tipo": tipo} for tipo in TIPOS]
+    intervalo = max(num_solicitudes // num_medidas, 1)
+    print(f"{'solicitudes':>14}{'usuarios':>10}{'µs/solicitud':>14}{'RSS (MB)':>10}")
+
+    procesadas = 0
+    tiempo = 0.0
+    inicio_tramo = 0
+    tiempo_tramo = 0.0
+    while procesadas < num_solicitudes:
+        tamano = min(TAMANO_BLOQUE, num_solicitudes - procesadas, intervalo - (procesadas - inicio_tramo))
+        # Generar el bloque fuera de la medida: cuesta más que la propia operación
+        usuarios = rng.integers(0, num_usuarios, tamano).tolist()
+        tipos = rng.integers(0, len(TIPOS), tamano).tolist()
+
+        inicio = time.perf_counter()
+        for user_id, tipo in zip(usuarios, tipos):
+            gestor.registrar_solicitud(user_id, solicitudes[tipo])
+            gestor.obtener_perfil(user_id)
+            gestor.actualizar_perfil(user_id)
+        duracion = time.perf_counter() - inicio
+        tiempo += duracion
+        tiempo_tramo += duracion
+        procesadas += tamano
+
+        if procesadas - inicio_tramo >= intervalo or procesadas == num_solicitudes:
+            num_usuarios_vistos = len(gestor.perfiles) if hasattr(gestor, "perfiles") else len(gestor)
+            print(f"{procesadas:>14,}{num_usuarios_vistos:>10,}"
+                  f"{tiempo_tramo / (procesadas - inicio_tramo) * 1e6:>14.2f}{rss_mb():>10.0f}")
+            inicio_tramo = procesadas
+            tiempo_tramo = 0.0
+    return tiempo / num_solicitudes * 1e6
+
+def poblar(num_usuarios, semilla=0):
+    """GestorUsuarios con `num_usuarios` usuarios y contadores aleatorios, cargados en bloque."""
+    rng = np.random.default_rng(semilla)
+    gestor = GestorUsuarios()
+    for inicio in range(0, num_usuarios, TAMANO_BLOQUE):
+        n = min(TAMANO_BLOQUE, num_usuarios - inicio)
+        total = rng.integers(0, 40, n)
+        complejas = rng.binomial(total, 1 / 3)
+        codigo = rng.binomial(total - complejas, 1 / 2)
+        gestor.cargar_contadores(list(range(inicio, inicio + n)), total, complejas, codigo)
+    return gestor
+
+def medir_actualizacion_perfiles(num_usuarios, num_usuarios_referencia):
+    """Segundos para recalcular todos los perfiles: bucle por usuario frente a pasada vectorial."""
+    gestor = poblar(num_usuarios)
+    print(f"Recalcular perfiles de {num_usuarios:,} usuarios (RSS {rss_mb():.0f} MB)")
+
+    # Los usuarios se cargan en orden, así que los `num_referencia` primeros ocupan las primeras filas
+    num_referencia = min(num_usuarios_referencia, num_usuarios)
+    if num_referencia:
+        inicio = time.perf_counter()
+        for user_id in range(num_referencia):
+            gestor.actualizar_perfil(user_id)
+        duracion = time.perf_counter() - inicio
+        print(f"  bucle por usuario (actualizar_perfil): {duracion / num_referencia * 1e6:.2f} µs/usuario, "
+              f"{duracion / num_referencia * num_usuarios:.1f} s estimados para todos")
+    esperado = gestor.perfil[:num_referencia]
+    invalido = array("b", [-1]) * num_referencia
+
+    for tamano_bloque in (num_usuarios, 1_000_000, 100_000):
+        # Se invalida el prefijo para que la comprobación dependa solo de esta pasada
+        gestor.perfil[:num_referencia] = invalido
+        inicio = time.perf_counter()
+        gestor.actualizar_perfiles(tamano_bloque)
+        duracion = time.perf_counter() - inicio
+        print(f"  vectorial, bloques de {tamano_bloque:>10,}: {duracion:.3f} s "
+              f"({duracion / num_usuarios * 1e9:.1f} ns/usuario)")
+        if gestor.perfil[:num_referencia] != esperado:
+            raise AssertionError(f"La pasada vectorial (bloques de {tamano_bloque:,}) no coincide con "
+                                 f"actualizar_perfil en los {num_referencia:,} primeros usuarios")
+    if num_referencia:
+        print(f"  los {num_referencia:,} primeros perfiles coinciden con actualizar_perfil en las tres pasadas")
+
+    # En segundo plano: cuánto se llega a bloquear una solicitud que entra mientras tanto
+    solicitud = {"longitud": 50, "tipo": "codigo"}
+    id_trabajo = gestor.iniciar_actualizacion_perfiles()
+    inicio = time.perf_counter()
+    esperas = []
+    while gestor.estado_actualizacion(id_trabajo)["estado"] == "en_curso":
+        t = time.perf_counter()
+        gestor.registrar_solicitud(0, solicitud)
+        esperas.append(time.perf_counter() - t)
+    duracion = time.perf_counter() - inicio
+    print(f"  en segundo plano: {duracion:.3f} s, {len(esperas):,} solicitudes atendidas mientras tanto, "
+          f"espera máxima {max(esperas, default=0.0) * 1e3:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste por solicitud y memoria del perfilado de usuarios.")
+    parser.add_argument("--usuarios", type=int, default=1_000_000)
+    parser.add_argument("--solicitudes", type=int, default=100_000_000)
+    parser.add_argument("--solicitudes-referencia", type=int, default=5_000_000,
+                        help="Solicitudes para la implementación anterior (0 para omitirla); su memoria no está acotada")
+    parser.add_argument("--medidas", type=int, default=10, help="Puntos de medida a lo largo de la ejecución")
+    parser.add_argument("--semivida", type=float, default=None, help="Mantener también contadores recientes")
+    parser.add_argument("--usuarios-perfiles", type=int, default=10_000_000,
+                        help="Usuarios para medir el recálculo de todos los perfiles (0 para omitirlo)")
+    parser.add_argument("--usuarios-perfiles-referencia", type=int, default=1_000_000,
+                        help="Usuarios recalculados uno a uno como referencia")
+    args = parser.parse_args()
+
+    if args.solicitudes:
+        print(f"Contadores por usuario: {args.usuarios:,} usuarios, {args.solicitudes:,} solicitudes")
+        medio = ejecutar(GestorUsuarios(semivida=args.semivida), args.usuarios, args.solicitudes, args.medidas)
+        print(f"Media: {medio:.2f} µs/solicitud\n")
+
+    if args.solicitudes_referencia:
+        print(f"Historial completo (anterior): {args.usuarios:,} usuarios, {args.solicitudes_referencia:,} solicitudes")
+        medio = ejecutar(GestorUsuariosHistorial(), args.usuarios, args.solicitudes_referencia, args.medidas)
+        print(f"Media: {medio:.2f} µs/solicitud\n")
+
+    if args.usuarios_perfiles:
+        medir_actualizacion_perfiles(args.usuarios_perfiles, args.usuarios_perfiles_referencia)
+
+if __name__ == "__main__":
+    main()
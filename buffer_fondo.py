@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from collections import deque
+
+class BufferFondo:
+    """
+    Buffer en memoria que un hilo de fondo vacía por lotes cada `intervalo` segundos.
+
+    `anadir` solo hace un append a un deque (atómico con el GIL); con `capacidad`,
+    si se llena se pierden los elementos más antiguos y se cuentan en `desbordados`.
+    El hilo se arranca con el primer elemento y llama a `procesar(lista)` con todo
+    lo pendiente. Tras un fork el hilo no sobrevive: el hijo arranca el suyo con su
+    primer elemento, y `lock` (que también sirve a quien procesa para serializar su
+    escritura) se renueva por si el fork ocurrió con él tomado.
+    """
+
+    def __init__(self, procesar, nombre, intervalo=1.0, capacidad=None):
+        self.procesar = procesar
+        self.nombre = nombre
+        self.intervalo = intervalo
+        self.capacidad = capacidad
+        self.cola = deque(maxlen=capacidad)
+        self.lock = threading.Lock()
+        self.desbordados = 0
+        self._hilo = None
+        os.register_at_fork(after_in_child=self._tras_fork)
+
+    def __len__(self):
+        return len(self.cola)
+
+    def anadir(self, elemento):
+        cola = self.cola
+        if len(cola) == self.capacidad:
+            self.desbordados += 1
+        cola.append(elemento)
+        if self._hilo is None:
+            self._iniciar_hilo()
+
+    def _iniciar_hilo(self):
+        with self.lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name=self.nombre, daemon=True)
+                self._hilo.start()
+
+    def _tras_fork(self):
+        self._hilo = None
+        self.lock = threading.Lock()
+
+    def _bucle(self):
+        while True:
+            time.sleep(self.intervalo)
+            self.vaciar()
+
+    def extraer(self):
+        """Saca todos los elementos pendientes, en orden de llegada."""
+        elementos = []
+        cola = self.cola
+        while cola:
+            try:
+                elementos.append(cola.popleft())
+            except IndexError:
+                break
+        return elementos
+
+    def vaciar(self):
+        """Procesa ya los elementos pendientes."""
+        elementos = self.extraer()
+        if elementos:
+            self.procesar(elementos)
@@ -0,0 +1,153 @@
+import glob
+import hashlib
+import os
+
+import pandas as pd
+import numpy as np
+from numpy.lib.format import open_memmap
+
+TIPOS_ONE_HOT = ("simple", "compleja", "codigo")  # Orden de las columnas one-hot tras la longitud
+COLUMNAS = ["caracteristicas", "demanda_predicha"]
+TAMANO_BLOQUE = 200_000  # Filas del CSV que se procesan a la vez
+DIRECTORIO_CACHE = os.environ.get("DIRECTORIO_CACHE_DATOS", ".cache_datos")
+VERSION_CACHE = 1  # Cambiarla invalida las cachés escritas con otro formato
+# Campos del JSON de 'caracteristicas' (con comillas simples o dobles)
+PATRON_LONGITUD = r"""["']longitud["']\s*:\s*(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)"""
+PATRON_TIPO = r"""["']tipo["']\s*:\s*["']([^"']*)["']"""
+
+def vectorizar_caracteristicas(caracteristicas, demanda):
+    """
+    Convierte un bloque de las columnas 'caracteristicas' y 'demanda_predicha' en
+    (X, y, invalidas) sin recorrer las filas en Python: la longitud y el tipo se
+    extraen con expresiones regulares sobre toda la columna y el tipo se codifica
+    en one-hot comparando arrays. Las filas sin longitud o sin tipo se descartan.
+    """
+    texto = caracteristicas.where(caracteristicas.map(type) == str)
+    longitud = pd.to_numeric(texto.str.extract(PATRON_LONGITUD, expand=False), errors="coerce").to_numpy()
+    tipo = texto.str.extract(PATRON_TIPO, expand=False).to_numpy()
+    validas = ~np.isnan(longitud) & pd.notna(tipo)
+    longitud, tipo = longitud[validas], tipo[validas]
+
+    X = np.empty((len(longitud), 1 + len(TIPOS_ONE_HOT)))
+    X[:, 0] = longitud
+    for i, nombre in enumerate(TIPOS_ONE_HOT):
+        X[:, i + 1] = tipo == nombre
+    y = pd.to_numeric(demanda, errors="coerce").to_numpy(dtype=np.float64)[validas]
+    return X, y, int((~validas).sum())
+
+def clave_cache(ruta_csv):
+    """Identifica la versión del archivo por su tamaño y fecha de modificación."""
+    info = os.stat(ruta_csv)
+    firma = f"{info.st_size}|{info.st_mtime_ns}|{VERSION_CACHE}"
+    return hashlib.sha1(firma.encode()).hexdigest()[:16]
+
+def _prefijo_cache(ruta_csv, directorio_cache):
+    """Prefijo de los .npy de un CSV: su nombre y un hash de la ruta absoluta."""
+    nombre = os.path.splitext(os.path.basename(ruta_csv))[0]
+    ruta = hashlib.sha1(os.path.abspath(ruta_csv).encode()).hexdigest()[:8]
+    return os.path.join(directorio_cache, f"{nombre}_{ruta}")
+
+def _leer_cache(prefijo, clave):
+    ruta_X, ruta_y = f"{prefijo}_{clave}_X.npy", f"{prefijo}_{clave}_y.npy"
+    if not (os.path.exists(ruta_X) and os.path.exists(ruta_y)):
+        return None, None
+    return np.load(ruta_X, mmap_mode="r"), np.load(ruta_y, mmap_mode="r")
+
+def _volcar_npy(ruta_crudo, ruta_npy, dtype, columnas, filas):
+    """Copia los bytes acumulados en `ruta_crudo` a un .npy de forma conocida, por bloques."""
+    forma = (filas, columnas) if columnas else (filas,)
+    destino = open_memmap(ruta_npy, mode="w+", dtype=dtype, shape=forma)
+    tamano_fila = np.dtype(dtype).itemsize * max(columnas, 1)
+    with open(ruta_crudo, "rb") as crudo:
+        for inicio in range(0, filas, TAMANO_BLOQUE):
+            fin = min(inicio + TAMANO_BLOQUE, filas)
+            bloque = np.frombuffer(crudo.read((fin - inicio) * tamano_fila), dtype=dtype)
+            destino[inicio:fin] = bloque.reshape((fin - inicio,) + forma[1:])
+    destino.flush()
+    del destino
+
+def _cargar_en_cache(ruta_csv, prefijo, clave, tamano_bloque):
+    """Procesa el CSV por bloques y escribe X e y en .npy sin tenerlos enteros en memoria."""
+    os.makedirs(os.path.dirname(prefijo) or ".", exist_ok=True)
+    base = f"{prefijo}_{clave}"
+    temporales = {n: f"{base}_{n}.{os.getpid()}.tmp" for n in ("X_crudo", "y_crudo", "X", "y")}
+    filas = invalidas = 0
+    try:
+        with open(temporales["X_crudo"], "wb") as crudo_X, open(temporales["y_crudo"], "wb") as crudo_y:
+            for bloque in pd.read_csv(ruta_csv, usecols=COLUMNAS, chunksize=tamano_bloque):
+                X, y, descartadas = vectorizar_caracteristicas(bloque["caracteristicas"], bloque["demanda_predicha"])
+                crudo_X.write(X.tobytes())
+                crudo_y.write(y.tobytes())
+                filas += len(y)
+                invalidas += descartadas
+        _volcar_npy(temporales["X_crudo"], temporales["X"], np.float64, 1 + len(TIPOS_ONE_HOT), filas)
+        _volcar_npy(temporales["y_crudo"], temporales["y"], np.float64, 0, filas)
+        # Se publica X en último lugar: la caché solo cuenta como válida si están los dos
+        os.replace(temporales["y"], f"{base}_y.npy")
+        os.replace(temporales["X"], f"{base}_X.npy")
+    finally:
+        for ruta in temporales.values():
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    # Las cachés de versiones anteriores del mismo archivo ya no sirven
+    for ruta in glob.glob(f"{glob.escape(prefijo)}_{'[0-9a-f]' * 16}_[Xy].npy"):
+        if not ruta.startswith(f"{base}_"):
+            os.remove(ruta)
+    return invalidas
+
+def _cargar_en_memoria(ruta_csv, tamano_bloque):
+    partes_X, partes_y, invalidas = [], [], 0
+    for bloque in pd.read_csv(ruta_csv, usecols=COLUMNAS, chunksize=tamano_bloque):
+        X, y, descartadas = vectorizar_caracteristicas(bloque["caracteristicas"], bloque["demanda_predicha"])
+        partes_X.append(X)
+        partes_y.append(y)
+        invalidas += descartadas
+    if not partes_X:
+        return np.empty((0, 1 + len(TIPOS_ONE_HOT))), np.empty(0), invalidas
+    return np.concatenate(partes_X), np.concatenate(partes_y), invalidas
+
+def cargar_datos_entrenamiento(ruta_csv, directorio_cache=DIRECTORIO_CACHE, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Carga los datos de entrenamiento desde un archivo CSV.
+
+    El CSV se lee por bloques de `tamano_bloque` filas, así que puede ser mayor que
+    la memoria. X e y se guardan en `directorio_cache` como .npy identificados por la
+    ruta, el tamaño y la fecha de modificación del CSV; mientras el archivo no cambie,
+    las cargas siguientes los abren como memmap de solo lectura sin volver a parsearlo.
+    Con `directorio_cache=None` no se usa caché y se devuelven arrays en memoria.
+
+    Args:
+        ruta_csv (str): La ruta al archivo CSV.
+
+    Returns:
+        tuple: Una tupla que contiene dos arrays de NumPy:
+               - X: Las características de entrenamiento (longitud y tipo en one-hot).
+               - y: Las etiquetas de entrenamiento (demanda).
+    """
+    try:
+        # Asegurarse de que las columnas necesarias existen
+        columnas = pd.read_csv(ruta_csv, nrows=0).columns
+        if any(columna not in columnas for columna in COLUMNAS):
+            raise ValueError("El archivo CSV debe contener las columnas 'caracteristicas' y 'demanda_predicha'")
+
+        if directorio_cache is None:
+            X, y, invalidas = _cargar_en_memoria(ruta_csv, tamano_bloque)
+        else:
+            prefijo, clave = _prefijo_cache(ruta_csv, directorio_cache), clave_cache(ruta_csv)
+            X, y = _leer_cache(prefijo, clave)
+            if X is not None:
+                return X, y
+            invalidas = _cargar_en_cache(ruta_csv, prefijo, clave, tamano_bloque)
+            X, y = _leer_cache(prefijo, clave)
+
+        if invalidas:
+            print(f"Advertencia: se descartaron {invalidas} filas con 'caracteristicas' sin longitud o tipo")
+        return X, y
+
+    except FileNotFoundError:
+        print(f"Error: No se encontró el archivo {ruta_csv}")
+        return None, None
+    except Exception as e:
+        print(f"Error al cargar los datos de entrenamiento: {e}")
+        return None, None
@@ -4,15 +4,21 @@ import plotly.graph_objs as go
 import pandas as pd
 import requests
 import time
-import json
 import random
+import threading
+from collections import deque
+from datetime import datetime
 import numpy as np
+from almacen_datos import AlmacenDatos
+from submuestreo import PUNTOS_POR_SERIE, submuestrear
 
 # Configuración inicial
 app = dash.Dash(__name__)
 server = app.server  # Exponer el servidor Flask para Dash
 
 NUM_SERVIDORES_MAX = 5  # Definir NUM_SERVIDORES_MAX antes de usarlo
+MAX_FILAS = 1_000_000  # Últimas filas del CSV que se guardan (a cada gráfica llegan como mucho PUNTOS_POR_SERIE)
+MAX_INSTANTANEAS = 3000  # Instantáneas del balanceador que se muestran (5 minutos a 10 por segundo)
 
 # URL de la API de tu aplicación Flask
 api_url = "http://127.0.0.1:5000"  # Ajusta si es necesario
@@ -22,6 +28,7 @@ app.layout = html.Div([
     html.H1("Monitor de Balanceo de Carga"),
     dcc.Graph(id='live-graph-carga'),
     dcc.Graph(id='live-graph-cola'),
+    dcc.Graph(id='live-graph-demanda'),
     dcc.Graph(id='live-graph-respuesta'),
     html.Div(id='live-num-servidores', style={'font-size': '24px', 'margin-top': '20px'}),
     dcc.Interval(
@@ -31,108 +38,178 @@ app.layout = html.Div([
     )
 ])
 
-# Función para obtener datos de la API (simulando la obtención de datos del CSV)
+# Datos de la simulación: un único almacén compartido por todos los callbacks, que lee
+# solo las filas nuevas del CSV y se refresca una vez por intervalo (ver almacen_datos.py)
+almacen = AlmacenDatos("datos_simulacion.csv", max_filas=MAX_FILAS,
+                       columnas=["tiempo_inicio", "demanda_predicha", "tiempo_espera", "tiempo_respuesta"])
+
 def obtener_datos():
-    try:
-        df = pd.read_csv("datos_simulacion.csv")
-        # Eliminar filas con valores NaN o infinitos
-        df = df.replace([np.inf, -np.inf], np.nan).dropna()
-
-        # Convertir las características de JSON a diccionarios si es necesario
-        if 'caracteristicas' in df.columns:
-            df['caracteristicas'] = df['caracteristicas'].apply(lambda x: json.loads(x.replace("'", '"')) if isinstance(x, str) else x)
-
-        # Asegurarse de que 'tiempo_inicio' es de tipo datetime
-        if 'tiempo_inicio' in df.columns:
-            df['tiempo_inicio'] = pd.to_datetime(df['tiempo_inicio'])
-        else:
-            # Si no existe, crea una columna con la marca de tiempo actual
-            df['tiempo_inicio'] = pd.Timestamp.now()
-
-        # Asegurarse de que 'tiempo_respuesta' existe y es numérico
-        if 'tiempo_respuesta' not in df.columns:
-            df['tiempo_respuesta'] = 0.0  # O algún valor por defecto
-        else:
-            df['tiempo_respuesta'] = pd.to_numeric(df['tiempo_respuesta'], errors='coerce').fillna(0.0)
-
-        # Aquí puedes agregar más columnas o cálculos si es necesario
-
-        return df
-    except Exception as e:
-        print(f"Error al obtener datos: {e}")
-        return pd.DataFrame()  # Devuelve un DataFrame vacío en caso de error
-
-# Función para obtener el número de servidores activos
-def obtener_numero_servidores():
-    try:
-        response = requests.get(f"{api_url}/num_servidores")
-        response.raise_for_status()
-        return response.json()['num_servidores']
-    except requests.exceptions.RequestException as e:
-        print(f"Error al obtener el número de servidores: {e}")
-        return 0
+    return almacen.obtener()
+
+class MonitorBalanceador:
+    """
+    Últimas instantáneas del estado del balanceador (carga de cada servidor, cola,
+    tasa de llegadas...), pedidas a /instantaneas de app.py con un cursor: cada
+    petición trae solo las nuevas. Como el almacén del CSV, se refresca como mucho
+    una vez cada `vigencia` segundos para todos los callbacks.
+    """
+
+    def __init__(self, url, capacidad=MAX_INSTANTANEAS, vigencia=1.0):
+        self.url = url
+        self.vigencia = vigencia
+        self.instantaneas = deque(maxlen=capacidad)
+        self._cursor = 0
+        self._ultimo_refresco = float("-inf")
+        self._lock = threading.Lock()
+        self._sesion = requests.Session()
+
+    def obtener(self):
+        with self._lock:
+            if time.monotonic() - self._ultimo_refresco >= self.vigencia:
+                try:
+                    response = self._sesion.get(f"{self.url}/instantaneas", params={'desde': self._cursor}, timeout=2)
+                    response.raise_for_status()
+                    datos = response.json()
+                    if datos['cursor'] < self._cursor:
+                        self.instantaneas.clear()  # app.py se ha reiniciado
+                    self.instantaneas.extend(datos['instantaneas'])
+                    self._cursor = datos['cursor']
+                except requests.exceptions.RequestException as e:
+                    print(f"Error al obtener el estado del balanceador: {e}")
+                self._ultimo_refresco = time.monotonic()
+            return list(self.instantaneas)
+
+monitor = MonitorBalanceador(api_url)
+
+def tiempos_locales(instantaneas):
+    """Instantes de las instantáneas en hora local, como los del CSV."""
+    return np.array([datetime.fromtimestamp(i['tiempo']) for i in instantaneas], dtype='datetime64[ns]')
+
+# --- SUBMUESTREO ---
+# Cada serie se reduce a PUNTOS_POR_SERIE puntos (ver submuestreo.py). Al hacer zoom,
+# el callback de la gráfica recibe el rango visible en relayoutData y vuelve a
+# submuestrear solo ese rango, con el mismo presupuesto y por tanto más detalle.
+
+def rango_visible(relayout):
+    """(inicio, fin) del eje x tras un zoom, o None si se ve todo."""
+    if not relayout or relayout.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout:
+        return pd.Timestamp(relayout['xaxis.range[0]']), pd.Timestamp(relayout['xaxis.range[1]'])
+    if 'xaxis.range' in relayout:
+        return pd.Timestamp(relayout['xaxis.range'][0]), pd.Timestamp(relayout['xaxis.range'][1])
+    return None
+
+def recortar(tiempos, rango):
+    """Slice de `tiempos` (ordenados) dentro del rango, con un punto más a cada lado para no cortar la línea."""
+    if rango is None:
+        return slice(None)
+    inicio = np.searchsorted(tiempos, np.datetime64(rango[0]), side='left')
+    fin = np.searchsorted(tiempos, np.datetime64(rango[1]), side='right')
+    return slice(max(inicio - 1, 0), fin + 1)
+
+def traza(tiempos, valores, nombre, rango, metodo='lttb'):
+    """go.Scatter con la serie recortada al rango visible y submuestreada."""
+    ventana = recortar(tiempos, rango)
+    x, y = submuestrear(tiempos[ventana], valores[ventana], PUNTOS_POR_SERIE, metodo)
+    return go.Scatter(x=x, y=y, mode='lines', name=nombre)
+
+def columnas_csv(df, *columnas):
+    """Tiempos y columnas del CSV como arrays, ordenados por tiempo (varios clientes escriben a la vez)."""
+    if df.empty:
+        return (np.array([], dtype='datetime64[ns]'),) + tuple(np.array([]) for _ in columnas)
+    tiempos = df['tiempo_inicio'].to_numpy()
+    orden = None if (tiempos[1:] >= tiempos[:-1]).all() else np.argsort(tiempos, kind='stable')
+    if orden is None:
+        return (tiempos,) + tuple(df[c].to_numpy() for c in columnas)
+    return (tiempos[orden],) + tuple(df[c].to_numpy()[orden] for c in columnas)
 
 # Callback para actualizar la gráfica de carga de los servidores
 @app.callback(Output('live-graph-carga', 'figure'),
-              [Input('interval-component', 'n_intervals')])
-def actualizar_grafica_carga(n):
-    df = obtener_datos()
+              [Input('interval-component', 'n_intervals'), Input('live-graph-carga', 'relayoutData')])
+def actualizar_grafica_carga(n, relayout):
+    instantaneas = monitor.obtener()
+    rango = rango_visible(relayout)
+
+    # Serie de carga de cada servidor; NaN donde el servidor no existía
+    tiempos = tiempos_locales(instantaneas)
+    cargas = {}
+    for k, instantanea in enumerate(instantaneas):
+        for servidor in instantanea['servidores']:
+            if servidor['id'] not in cargas:
+                cargas[servidor['id']] = np.full(len(instantaneas), np.nan)
+            cargas[servidor['id']][k] = servidor['carga']
 
     # Crear la figura para la carga de los servidores
     fig = go.Figure()
 
-    # Añadir trazas para cada servidor
-    for i in range(NUM_SERVIDORES_MAX):
-        fig.add_trace(go.Scatter(x=df['tiempo_inicio'], y=df['demanda_predicha'],  # Reemplaza con la métrica correcta
-                                 mode='lines+markers',
-                                 name=f'Servidor {i}'))
+    # Añadir trazas para cada servidor (min/max: conserva los picos de carga)
+    for id_servidor, serie in sorted(cargas.items()):
+        fig.add_trace(traza(tiempos, serie, f'Servidor {id_servidor}', rango, metodo='min_max'))
 
-    # Actualizar el layout de la figura
+    # Actualizar el layout de la figura; uirevision conserva el zoom entre actualizaciones
     fig.update_layout(title_text="Carga de los Servidores",
                       xaxis_title="Tiempo",
-                      yaxis_title="Carga")
+                      yaxis_title="Carga (s de trabajo en curso)",
+                      uirevision='carga')
 
     return fig
 
 # Callback para actualizar la gráfica de longitud de la cola
 @app.callback(Output('live-graph-cola', 'figure'),
-              [Input('interval-component', 'n_intervals')])
-def actualizar_grafica_cola(n):
-    df = obtener_datos()
+              [Input('interval-component', 'n_intervals'), Input('live-graph-cola', 'relayoutData')])
+def actualizar_grafica_cola(n, relayout):
+    instantaneas = monitor.obtener()
+    tiempos = tiempos_locales(instantaneas)
+    cola = np.array([i['cola'] for i in instantaneas], dtype=np.float64)
 
     # Crear la figura para la longitud de la cola
     fig = go.Figure()
 
     # Añadir traza para la longitud de la cola
-    fig.add_trace(go.Scatter(x=df['tiempo_inicio'], y=df['tiempo_espera'],  # Reemplaza con la métrica correcta
-                             mode='lines+markers',
-                             name='Longitud de la Cola'))
+    fig.add_trace(traza(tiempos, cola, 'Longitud de la Cola', rango_visible(relayout), metodo='min_max'))
 
     # Actualizar el layout de la figura
     fig.update_layout(title_text="Longitud de la Cola de Solicitudes",
                       xaxis_title="Tiempo",
-                      yaxis_title="Longitud de la Cola")
+                      yaxis_title="Longitud de la Cola",
+                      uirevision='cola')
+
+    return fig
+
+# Callback para actualizar la gráfica de demanda predicha y tiempo de espera
+@app.callback(Output('live-graph-demanda', 'figure'),
+              [Input('interval-component', 'n_intervals'), Input('live-graph-demanda', 'relayoutData')])
+def actualizar_grafica_demanda(n, relayout):
+    tiempos, demanda, espera = columnas_csv(obtener_datos(), 'demanda_predicha', 'tiempo_espera')
+    rango = rango_visible(relayout)
+
+    fig = go.Figure()
+    fig.add_trace(traza(tiempos, demanda, 'Demanda Predicha', rango))
+    fig.add_trace(traza(tiempos, espera, 'Tiempo de Espera (s)', rango))
+    fig.update_layout(title_text="Demanda Predicha y Tiempo de Espera",
+                      xaxis_title="Tiempo",
+                      uirevision='demanda')
 
     return fig
 
 # Callback para actualizar la gráfica de tiempos de respuesta
 @app.callback(Output('live-graph-respuesta', 'figure'),
-              [Input('interval-component', 'n_intervals')])
-def actualizar_grafica_respuesta(n):
-    df = obtener_datos()
+              [Input('interval-component', 'n_intervals'), Input('live-graph-respuesta', 'relayoutData')])
+def actualizar_grafica_respuesta(n, relayout):
+    tiempos, respuesta = columnas_csv(obtener_datos(), 'tiempo_respuesta')
 
     # Crear la figura para los tiempos de respuesta
     fig = go.Figure()
 
     # Añadir traza para los tiempos de respuesta
-    fig.add_trace(go.Scatter(x=df['tiempo_inicio'], y=df['tiempo_respuesta'],
-                             mode='lines+markers',
-                             name='Tiempo de Respuesta'))
+    fig.add_trace(traza(tiempos, respuesta, 'Tiempo de Respuesta', rango_visible(relayout)))
 
     # Actualizar el layout de la figura
     fig.update_layout(title_text="Tiempos de Respuesta",
                       xaxis_title="Tiempo",
-                      yaxis_title="Tiempo de Respuesta (s)")
+                      yaxis_title="Tiempo de Respuesta (s)",
+                      uirevision='respuesta')
 
     return fig
 
@@ -140,8 +217,13 @@ def actualizar_grafica_respuesta(n):
 @app.callback(Output('live-num-servidores', 'children'),
               [Input('interval-component', 'n_intervals')])
 def actualizar_numero_servidores(n):
-    num_servidores = obtener_numero_servidores()
-    return f"Número de Servidores Activos: {num_servidores}"
+    instantaneas = monitor.obtener()
+    if not instantaneas:
+        return "Número de Servidores Activos: -"
+    ultima = instantaneas[-1]
+    return (f"Número de Servidores Activos: {ultima['num_servidores'] - ultima['arrancando']} "
+            f"(arrancando: {ultima['arrancando']}, en reserva: {ultima['reserva']}, "
+            f"llegadas: {ultima['tasa_llegadas']:.1f}/s)")
 
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
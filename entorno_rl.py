@@ -3,19 +3,147 @@ from gymnasium import spaces
 import numpy as np
 import time
 
+def construir_estado(servidores, longitud_cola, num_servidores_max):
+    """
+    Observación del agente: la carga de cada servidor (rellenada con ceros hasta
+    `num_servidores_max`) seguida de la longitud de la cola.
+    """
+    carga_servidores = [s.carga for s in servidores]
+
+    # Asegurarse de que el estado tenga siempre la misma longitud
+    while len(carga_servidores) < num_servidores_max:
+        carga_servidores.append(0.0)  # Rellenar con ceros si hay menos servidores que el máximo
+
+    return np.array(carga_servidores + [longitud_cola], dtype=np.float32)
+
+# Características de la observación agregada, en orden
+CARACTERISTICAS_AGREGADAS = [
+    "num_servidores", "num_arrancando", "carga_total", "carga_media", "carga_p50", "carga_p90",
+    "carga_max", "fraccion_ocupados", "pendientes_medios", "longitud_cola", "cola_por_servidor",
+    "tasa_llegadas_1s", "tasa_llegadas_10s", "tasa_llegadas_60s", "cv_entre_llegadas"
+]
+
+def construir_estado_agregado(carga, arrancando, pendientes, longitud_cola, llegadas, activos=None):
+    """
+    Observación de tamaño fijo que resume la flota con agregados (número de
+    servidores, cuantiles de carga, cola, tasa de llegadas...), de modo que una
+    misma política sirve para cualquier número de servidores.
+
+    `llegadas` son las características de EstimadorTasa.caracteristicas: tasas
+    EWMA de 1, 10 y 60 s y coeficiente de variación entre llegadas.
+
+    Acepta los arrays de un entorno, de forma (n,), o de varios a la vez, de forma
+    (entornos, n) con `activos` marcando los servidores que existen en cada uno.
+    """
+    if np.ndim(carga) == 1 and activos is None:
+        return _estado_agregado_un_entorno(carga, arrancando, pendientes, longitud_cola, llegadas)
+
+    carga, arrancando, pendientes = (np.atleast_2d(a) for a in (carga, arrancando, pendientes))
+    longitud_cola = np.atleast_1d(longitud_cola).astype(np.float64)
+    llegadas = np.atleast_2d(llegadas).astype(np.float64)
+    if activos is None:
+        num_servidores = np.full(carga.shape[0], carga.shape[1])
+        carga_ordenada = np.sort(carga, axis=1)
+    else:
+        num_servidores = activos.sum(axis=1)
+        # Los servidores que no existen van al final al ordenar y no cuentan en los agregados
+        carga_ordenada = np.sort(np.where(activos, carga, np.inf), axis=1)
+        carga, arrancando, pendientes = (np.where(activos, a, 0) for a in (carga, arrancando, pendientes))
+
+    # Cuantiles con interpolación lineal (como np.quantile) sobre los servidores de cada fila
+    cuantiles = np.zeros((carga.shape[0], 3))
+    if carga.shape[1]:
+        posiciones = np.array([0.5, 0.9, 1.0])[None, :] * np.maximum(num_servidores - 1, 0)[:, None]
+        abajo = np.floor(posiciones).astype(np.int64)
+        arriba = np.ceil(posiciones).astype(np.int64)
+        valor_abajo = np.take_along_axis(carga_ordenada, abajo, axis=1)
+        valor_arriba = np.take_along_axis(carga_ordenada, arriba, axis=1)
+        cuantiles = np.where(num_servidores[:, None] > 0,
+                             valor_abajo + (valor_arriba - valor_abajo) * (posiciones - abajo), 0.0)
+
+    divisor = np.maximum(num_servidores, 1.0)
+    carga_total = carga.sum(axis=1)
+
+    estado = np.stack([
+        num_servidores,
+        arrancando.sum(axis=1),
+        carga_total,
+        carga_total / divisor,
+        cuantiles[:, 0],
+        cuantiles[:, 1],
+        cuantiles[:, 2],
+        (pendientes > 0).sum(axis=1) / divisor,
+        pendientes.sum(axis=1) / divisor,
+        longitud_cola,
+        longitud_cola / divisor,
+        *llegadas.T
+    ], axis=1).astype(np.float32)
+    return estado
+
+def _cuantil(ordenada, q):
+    """Cuantil con interpolación lineal (como np.quantile) de un array ya ordenado."""
+    posicion = q * (len(ordenada) - 1)
+    abajo = int(posicion)
+    if abajo + 1 >= len(ordenada):
+        return float(ordenada[abajo])
+    return float(ordenada[abajo] + (ordenada[abajo + 1] - ordenada[abajo]) * (posicion - abajo))
+
+def _estado_agregado_un_entorno(carga, arrancando, pendientes, longitud_cola, llegadas):
+    # Mismos agregados que construir_estado_agregado para un solo entorno, con menos llamadas a NumPy
+    n = len(carga)
+    if n == 0:
+        return np.array([0, 0, 0, 0, 0, 0, 0, 0, 0, longitud_cola, longitud_cola, *llegadas], dtype=np.float32)
+    ordenada = np.sort(carga)
+    carga_total = float(carga.sum())
+    return np.array([
+        n,
+        np.count_nonzero(arrancando),
+        carga_total,
+        carga_total / n,
+        _cuantil(ordenada, 0.5),
+        _cuantil(ordenada, 0.9),
+        ordenada[-1],
+        np.count_nonzero(pendientes) / n,
+        pendientes.sum() / n,
+        longitud_cola,
+        longitud_cola / n,
+        *llegadas
+    ], dtype=np.float32)
+
+def espacio_observacion(modo_observacion, num_servidores_max):
+    """Espacio de observaciones: carga por servidor ('servidores') o agregados de la flota ('agregada')."""
+    if modo_observacion == "agregada":
+        return spaces.Box(low=0, high=np.inf, shape=(len(CARACTERISTICAS_AGREGADAS),), dtype=np.float32)
+    if modo_observacion == "servidores":
+        return spaces.Box(low=0, high=100, shape=(num_servidores_max + 1,), dtype=np.float32)
+    raise ValueError(f"Modo de observación desconocido: {modo_observacion}")
+
+def calcular_recompensa(servidores, longitud_cola):
+    """Penaliza la carga media de los servidores y la longitud de la cola."""
+    carga_promedio = sum(s.carga for s in servidores) / len(servidores) if len(servidores) > 0 else 0
+    return -carga_promedio - longitud_cola * 0.5  # Penalizar carga alta y cola larga
+
 class EntornoBalanceo(gym.Env):
-    def __init__(self, asignador_recursos):
+    def __init__(self, asignador_recursos, duracion_paso=1.0, modo_observacion="servidores"):
         super(EntornoBalanceo, self).__init__()
         self.asignador_recursos = asignador_recursos
+        self.duracion_paso = duracion_paso  # Segundos reales que se espera tras cada acción
+        self.modo_observacion = modo_observacion
         self.action_space = spaces.Discrete(3)  # 0: No hacer nada, 1: Crear servidor, 2: Eliminar servidor
-        self.observation_space = spaces.Box(low=0, high=100, shape=(self.asignador_recursos.num_servidores_max + 1,), dtype=np.float32)
+        self.observation_space = espacio_observacion(modo_observacion, self.asignador_recursos.num_servidores_max)
 
-    def reset(self, seed=None):
+    def reset(self, seed=None, options=None):
         super().reset(seed=seed)
-        # Reiniciar el entorno a un estado inicial
-        for servidor in self.asignador_recursos.servidores:
-            servidor.carga = 0
-        self.asignador_recursos.cola_solicitudes.queue.clear()
+        # Reiniciar el entorno a un estado inicial. La carga de los servidores ocupados la
+        # llevan sus trabajadores: solo se pone a cero la de los que no tienen solicitudes
+        asignador_recursos = self.asignador_recursos
+        with asignador_recursos.condicion:
+            for servidor in asignador_recursos.servidores:
+                if servidor.pendientes == 0:
+                    servidor.carga = 0
+                    asignador_recursos.servidor_actualizado(servidor)
+        # Las solicitudes en cola fallan en lugar de quedar sin respuesta
+        asignador_recursos.descartar_cola("Solicitud descartada al reiniciar el entorno de RL")
 
         # Devolver el estado inicial
         return self._get_estado(), {}
@@ -28,12 +156,11 @@ class EntornoBalanceo(gym.Env):
             self.asignador_recursos.eliminar_servidor()
 
         # Esperar un tiempo para que la acción tenga efecto y se procesen solicitudes
-        time.sleep(1)  # Ajusta el tiempo según sea necesario
+        time.sleep(self.duracion_paso)
 
         # Calcular la recompensa (esto es solo un ejemplo)
-        carga_promedio = sum(s.carga for s in self.asignador_recursos.servidores) / len(self.asignador_recursos.servidores) if len(self.asignador_recursos.servidores) > 0 else 0
-        longitud_cola = self.asignador_recursos.cola_solicitudes.qsize()
-        recompensa = -carga_promedio - longitud_cola * 0.5  # Penalizar carga alta y cola larga
+        recompensa = calcular_recompensa(self.asignador_recursos.servidores,
+                                         self.asignador_recursos.cola_solicitudes.qsize())
 
         # Obtener el nuevo estado
         estado = self._get_estado()
@@ -48,12 +175,12 @@ class EntornoBalanceo(gym.Env):
 
     def _get_estado(self):
         # Obtener el estado actual del sistema
-        carga_servidores = [s.carga for s in self.asignador_recursos.servidores]
-        longitud_cola = self.asignador_recursos.cola_solicitudes.qsize()
-
-        # Asegurarse de que el estado tenga siempre la misma longitud
-        while len(carga_servidores) < self.asignador_recursos.num_servidores_max:
-            carga_servidores.append(0.0)  # Rellenar con ceros si hay menos servidores que el máximo
-
-        estado = np.array(carga_servidores + [longitud_cola], dtype=np.float32)
-        return estado
\ No newline at end of file
+        asignador_recursos = self.asignador_recursos
+        if self.modo_observacion == "agregada":
+            with asignador_recursos.condicion:
+                carga, arrancando, pendientes = (a.copy() for a in asignador_recursos.flota.arrays())
+            return construir_estado_agregado(carga, arrancando, pendientes, asignador_recursos.cola_solicitudes.qsize(),
+                                             asignador_recursos.estimador_llegadas.caracteristicas())
+        return construir_estado(asignador_recursos.servidores,
+                                asignador_recursos.cola_solicitudes.qsize(),
+                                asignador_recursos.num_servidores_max)
@@ -0,0 +1,289 @@
+import argparse
+import time
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from asignador_recursos import TIEMPO_ARRANQUE
+from entorno_rl import construir_estado_agregado, espacio_observacion
+from simulador_eventos import TIPOS_SOLICITUD
+
+class EntornoVectorizado(VecEnv):
+    """
+    `num_entornos` simulaciones independientes del balanceador que avanzan a la vez
+    con operaciones de NumPy sobre arrays (num_entornos, num_servidores_max), en un
+    solo proceso y sin un objeto Python por entorno.
+
+    Es una aproximación de SimuladorEventos con paso de tiempo fijo: cada paso de
+    `duracion_paso` segundos se divide en `subpasos`, y en cada subpaso llegan
+    solicitudes (Poisson), arrancan servidores, se reparten las solicitudes al
+    servidor listo con menos carga y avanza el procesamiento. Las observaciones,
+    acciones y recompensa son las de EntornoBalanceo.
+    """
+
+    EXTRA_TIPO = np.array([0.0, 0.5, 1.0])  # Coste adicional de cada tipo, en el orden de TIPOS_SOLICITUD
+
+    def __init__(self, num_entornos, tasa_llegadas=2.0, num_servidores_inicial=1, num_servidores_max=5,
+                 predictor=None, duracion_paso=1.0, subpasos=10, max_pasos=None, max_pendientes_servidor=2,
+                 tiempo_arranque=TIEMPO_ARRANQUE, escalado_por_umbral=True, umbral_escalado_superior=5,
+                 umbral_escalado_inferior=1, factor_tendencia_subida=1.5, pesos_tipo=(0.4, 0.35, 0.25),
+                 longitudes=(10, 40), semilla=None, modo_observacion="servidores"):
+        self.render_mode = None
+        self.modo_observacion = modo_observacion
+        observation_space = espacio_observacion(modo_observacion, num_servidores_max)
+        super(EntornoVectorizado, self).__init__(num_entornos, observation_space, spaces.Discrete(3))
+
+        self.tasa_llegadas = tasa_llegadas
+        self.num_servidores_inicial = num_servidores_inicial
+        self.num_servidores_max = num_servidores_max
+        self.duracion_paso = duracion_paso
+        self.subpasos = subpasos
+        self.max_pasos = max_pasos
+        self.max_pendientes_servidor = max_pendientes_servidor
+        self.tiempo_arranque = tiempo_arranque
+        self.escalado_por_umbral = escalado_por_umbral
+        self.umbral_escalado_superior = umbral_escalado_superior
+        self.umbral_escalado_inferior = umbral_escalado_inferior
+        self.factor_tendencia_subida = factor_tendencia_subida  # Ver SimuladorEventos.trafico_en_aumento
+        self.pesos_tipo = np.asarray(pesos_tipo, dtype=np.float64) / sum(pesos_tipo)
+        self.longitudes = np.arange(longitudes[0], longitudes[1] + 1)
+        self.tiempo_base = self._tabla_tiempo_base(predictor)
+        self.rng = np.random.default_rng(semilla)
+
+        forma = (num_entornos, num_servidores_max)
+        self._columnas = np.arange(num_servidores_max)
+        self.num_servidores = np.zeros(num_entornos, dtype=np.int64)
+        self.arranque = np.zeros(forma)  # Segundos que le faltan a cada servidor para estar listo
+        self.pendientes = np.zeros(forma, dtype=np.int64)  # Solicitudes entregadas (en cola local o en proceso)
+        # Cola local FIFO de cada servidor; la posición 0 es la solicitud en proceso
+        self.restante = np.zeros(forma + (max_pendientes_servidor,))
+        self.duracion = np.zeros(forma + (max_pendientes_servidor,))
+        self.cola = np.zeros(num_entornos, dtype=np.int64)  # Cola compartida de cada entorno
+        self.num_pasos = np.zeros(num_entornos, dtype=np.int64)
+        self.num_llegadas = np.zeros(num_entornos, dtype=np.int64)
+        self.num_completadas = np.zeros(num_entornos, dtype=np.int64)
+        # Tasas EWMA de llegadas en los horizontes de EstimadorTasa, actualizadas en cada subpaso
+        self.horizontes_llegadas = np.array([1.0, 10.0, 60.0])
+        self.ewma_llegadas = np.zeros((num_entornos, len(self.horizontes_llegadas)))
+        self._acciones = None
+
+    def _tabla_tiempo_base(self, predictor):
+        """
+        Tiempo de procesamiento de cada (longitud, tipo) sin el factor aleatorio, con el
+        mismo cálculo que calcular_tiempo_procesamiento. La demanda se predice una sola
+        vez para toda la tabla.
+        """
+        caracteristicas = [{"longitud": int(longitud), "tipo": tipo}
+                           for longitud in self.longitudes for tipo in TIPOS_SOLICITUD]
+        if predictor is not None:
+            demanda = np.asarray(predictor.predict_batch(caracteristicas), dtype=np.float64)
+        else:
+            demanda = np.ones(len(caracteristicas))  # Como un DemandPredictor sin entrenar
+        demanda = demanda.reshape(len(self.longitudes), len(TIPOS_SOLICITUD))
+        return self.longitudes[:, None] * 0.01 + self.EXTRA_TIPO[None, :] + demanda * 0.2
+
+    def _muestrear_tiempos(self, n):
+        """Tiempos de procesamiento de `n` solicitudes nuevas."""
+        longitud = self.rng.integers(0, len(self.longitudes), n)
+        tipo = self.rng.choice(len(TIPOS_SOLICITUD), n, p=self.pesos_tipo)
+        return np.maximum(self.tiempo_base[longitud, tipo] + self.rng.uniform(-0.1, 0.1, n), 0.0)
+
+    def _activos(self):
+        return self._columnas[None, :] < self.num_servidores[:, None]
+
+    def _carga(self):
+        # Como en ServidorSimulado, la carga es el tiempo de la solicitud en proceso
+        return np.where(self.pendientes > 0, self.duracion[:, :, 0], 0.0)
+
+    def _vaciar_servidores(self, filas, columnas):
+        self.arranque[filas, columnas] = 0.0
+        self.pendientes[filas, columnas] = 0
+        self.restante[filas, columnas] = 0.0
+        self.duracion[filas, columnas] = 0.0
+
+    def _crear_servidores(self, mascara):
+        filas = np.nonzero(mascara & (self.num_servidores < self.num_servidores_max))[0]
+        columnas = self.num_servidores[filas]
+        self._vaciar_servidores(filas, columnas)
+        self.arranque[filas, columnas] = self.tiempo_arranque
+        self.num_servidores[filas] += 1
+
+    def _eliminar_servidores(self, mascara):
+        # Se quita el último servidor; el trabajo que tenía deja de contar
+        filas = np.nonzero(mascara & (self.num_servidores > 1))[0]
+        self.num_servidores[filas] -= 1
+        self._vaciar_servidores(filas, self.num_servidores[filas])
+
+    def trafico_en_aumento(self):
+        """Mismo criterio que SimuladorEventos.trafico_en_aumento, para cada entorno."""
+        corto, largo = self.ewma_llegadas[:, 0], self.ewma_llegadas[:, -1]
+        return (largo > 0) & (corto > self.factor_tendencia_subida * largo)
+
+    def _despachar(self):
+        """Reparte la cola compartida entre los servidores listos, de uno en uno por entorno."""
+        activos = self._activos()
+        for _ in range(self.num_servidores_max * self.max_pendientes_servidor):
+            candidatos = (activos & (self.arranque <= 0) & (self.pendientes < self.max_pendientes_servidor)
+                          & (self.cola > 0)[:, None])
+            filas = np.nonzero(candidatos.any(axis=1))[0]
+            if filas.size == 0:
+                return
+            # Servidor listo con menos carga; a igual carga, el de menos pendientes
+            clave = self._carga()[filas] + self.pendientes[filas] * 1e-6
+            clave[~candidatos[filas]] = np.inf
+            columnas = np.argmin(clave, axis=1)
+            posicion = self.pendientes[filas, columnas]
+            tiempos = self._muestrear_tiempos(filas.size)
+            self.restante[filas, columnas, posicion] = tiempos
+            self.duracion[filas, columnas, posicion] = tiempos
+            self.pendientes[filas, columnas] += 1
+            self.cola[filas] -= 1
+
+    def _subpaso(self, dt):
+        llegadas = self.rng.poisson(self.tasa_llegadas * dt, self.num_envs)
+        self.cola += llegadas
+        self.num_llegadas += llegadas
+        self.ewma_llegadas *= np.exp(-dt / self.horizontes_llegadas)
+        self.ewma_llegadas += llegadas[:, None] / self.horizontes_llegadas
+
+        if self.escalado_por_umbral:
+            # Como en SimuladorEventos, los umbrales se comprueban cuando llegan solicitudes
+            listos = self._activos() & (self.arranque <= 0)
+            carga_total = (self._carga() * listos).sum(axis=1)
+            hay_llegadas = llegadas > 0
+            self._crear_servidores(hay_llegadas & (carga_total > self.umbral_escalado_superior))
+            self._eliminar_servidores(hay_llegadas & (carga_total < self.umbral_escalado_inferior)
+                                      & ~self.trafico_en_aumento())
+
+        np.maximum(self.arranque - dt, 0.0, out=self.arranque)
+        self._despachar()
+
+        ocupados = self._activos() & (self.arranque <= 0) & (self.pendientes > 0)
+        en_proceso = self.restante[:, :, 0]
+        en_proceso[ocupados] -= dt
+        terminados = ocupados & (en_proceso <= 0)
+        if not terminados.any():
+            return
+
+        sobrante = -en_proceso[terminados]
+        # La siguiente solicitud de la cola local pasa a procesarse con el tiempo sobrante del subpaso
+        self.restante[terminados] = np.roll(self.restante[terminados], -1, axis=1)
+        self.duracion[terminados] = np.roll(self.duracion[terminados], -1, axis=1)
+        self.restante[terminados, -1] = 0.0
+        self.duracion[terminados, -1] = 0.0
+        self.pendientes[terminados] -= 1
+        siguientes = self.restante[terminados, 0]
+        siguientes[self.pendientes[terminados] > 0] -= sobrante[self.pendientes[terminados] > 0]
+        self.restante[terminados, 0] = siguientes
+        self.num_completadas += terminados.sum(axis=1)
+
+    def _reiniciar(self, filas):
+        self.num_servidores[filas] = self.num_servidores_inicial
+        self.arranque[filas] = 0.0
+        self.pendientes[filas] = 0
+        self.restante[filas] = 0.0
+        self.duracion[filas] = 0.0
+        self.cola[filas] = 0
+        self.num_pasos[filas] = 0
+        self.ewma_llegadas[filas] = 0.0
+
+    def _observaciones(self):
+        if self.modo_observacion == "agregada":
+            # Las llegadas son de Poisson: su coeficiente de variación entre llegadas es 1
+            llegadas = np.column_stack([self.ewma_llegadas, np.ones(self.num_envs)])
+            return construir_estado_agregado(self._carga(), self.arranque > 0, self.pendientes, self.cola,
+                                             llegadas, activos=self._activos())
+        observaciones = np.zeros((self.num_envs, self.num_servidores_max + 1), dtype=np.float32)
+        observaciones[:, :-1] = self._carga()
+        observaciones[:, -1] = self.cola
+        return observaciones
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self.rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reiniciar(np.arange(self.num_envs))
+        return self._observaciones()
+
+    def step_async(self, actions):
+        self._acciones = np.asarray(actions).reshape(self.num_envs)
+
+    def step_wait(self):
+        self._crear_servidores(self._acciones == 1)
+        self._eliminar_servidores(self._acciones == 2)
+
+        dt = self.duracion_paso / self.subpasos
+        for _ in range(self.subpasos):
+            self._subpaso(dt)
+        self.num_pasos += 1
+
+        # Misma recompensa que calcular_recompensa, para todos los entornos a la vez
+        carga_promedio = self._carga().sum(axis=1) / np.maximum(self.num_servidores, 1)
+        recompensas = (-carga_promedio - self.cola * 0.5).astype(np.float32)
+        observaciones = self._observaciones()
+
+        infos = [{} for _ in range(self.num_envs)]
+        terminados = np.zeros(self.num_envs, dtype=bool)
+        if self.max_pasos is not None:
+            terminados = self.num_pasos >= self.max_pasos
+            filas = np.nonzero(terminados)[0]
+            if filas.size:
+                for i in filas:
+                    infos[i]["terminal_observation"] = observaciones[i].copy()
+                    infos[i]["TimeLimit.truncated"] = True
+                self._reiniciar(filas)
+                observaciones[filas] = self._observaciones()[filas]
+        return observaciones, recompensas, terminados, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        metodo = getattr(self, method_name)
+        return [metodo(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
+
+    def estadisticas(self):
+        return {
+            "llegadas": int(self.num_llegadas.sum()),
+            "completadas": int(self.num_completadas.sum()),
+            "en_cola_media": float(self.cola.mean()),
+            "servidores_medio": float(self.num_servidores.mean())
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide los pasos por segundo del entorno vectorizado en NumPy.")
+    parser.add_argument("--entornos", type=int, default=256)
+    parser.add_argument("--pasos", type=int, default=1000, help="Pasos de cada entorno")
+    parser.add_argument("--tasa", type=float, default=2.0, help="Solicitudes por segundo virtual")
+    parser.add_argument("--subpasos", type=int, default=10)
+    parser.add_argument("--observacion", choices=["servidores", "agregada"], default="servidores")
+    args = parser.parse_args()
+
+    entorno = EntornoVectorizado(args.entornos, args.tasa, subpasos=args.subpasos, semilla=0,
+                                 modo_observacion=args.observacion)
+    entorno.reset()
+    rng = np.random.default_rng(0)
+
+    inicio = time.perf_counter()
+    for _ in range(args.pasos):
+        entorno.step(rng.integers(0, 3, size=args.entornos))
+    duracion = time.perf_counter() - inicio
+
+    pasos = args.pasos * args.entornos
+    pasos_por_segundo = pasos / duracion
+    print(f"{pasos} pasos ({args.entornos} entornos) en {duracion:.2f} s: {pasos_por_segundo:,.0f} pasos/s "
+          f"({pasos_por_segundo * 3600 / 1e6:.1f} millones de pasos por hora)")
+    print(entorno.estadisticas())
+
+if __name__ == "__main__":
+    main()
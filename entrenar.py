@@ -0,0 +1,81 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from artefactos import DIRECTORIO_ARTEFACTOS, guardar_bundle
+from asignador_recursos import DemandPredictor
+from carga_datos import cargar_datos_entrenamiento
+
+# Datos mínimos para entrenar si no hay ningún CSV de simulación
+training_data_predefined = [
+    ({"longitud": 10, "tipo": "simple"}, 1),
+    ({"longitud": 25, "tipo": "compleja"}, 3),
+    ({"longitud": 15, "tipo": "codigo"}, 5),
+    ({"longitud": 12, "tipo": "simple"}, 1),
+    ({"longitud": 30, "tipo": "compleja"}, 4),
+    ({"longitud": 20, "tipo": "codigo"}, 6)
+]
+
+# Políticas PPO que se incluyen en el bundle, por modo de observación (ver agente_rl.py --observacion).
+# La agregada sirve para cualquier NUM_SERVIDORES_MAX; la de 'servidores', solo para el de su entrenamiento (5)
+POLITICAS = {
+    "servidores": "modelo_ppo_balanceo.zip",
+    "agregada": "modelo_ppo_balanceo_agregada.zip"
+}
+
+def entrenar_predictor(directorio, ruta_csv="datos_simulacion.csv", epochs=100):
+    """
+    Entrena desde cero un predictor de demanda con los datos del CSV (o los
+    predefinidos si no hay). Keras guarda el modelo y su normalización en
+    `directorio`, nunca en el directorio de trabajo: así no se parte de un
+    modelo anterior que haya quedado allí.
+
+    Returns:
+        DemandPredictor: El predictor entrenado.
+    """
+    demand_predictor = DemandPredictor(os.path.join(directorio, "predictor_demanda.h5"))
+
+    X_train, y_train = None, None
+    if os.path.exists(ruta_csv):
+        X_train, y_train = cargar_datos_entrenamiento(ruta_csv)
+
+    if X_train is None or y_train is None:
+        print("No se encontraron datos de entrenamiento en el CSV. Se usará un conjunto de datos predefinido.")
+        X_train = np.array([demand_predictor._vector_caracteristicas(d[0]) for d in training_data_predefined])
+        y_train = np.array([d[1] for d in training_data_predefined])
+
+    demand_predictor.train(X_train, y_train, epochs=epochs)
+    return demand_predictor
+
+def entrenar_y_guardar(ruta_csv="datos_simulacion.csv", epochs=100, politicas=POLITICAS,
+                       directorio=DIRECTORIO_ARTEFACTOS, version=None):
+    """
+    Entrena el predictor de demanda y guarda un nuevo bundle de artefactos para servir.
+
+    Returns:
+        BundleArtefactos: El bundle guardado.
+    """
+    with tempfile.TemporaryDirectory(prefix="entrenar_") as directorio_temporal:
+        demand_predictor = entrenar_predictor(directorio_temporal, ruta_csv, epochs)
+        return guardar_bundle(demand_predictor, politicas, directorio, version)
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena los modelos y publica un bundle de artefactos para servir.")
+    parser.add_argument("--csv", default="datos_simulacion.csv", help="CSV de simulación con los datos de entrenamiento")
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--politica", default=POLITICAS["servidores"],
+                        help="Política PPO con observación por servidor que se incluye en el bundle")
+    parser.add_argument("--politica-agregada", default=POLITICAS["agregada"],
+                        help="Política PPO con observación agregada que se incluye en el bundle")
+    parser.add_argument("--directorio", default=DIRECTORIO_ARTEFACTOS)
+    parser.add_argument("--version", default=None, help="Nombre de la versión (por defecto, fecha y hora)")
+    args = parser.parse_args()
+
+    politicas = {"servidores": args.politica, "agregada": args.politica_agregada}
+    bundle = entrenar_y_guardar(args.csv, args.epochs, politicas, args.directorio, args.version)
+    print(f"Versión {bundle.version} publicada.")
+
+if __name__ == "__main__":
+    main()
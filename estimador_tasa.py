@@ -0,0 +1,124 @@
+import math
+import threading
+import time
+
+class EstimadorTasa:
+    """
+    Estima la tasa de llegadas con coste O(1) por llegada y memoria constante.
+
+    - Tasa instantánea: llegadas de los últimos `tamano_buffer` intervalos (buffer
+      circular de tiempos entre llegadas) dividida por su duración.
+    - Tasas EWMA en varios horizontes: cada llegada suma 1/horizonte a un valor que
+      decae con exp(-Δt/horizonte), es decir, las llegadas recientes pesan más.
+    - Media y varianza de los tiempos entre llegadas sobre el buffer circular.
+
+    Los tiempos son segundos de cualquier reloj (por defecto time.time); el
+    simulador de eventos pasa su reloj virtual.
+    """
+
+    def __init__(self, horizontes=(1.0, 10.0, 60.0), tamano_buffer=256, reloj=time.time):
+        self.horizontes = tuple(horizontes)
+        self.tamano_buffer = tamano_buffer
+        self.reloj = reloj
+        self.num_llegadas = 0
+        self.ultima_llegada = None
+        self._ewma = [0.0] * len(self.horizontes)  # Valor de cada EWMA en `ultima_llegada`
+        self._inversos = [1.0 / h for h in self.horizontes]
+        self._intervalos = [0.0] * tamano_buffer
+        self._posicion = 0
+        self._num_intervalos = 0
+        self._suma = 0.0
+        self._suma_cuadrados = 0.0
+        self._lock = threading.Lock()
+
+    def registrar(self, t=None):
+        """Registra una llegada en el instante `t` (por defecto, ahora)."""
+        t = self.reloj() if t is None else t
+        with self._lock:
+            self.num_llegadas += 1
+            if self.ultima_llegada is None:
+                self.ultima_llegada = t
+                self._ewma = list(self._inversos)
+                return
+
+            intervalo = t - self.ultima_llegada
+            if intervalo < 0.0:
+                intervalo = 0.0
+            self.ultima_llegada = t
+            exp = math.exp
+            self._ewma = [valor * exp(-intervalo * inverso) + inverso
+                          for valor, inverso in zip(self._ewma, self._inversos)]
+
+            # Sustituir el intervalo más antiguo del buffer circular
+            posicion = self._posicion
+            if self._num_intervalos < self.tamano_buffer:
+                self._num_intervalos += 1
+                antiguo = 0.0
+            else:
+                antiguo = self._intervalos[posicion]
+            self._intervalos[posicion] = intervalo
+            self._suma += intervalo - antiguo
+            self._suma_cuadrados += intervalo * intervalo - antiguo * antiguo
+            posicion += 1
+            if posicion == self.tamano_buffer:
+                posicion = 0
+                # Recalcular las sumas en cada vuelta para no acumular error de redondeo
+                self._suma = math.fsum(self._intervalos)
+                self._suma_cuadrados = math.fsum(x * x for x in self._intervalos)
+            self._posicion = posicion
+
+    def tasa_instantanea(self, ahora=None):
+        """Llegadas por segundo sobre los últimos intervalos, contando el tiempo desde la última llegada."""
+        ahora = self.reloj() if ahora is None else ahora
+        with self._lock:
+            if self._num_intervalos == 0:
+                return 0.0
+            duracion = self._suma + max(ahora - self.ultima_llegada, 0.0)
+            return self._num_intervalos / duracion if duracion > 0 else 0.0
+
+    def tasa_ewma(self, horizonte, ahora=None):
+        """Tasa EWMA (llegadas por segundo) del horizonte dado, que debe ser uno de `horizontes`."""
+        i = self.horizontes.index(horizonte)
+        return self.tasas_ewma(ahora)[i]
+
+    def tasas_ewma(self, ahora=None):
+        """Tasas EWMA de todos los horizontes, en el orden de `horizontes`."""
+        ahora = self.reloj() if ahora is None else ahora
+        with self._lock:
+            if self.ultima_llegada is None:
+                return [0.0] * len(self.horizontes)
+            transcurrido = max(ahora - self.ultima_llegada, 0.0)
+            exp = math.exp
+            return [valor * exp(-transcurrido * inverso) for valor, inverso in zip(self._ewma, self._inversos)]
+
+    def media_varianza_intervalos(self):
+        """Media y varianza de los tiempos entre llegadas del buffer circular."""
+        with self._lock:
+            n = self._num_intervalos
+            if n == 0:
+                return 0.0, 0.0
+            media = self._suma / n
+            return media, max(self._suma_cuadrados / n - media * media, 0.0)
+
+    def coeficiente_variacion(self):
+        """Desviación típica / media de los tiempos entre llegadas: 1 para llegadas de Poisson, >1 en ráfagas."""
+        media, varianza = self.media_varianza_intervalos()
+        return math.sqrt(varianza) / media if media > 0 else 0.0
+
+    def caracteristicas(self, ahora=None):
+        """[tasas EWMA de cada horizonte..., coeficiente de variación], para la observación del agente."""
+        return self.tasas_ewma(ahora) + [self.coeficiente_variacion()]
+
+    def estadisticas(self, ahora=None):
+        ahora = self.reloj() if ahora is None else ahora
+        media, varianza = self.media_varianza_intervalos()
+        estadisticas = {
+            "llegadas": self.num_llegadas,
+            "tasa_instantanea": self.tasa_instantanea(ahora),
+            "intervalo_medio": media,
+            "varianza_intervalos": varianza,
+            "coeficiente_variacion": self.coeficiente_variacion()
+        }
+        for horizonte, tasa in zip(self.horizontes, self.tasas_ewma(ahora)):
+            estadisticas[f"tasa_ewma_{horizonte:g}s"] = tasa
+        return estadisticas
@@ -0,0 +1,175 @@
+import heapq
+import itertools
+import random
+
+class EstrategiaSeleccion:
+    """
+    Elige el servidor al que se entrega la siguiente solicitud.
+
+    Mantiene una estructura indexada de los servidores disponibles (listos y con
+    hueco) que se actualiza cuando cambia su estado, en lugar de recorrer todos
+    los servidores en cada reparto. Quien la usa debe llamar a `actualizar` cada
+    vez que cambie la carga, los pendientes o el arranque de un servidor, y no es
+    segura entre hilos: AsignadorRecursos la protege con su condición.
+    """
+
+    def __init__(self, max_pendientes_servidor=2, semilla=None):
+        self.max_pendientes_servidor = max_pendientes_servidor
+        self.rng = random.Random(semilla)
+        self._servidores = set()
+
+    def disponible(self, servidor):
+        return not servidor.arrancando and servidor.pendientes < self.max_pendientes_servidor
+
+    def agregar(self, servidor):
+        self._servidores.add(servidor)
+        self._actualizar(servidor)
+
+    def quitar(self, servidor):
+        self._servidores.discard(servidor)
+        self._descartar(servidor)
+
+    def actualizar(self, servidor):
+        # Los servidores ya quitados pueden seguir terminando trabajo: se ignoran
+        if servidor in self._servidores:
+            self._actualizar(servidor)
+
+    def elegir(self):
+        """Devuelve el servidor elegido, o None si no hay ninguno disponible."""
+        raise NotImplementedError
+
+    def _actualizar(self, servidor):
+        raise NotImplementedError
+
+    def _descartar(self, servidor):
+        raise NotImplementedError
+
+class EstrategiaMonticulo(EstrategiaSeleccion):
+    """
+    Servidores disponibles en un montículo ordenado por `clave`. Cada
+    actualización añade una entrada nueva y deja obsoleta la anterior, que se
+    descarta al llegar a la cima (invalidación perezosa): elegir y actualizar
+    cuestan O(log n).
+    """
+
+    def __init__(self, max_pendientes_servidor=2, semilla=None):
+        super().__init__(max_pendientes_servidor, semilla)
+        self._monticulo = []  # (clave, secuencia, servidor)
+        self._vigentes = {}  # {servidor: secuencia de su entrada válida}
+        self._secuencia = itertools.count()
+
+    def clave(self, servidor):
+        raise NotImplementedError
+
+    def _actualizar(self, servidor):
+        if not self.disponible(servidor):
+            self._vigentes.pop(servidor, None)
+            return
+        secuencia = next(self._secuencia)
+        self._vigentes[servidor] = secuencia
+        heapq.heappush(self._monticulo, (self.clave(servidor), secuencia, servidor))
+        if len(self._monticulo) > 2 * len(self._vigentes) + 64:
+            self._compactar()
+
+    def _descartar(self, servidor):
+        self._vigentes.pop(servidor, None)
+
+    def _compactar(self):
+        self._monticulo = [entrada for entrada in self._monticulo if self._vigentes.get(entrada[2]) == entrada[1]]
+        heapq.heapify(self._monticulo)
+
+    def elegir(self):
+        monticulo = self._monticulo
+        while monticulo:
+            _, secuencia, servidor = monticulo[0]
+            if self._vigentes.get(servidor) == secuencia:
+                return servidor
+            heapq.heappop(monticulo)
+        return None
+
+class MenorCarga(EstrategiaMonticulo):
+    """El servidor con menos carga; a igual carga, el de menos pendientes."""
+
+    def clave(self, servidor):
+        return (servidor.carga, servidor.pendientes)
+
+class ColaMasCorta(EstrategiaMonticulo):
+    """Join-shortest-queue: el servidor con menos solicitudes pendientes."""
+
+    def clave(self, servidor):
+        return (servidor.pendientes, servidor.carga)
+
+class MenorCargaPonderada(EstrategiaMonticulo):
+    """Menor carga relativa a la capacidad de cada servidor (servidores heterogéneos)."""
+
+    def clave(self, servidor):
+        return (servidor.carga / servidor.capacidad, servidor.pendientes / servidor.capacidad)
+
+class EstrategiaConjunto(EstrategiaSeleccion):
+    """Servidores disponibles en una lista indexada: añadir, quitar y elegir cuestan O(1)."""
+
+    def __init__(self, max_pendientes_servidor=2, semilla=None):
+        super().__init__(max_pendientes_servidor, semilla)
+        self._disponibles = []
+        self._posiciones = {}  # {servidor: índice en _disponibles}
+
+    def _actualizar(self, servidor):
+        if self.disponible(servidor):
+            if servidor not in self._posiciones:
+                self._posiciones[servidor] = len(self._disponibles)
+                self._disponibles.append(servidor)
+        else:
+            self._descartar(servidor)
+
+    def _descartar(self, servidor):
+        posicion = self._posiciones.pop(servidor, None)
+        if posicion is None:
+            return
+        # Mover el último a la posición que queda libre
+        ultimo = self._disponibles.pop()
+        if ultimo is not servidor:
+            self._disponibles[posicion] = ultimo
+            self._posiciones[ultimo] = posicion
+
+class DosOpciones(EstrategiaConjunto):
+    """Power-of-two-choices: de dos servidores disponibles al azar, el de menos carga."""
+
+    def elegir(self):
+        n = len(self._disponibles)
+        if n == 0:
+            return None
+        if n == 1:
+            return self._disponibles[0]
+        i = self.rng.randrange(n)
+        j = self.rng.randrange(n - 1)
+        if j >= i:
+            j += 1
+        a, b = self._disponibles[i], self._disponibles[j]
+        return a if (a.carga, a.pendientes) <= (b.carga, b.pendientes) else b
+
+class RoundRobin(EstrategiaConjunto):
+    """Turnos entre los servidores disponibles (el orden cambia cuando entran y salen)."""
+
+    def __init__(self, max_pendientes_servidor=2, semilla=None):
+        super().__init__(max_pendientes_servidor, semilla)
+        self._turno = 0
+
+    def elegir(self):
+        if not self._disponibles:
+            return None
+        self._turno = (self._turno + 1) % len(self._disponibles)
+        return self._disponibles[self._turno]
+
+ESTRATEGIAS = {
+    "menor_carga": MenorCarga,
+    "dos_opciones": DosOpciones,
+    "cola_mas_corta": ColaMasCorta,
+    "menor_carga_ponderada": MenorCargaPonderada,
+    "round_robin": RoundRobin
+}
+
+def crear_estrategia(nombre, max_pendientes_servidor=2, semilla=None):
+    """Crea la estrategia de selección de servidor registrada con `nombre`."""
+    if nombre not in ESTRATEGIAS:
+        raise ValueError(f"Estrategia de selección desconocida: {nombre}. Opciones: {', '.join(ESTRATEGIAS)}")
+    return ESTRATEGIAS[nombre](max_pendientes_servidor, semilla)
@@ -0,0 +1,104 @@
+import numpy as np
+
+class EstadoFlota:
+    """
+    Estado de los servidores de la flota en arrays de NumPy (struct-of-arrays):
+    una fila por servidor, con las filas 0..n-1 ocupadas y contiguas. Permite
+    calcular agregados de miles de servidores con operaciones vectoriales en
+    lugar de recorrer los objetos.
+
+    Quien la usa debe llamar a `actualizar` cada vez que cambie la carga, los
+    pendientes o el arranque de un servidor. No es segura entre hilos.
+    """
+
+    def __init__(self, capacidad_inicial=64):
+        self.n = 0
+        self.carga = np.zeros(capacidad_inicial)
+        self.pendientes = np.zeros(capacidad_inicial, dtype=np.int64)
+        self.arrancando = np.zeros(capacidad_inicial, dtype=bool)
+        self.capacidad = np.ones(capacidad_inicial)
+        self.servidores = []  # Servidor de cada fila
+        self._filas = {}  # {servidor: fila}
+        # Totales que se mantienen al actualizar, para consultarlos en O(1)
+        self._carga_listos = 0.0
+        self._num_arrancando = 0
+        self._actualizaciones = 0
+
+    def __len__(self):
+        return self.n
+
+    def __contains__(self, servidor):
+        return servidor in self._filas
+
+    def _ampliar(self):
+        for nombre in ("carga", "pendientes", "arrancando", "capacidad"):
+            actual = getattr(self, nombre)
+            nuevo = np.zeros(len(actual) * 2, dtype=actual.dtype)
+            nuevo[:len(actual)] = actual
+            setattr(self, nombre, nuevo)
+
+    def agregar(self, servidor):
+        if servidor in self._filas:
+            return
+        if self.n == len(self.carga):
+            self._ampliar()
+        fila = self.n
+        self._filas[servidor] = fila
+        self.servidores.append(servidor)
+        self.carga[fila] = 0.0
+        self.arrancando[fila] = False
+        self.n += 1
+        self.actualizar(servidor)
+
+    def quitar(self, servidor):
+        fila = self._filas.pop(servidor, None)
+        if fila is None:
+            return
+        self._descontar(fila)
+        # Mover la última fila al hueco para que las ocupadas sigan contiguas
+        ultima = self.n - 1
+        ultimo = self.servidores.pop()
+        if fila != ultima:
+            self.servidores[fila] = ultimo
+            self._filas[ultimo] = fila
+            for array in (self.carga, self.pendientes, self.arrancando, self.capacidad):
+                array[fila] = array[ultima]
+        self.n -= 1
+
+    def actualizar(self, servidor):
+        fila = self._filas.get(servidor)
+        if fila is None:
+            return
+        self._descontar(fila)
+        self.carga[fila] = servidor.carga
+        self.pendientes[fila] = servidor.pendientes
+        self.arrancando[fila] = servidor.arrancando
+        self.capacidad[fila] = servidor.capacidad
+        if servidor.arrancando:
+            self._num_arrancando += 1
+        else:
+            self._carga_listos += servidor.carga
+
+        self._actualizaciones += 1
+        if self._actualizaciones % 4096 == 0:
+            # Recalcular de vez en cuando para no acumular error de redondeo
+            self._carga_listos = float(self.carga[:self.n][~self.arrancando[:self.n]].sum())
+
+    def _descontar(self, fila):
+        if self.arrancando[fila]:
+            self._num_arrancando -= 1
+        else:
+            self._carga_listos -= float(self.carga[fila])
+
+    def carga_total(self, solo_listos=True):
+        """Suma de la carga de los servidores (por defecto, solo de los que ya han arrancado)."""
+        if solo_listos:
+            return self._carga_listos
+        return float(self.carga[:self.n].sum())
+
+    def num_arrancando(self):
+        return self._num_arrancando
+
+    def arrays(self):
+        """Vistas (carga, arrancando, pendientes) de los servidores de la flota."""
+        return self.carga[:self.n], self.arrancando[:self.n], self.pendientes[:self.n]
@@ -1,47 +1,245 @@
+import itertools
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+PERFILES = ("basico", "intermedio", "avanzado")
+BASICO, INTERMEDIO, AVANZADO = range(len(PERFILES))
+TAMANO_BLOQUE_PERFILES = 250_000  # Usuarios por bloque al recalcular todos los perfiles
+MAX_TRABAJOS_GUARDADOS = 100
+
+def clasificar_perfil(num_solicitudes, num_complejas, num_codigo):
+    """Perfil (índice en PERFILES) según los contadores de solicitudes del usuario."""
+    if num_solicitudes >= 15 and num_codigo >= 5:
+        return AVANZADO
+    if num_solicitudes >= 10 and num_complejas >= 3:
+        return INTERMEDIO
+    return BASICO
+
+def clasificar_perfiles(total, complejas, codigo):
+    """Versión vectorial de clasificar_perfil: perfil (int8) de cada posición de los arrays."""
+    perfiles = np.full(len(total), BASICO, dtype=np.int8)
+    perfiles[(total >= 10) & (complejas >= 3)] = INTERMEDIO
+    perfiles[(total >= 15) & (codigo >= 5)] = AVANZADO
+    return perfiles
+
 class GestorUsuarios:
-    def __init__(self):
-        self.perfiles = {}  # {user_id: perfil}
-        self.historial = {}  # {user_id: [lista de solicitudes]}
+    """
+    Perfiles de usuario a partir de contadores por usuario, sin guardar el historial.
+
+    Cada user_id se interna como una fila de columnas compactas (array.array, 8
+    bytes por contador), de modo que registrar una solicitud y actualizar el
+    perfil cuestan O(1) y la memoria crece con el número de usuarios, no con el de
+    solicitudes. `columnas()` las expone como arrays de NumPy sin copiarlas.
+
+    Con `semivida` (segundos) se mantienen además contadores con decaimiento
+    exponencial, que reflejan la actividad reciente de cada usuario.
+    """
+
+    def __init__(self, semivida=None):
+        self.semivida = semivida
+        self._ids = {}  # {user_id: fila}
+        self.user_ids = []  # user_id de cada fila
+        self.total = array("q")
+        self.complejas = array("q")
+        self.codigo = array("q")
+        self.perfil = array("b")
+        if semivida is not None:
+            self.reciente_total = array("d")
+            self.reciente_complejas = array("d")
+            self.reciente_codigo = array("d")
+            self.ultima_actividad = array("d")
+        self._lock = threading.Lock()
+        self._trabajos = OrderedDict()  # {id: estado} de las últimas actualizaciones en segundo plano
+        self._contador_trabajos = itertools.count(1)
+        self._trabajo_en_curso = None
+
+    def _nombres_columnas(self):
+        nombres = ["total", "complejas", "codigo", "perfil"]
+        if self.semivida is not None:
+            nombres += ["reciente_total", "reciente_complejas", "reciente_codigo", "ultima_actividad"]
+        return nombres
+
+    def _fila(self, user_id):
+        """Fila del usuario; la crea (perfil básico, contadores a cero) si no existe."""
+        fila = self._ids.get(user_id)
+        if fila is not None:
+            return fila
+        fila = len(self.user_ids)
+        self._ids[user_id] = fila
+        self.user_ids.append(user_id)
+        for nombre in self._nombres_columnas():
+            getattr(self, nombre).append(0)
+        return fila
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def columnas(self):
+        """
+        Vistas de NumPy (sin copia) de las columnas, por nombre. Mientras existan no
+        se pueden añadir usuarios: hay que usarlas con el lock tomado y soltarlas después.
+        """
+        return {nombre: np.frombuffer(getattr(self, nombre), dtype=getattr(self, nombre).typecode)
+                for nombre in self._nombres_columnas()}
 
     def obtener_perfil(self, user_id):
         """
         Obtiene el perfil de un usuario. Si no existe, lo crea con un perfil básico.
         """
-        if user_id not in self.perfiles:
-            self.perfiles[user_id] = "basico"
-            self.historial[user_id] = []
-        return self.perfiles[user_id]
+        with self._lock:
+            return PERFILES[self.perfil[self._fila(user_id)]]
+
+    def registrar_solicitud(self, user_id, solicitud, timestamp=None):
+        """
+        Suma la solicitud a los contadores del usuario.
+        """
+        with self._lock:
+            self._sumar(self._fila(user_id), solicitud["tipo"], timestamp)
 
-    def registrar_solicitud(self, user_id, solicitud):
+    def _sumar(self, fila, tipo, timestamp):
+        """Suma una solicitud de tipo `tipo` a los contadores de la fila. Se llama con el lock tomado."""
+        self.total[fila] += 1
+        if tipo == "compleja":
+            self.complejas[fila] += 1
+        elif tipo == "codigo":
+            self.codigo[fila] += 1
+
+        if self.semivida is not None:
+            ahora = time.time() if timestamp is None else timestamp
+            factor = 0.5 ** (max(ahora - self.ultima_actividad[fila], 0.0) / self.semivida)
+            self.ultima_actividad[fila] = ahora
+            self.reciente_total[fila] = self.reciente_total[fila] * factor + 1.0
+            self.reciente_complejas[fila] = self.reciente_complejas[fila] * factor + (tipo == "compleja")
+            self.reciente_codigo[fila] = self.reciente_codigo[fila] * factor + (tipo == "codigo")
+
+    def registrar_lote(self, user_ids, solicitudes, timestamp=None):
         """
-        Registra una solicitud en el historial del usuario.
+        Para cada solicitud del lote, en orden: la registra, lee el perfil del
+        usuario y lo actualiza, como hace /solicitud, tomando el lock una sola vez.
+        Devuelve el perfil leído para cada solicitud.
         """
-        if user_id not in self.historial:
-            self.historial[user_id] = []
-        self.historial[user_id].append(solicitud)
+        perfiles = []
+        with self._lock:
+            for user_id, solicitud in zip(user_ids, solicitudes):
+                fila = self._fila(user_id)
+                self._sumar(fila, solicitud["tipo"], timestamp)
+                perfiles.append(PERFILES[self.perfil[fila]])
+                self.perfil[fila] = clasificar_perfil(self.total[fila], self.complejas[fila], self.codigo[fila])
+        return perfiles
+
+    def contadores(self, user_id, ahora=None):
+        """Contadores del usuario (y los recientes, si hay semivida), o None si no existe."""
+        with self._lock:
+            fila = self._ids.get(user_id)
+            if fila is None:
+                return None
+            contadores = {
+                "total": self.total[fila],
+                "complejas": self.complejas[fila],
+                "codigo": self.codigo[fila],
+                "perfil": PERFILES[self.perfil[fila]]
+            }
+            if self.semivida is not None:
+                ahora = time.time() if ahora is None else ahora
+                factor = 0.5 ** (max(ahora - self.ultima_actividad[fila], 0.0) / self.semivida)
+                contadores["reciente_total"] = self.reciente_total[fila] * factor
+                contadores["reciente_complejas"] = self.reciente_complejas[fila] * factor
+                contadores["reciente_codigo"] = self.reciente_codigo[fila] * factor
+            return contadores
 
     def actualizar_perfil(self, user_id):
         """
-        Actualiza el perfil del usuario en función de su historial de solicitudes.
-        """
-        if user_id not in self.historial:
-            return
-
-        historial = self.historial[user_id]
-        num_solicitudes = len(historial)
-        num_complejas = sum(1 for s in historial if s["tipo"] == "compleja")
-        num_codigo = sum(1 for s in historial if s["tipo"] == "codigo")
-
-        if num_solicitudes >= 15 and num_codigo >= 5:
-            self.perfiles[user_id] = "avanzado"
-        elif num_solicitudes >= 10 and num_complejas >= 3:
-            self.perfiles[user_id] = "intermedio"
-        else:
-            self.perfiles[user_id] = "basico"
-    
-    def actualizar_perfiles(self):
-      """
-      Actualiza los perfiles de todos los usuarios registrados.
-      """
-      for user_id in self.historial.keys():
-          self.actualizar_perfil(user_id)
\ No newline at end of file
+        Actualiza el perfil del usuario en función de sus contadores de solicitudes.
+        """
+        with self._lock:
+            fila = self._ids.get(user_id)
+            if fila is None:
+                return
+            self.perfil[fila] = clasificar_perfil(self.total[fila], self.complejas[fila], self.codigo[fila])
+
+    def cargar_contadores(self, user_ids, total, complejas, codigo):
+        """Añade de golpe usuarios nuevos con sus contadores (perfil básico hasta el siguiente recálculo)."""
+        with self._lock:
+            inicio = len(self.user_ids)
+            nuevos = dict(zip(user_ids, range(inicio, inicio + len(user_ids))))
+            if len(nuevos) != len(user_ids) or not self._ids.keys().isdisjoint(nuevos):
+                raise ValueError("cargar_contadores solo admite usuarios nuevos y sin repetir")
+            self._ids.update(nuevos)
+            self.user_ids.extend(user_ids)
+            self.total.frombytes(np.asarray(total, dtype=np.int64).tobytes())
+            self.complejas.frombytes(np.asarray(complejas, dtype=np.int64).tobytes())
+            self.codigo.frombytes(np.asarray(codigo, dtype=np.int64).tobytes())
+            self.perfil.frombytes(bytes(len(user_ids)))
+            if self.semivida is not None:
+                for nombre in ("reciente_total", "reciente_complejas", "reciente_codigo", "ultima_actividad"):
+                    getattr(self, nombre).frombytes(bytes(8 * len(user_ids)))
+
+    def _actualizar_bloque(self, inicio, fin):
+        # Las vistas de NumPy se sueltan al volver, antes de liberar el lock
+        columnas = self.columnas()
+        columnas["perfil"][inicio:fin] = clasificar_perfiles(columnas["total"][inicio:fin],
+                                                             columnas["complejas"][inicio:fin],
+                                                             columnas["codigo"][inicio:fin])
+
+    def actualizar_perfiles(self, tamano_bloque=TAMANO_BLOQUE_PERFILES, progreso=None):
+        """
+        Actualiza los perfiles de todos los usuarios registrados con una pasada
+        vectorial por bloques. El lock se suelta entre bloques para no frenar las
+        solicitudes; `progreso(procesados, total)` se llama tras cada bloque.
+        """
+        num_usuarios = len(self)
+        for inicio in range(0, num_usuarios, tamano_bloque):
+            fin = min(inicio + tamano_bloque, num_usuarios)
+            with self._lock:
+                self._actualizar_bloque(inicio, fin)
+            if progreso is not None:
+                progreso(fin, num_usuarios)
+        return num_usuarios
+
+    def iniciar_actualizacion_perfiles(self, tamano_bloque=TAMANO_BLOQUE_PERFILES):
+        """
+        Lanza actualizar_perfiles en un hilo y devuelve el id del trabajo para
+        consultar su estado. Si ya hay uno en curso, devuelve el de ese.
+        """
+        with self._lock:
+            if self._trabajo_en_curso is not None:
+                return self._trabajo_en_curso
+            id_trabajo = next(self._contador_trabajos)
+            self._trabajo_en_curso = id_trabajo
+            self._trabajos[id_trabajo] = {"id": id_trabajo, "estado": "en_curso", "procesados": 0,
+                                          "total": len(self.user_ids), "inicio": time.time(), "duracion": None}
+            while len(self._trabajos) > MAX_TRABAJOS_GUARDADOS:
+                self._trabajos.popitem(last=False)
+
+        threading.Thread(target=self._ejecutar_trabajo, args=(id_trabajo, tamano_bloque),
+                         name=f"perfiles-{id_trabajo}", daemon=True).start()
+        return id_trabajo
+
+    def _ejecutar_trabajo(self, id_trabajo, tamano_bloque):
+        trabajo = self._trabajos[id_trabajo]
+
+        def progreso(procesados, total):
+            trabajo["procesados"] = procesados
+            trabajo["total"] = total
+
+        try:
+            self.actualizar_perfiles(tamano_bloque, progreso)
+            trabajo["estado"] = "completado"
+        except Exception as e:
+            print(f"Error al actualizar perfiles: {e}")
+            trabajo["estado"] = "error"
+            trabajo["error"] = str(e)
+        finally:
+            trabajo["duracion"] = time.time() - trabajo["inicio"]
+            with self._lock:
+                self._trabajo_en_curso = None
+
+    def estado_actualizacion(self, id_trabajo):
+        """Estado de un trabajo de iniciar_actualizacion_perfiles, o None si no existe (o ya se descartó)."""
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            return dict(trabajo) if trabajo is not None else None
@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class PredictorPorLotes:
+    """
+    Agrupa en lotes las predicciones de demanda que llegan a la vez.
+
+    Cada llamada a `predict` se encola y espera su resultado. Un hilo de fondo
+    toma la primera solicitud y las que ya estén esperando; si es la única, la
+    resuelve al momento. Solo cuando hay varias a la vez (carga concurrente)
+    mantiene el lote abierto hasta `ventana` segundos (o hasta `tamano_max_lote`).
+    Cada lote se resuelve con una única llamada a `predict_batch` del predictor;
+    las solicitudes que llegan mientras tanto forman el lote siguiente.
+    """
+
+    def __init__(self, predictor, ventana=0.005, tamano_max_lote=64):
+        self.predictor = predictor
+        self.ventana = ventana
+        self.tamano_max_lote = tamano_max_lote
+        self.cola = queue.Queue()
+        self._lock = threading.Lock()
+        self.num_lotes = 0
+        self.num_lotes_sin_ventana = 0  # Lotes resueltos sin esperar a la ventana
+        self.num_predicciones = 0
+        self.tamano_lote_max = 0
+        self.histograma_tamanos = {}  # {tamaño de lote: número de lotes}
+        self.espera_total = 0.0  # Suma de los retrasos en cola de cada predicción
+        self.espera_max = 0.0
+        self.tiempo_inferencia_total = 0.0
+        self._hilo = threading.Thread(target=self._bucle, name="predictor-lotes", daemon=True)
+        self._hilo.start()
+
+    @property
+    def trained(self):
+        return self.predictor.trained
+
+    def predict(self, features):
+        """Predice la demanda de una solicitud esperando a que se procese su lote."""
+        # Los aciertos de caché se devuelven al momento, sin esperar a la ventana
+        buscar_en_cache = getattr(self.predictor, "buscar_en_cache", None)
+        if buscar_en_cache is not None:
+            prediccion = buscar_en_cache(features)
+            if prediccion is not None:
+                return prediccion
+
+        futuro = Future()
+        self.cola.put((features, time.time(), futuro))
+        return futuro.result()
+
+    def predict_batch(self, lista_features):
+        """Predice la demanda de una lista de solicitudes directamente, sin pasar por la cola."""
+        return self.predictor.predict_batch(lista_features)
+
+    def _bucle(self):
+        while True:
+            lote = [self.cola.get()]
+            # Recoger las que ya estén esperando; una solicitud sola no espera a la ventana
+            while len(lote) < self.tamano_max_lote:
+                try:
+                    lote.append(self.cola.get_nowait())
+                except queue.Empty:
+                    break
+            if len(lote) == 1:
+                self._resolver(lote, sin_ventana=True)
+                continue
+
+            limite = time.time() + self.ventana
+            while len(lote) < self.tamano_max_lote:
+                restante = limite - time.time()
+                try:
+                    if restante > 0:
+                        lote.append(self.cola.get(timeout=restante))
+                    else:
+                        # Vencida la ventana, recoger solo lo que ya esté esperando
+                        lote.append(self.cola.get_nowait())
+                except queue.Empty:
+                    break
+            self._resolver(lote)
+
+    def _resolver(self, lote, sin_ventana=False):
+        inicio = time.time()
+        try:
+            predicciones = self.predictor.predict_batch([features for features, _, _ in lote])
+        except Exception as e:
+            print(f"Error al predecir el lote de {len(lote)} solicitudes: {e}")
+            for _, _, futuro in lote:
+                futuro.set_exception(e)
+            return
+        fin = time.time()
+
+        for (_, _, futuro), prediccion in zip(lote, predicciones):
+            futuro.set_result(prediccion)
+
+        esperas = [inicio - llegada for _, llegada, _ in lote]
+        tamano = len(lote)
+        with self._lock:
+            self.num_lotes += 1
+            self.num_lotes_sin_ventana += sin_ventana
+            self.num_predicciones += tamano
+            self.tamano_lote_max = max(self.tamano_lote_max, tamano)
+            self.histograma_tamanos[tamano] = self.histograma_tamanos.get(tamano, 0) + 1
+            self.espera_total += sum(esperas)
+            self.espera_max = max(self.espera_max, max(esperas))
+            self.tiempo_inferencia_total += fin - inicio
+
+    def estadisticas(self):
+        """Devuelve las estadísticas de tamaño de lote y retraso en cola para ajustar la ventana."""
+        with self._lock:
+            num_lotes = self.num_lotes
+            num_predicciones = self.num_predicciones
+            return {
+                "ventana": self.ventana,
+                "tamano_max_lote": self.tamano_max_lote,
+                "num_lotes": num_lotes,
+                "num_lotes_sin_ventana": self.num_lotes_sin_ventana,
+                "num_predicciones": num_predicciones,
+                "tamano_lote_medio": num_predicciones / num_lotes if num_lotes else 0.0,
+                "tamano_lote_max": self.tamano_lote_max,
+                "histograma_tamanos": dict(sorted(self.histograma_tamanos.items())),
+                "espera_media": self.espera_total / num_predicciones if num_predicciones else 0.0,
+                "espera_max": self.espera_max,
+                "tiempo_inferencia_medio": self.tiempo_inferencia_total / num_lotes if num_lotes else 0.0
+            }
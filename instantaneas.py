@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+class HistorialInstantaneas:
+    """
+    Buffer circular de instantáneas periódicas del estado del balanceador.
+
+    Un hilo de fondo llama a `capturar` cada `intervalo` segundos y guarda el
+    resultado con un número de secuencia creciente, ya serializado a JSON para
+    que servirlo a varios clientes no cueste nada más. Los clientes piden las
+    instantáneas posteriores a un cursor (el último número de secuencia que
+    vieron) y pueden esperar a que llegue alguna nueva, así que sirve tanto
+    para long-polling como para Server-Sent Events.
+    """
+
+    def __init__(self, capturar, intervalo=0.1, capacidad=3000):
+        self.capturar = capturar
+        self.intervalo = intervalo
+        self._instantaneas = deque(maxlen=capacidad)  # (secuencia, json)
+        self._secuencia = 0
+        self._condicion = threading.Condition()
+        self._hilo = None
+        self.errores = 0
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name="instantaneas", daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        siguiente = time.monotonic()
+        while True:
+            self.capturar_ahora()
+            # Ritmo fijo: el tiempo de captura no retrasa las siguientes
+            siguiente += self.intervalo
+            espera = siguiente - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            else:
+                siguiente = time.monotonic()
+
+    def capturar_ahora(self):
+        """Captura y guarda una instantánea; devuelve su número de secuencia."""
+        try:
+            texto = json.dumps(self.capturar(), separators=(",", ":"))
+        except Exception as e:
+            self.errores += 1
+            print(f"Error al capturar el estado del balanceador: {e}")
+            return None
+        with self._condicion:
+            self._secuencia += 1
+            self._instantaneas.append((self._secuencia, texto))
+            self._condicion.notify_all()
+            return self._secuencia
+
+    @property
+    def ultima_secuencia(self):
+        return self._secuencia
+
+    def desde(self, cursor, espera=0.0):
+        """
+        Instantáneas con secuencia mayor que `cursor`, como lista de (secuencia, json).
+        Si no hay ninguna, espera hasta `espera` segundos a que llegue. Si el cursor
+        es tan antiguo que el buffer ya ha descartado parte de las siguientes, se
+        devuelven las que quedan; si es posterior a la última (el proceso se ha
+        reiniciado desde que el cliente lo obtuvo), se empieza desde el principio.
+        """
+        with self._condicion:
+            if cursor > self._secuencia:
+                cursor = 0
+            if self._secuencia <= cursor and espera > 0:
+                self._condicion.wait_for(lambda: self._secuencia > cursor, timeout=espera)
+            if self._secuencia <= cursor:
+                return []
+            # Las secuencias son consecutivas: la posición de cursor + 1 se calcula sin buscar
+            primera = self._instantaneas[0][0]
+            inicio = max(cursor + 1 - primera, 0)
+            return list(islice(self._instantaneas, inicio, None))
+
+    def estadisticas(self):
+        with self._condicion:
+            return {
+                "intervalo": self.intervalo,
+                "capacidad": self._instantaneas.maxlen,
+                "guardadas": len(self._instantaneas),
+                "ultima_secuencia": self._secuencia,
+                "errores": self.errores
+            }
@@ -0,0 +1,149 @@
+import threading
+from bisect import bisect_left
+
+# Límites (segundos) de los buckets de latencia: de 100 µs a 1 minuto
+LIMITES_LATENCIA = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _etiquetas_texto(etiquetas):
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas.items()) + "}"
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+class Contador:
+    """Contador monótono. `incrementar` solo toma un lock sin contención y suma un entero."""
+
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=None):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas or {}
+        self.valor = 0
+        self._lock = threading.Lock()
+
+    def incrementar(self, cantidad=1):
+        with self._lock:
+            self.valor += cantidad
+
+    def muestras(self):
+        yield self.nombre, self.etiquetas, self.valor
+
+class Histograma:
+    """
+    Histograma de buckets fijos al estilo Prometheus. Registrar una observación
+    busca su bucket con bisect sobre los límites y suma en listas preasignadas
+    bajo un lock propio, sin reservar memoria.
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=None, limites=LIMITES_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas or {}
+        self.limites = tuple(limites)
+        self._cuentas = [0] * (len(self.limites) + 1)  # La última, para lo que supera el mayor límite
+        self._suma = 0.0
+        self._lock = threading.Lock()
+
+    def observar(self, valor):
+        i = bisect_left(self.limites, valor)
+        with self._lock:
+            self._cuentas[i] += 1
+            self._suma += valor
+
+    def instantanea(self):
+        """(cuentas por bucket, suma) copiadas de forma consistente."""
+        with self._lock:
+            return list(self._cuentas), self._suma
+
+    def muestras(self):
+        cuentas, suma = self.instantanea()
+        acumulado = 0
+        for limite, cuenta in zip(self.limites + (float("inf"),), cuentas):
+            acumulado += cuenta
+            yield f"{self.nombre}_bucket", {**self.etiquetas, "le": _numero(limite)}, acumulado
+        yield f"{self.nombre}_sum", self.etiquetas, suma
+        yield f"{self.nombre}_count", self.etiquetas, acumulado
+
+class Medidor:
+    """
+    Gauge que se calcula al exportar llamando a `funcion`, sin coste en el camino
+    de las solicitudes. `funcion` devuelve un número o una lista de (etiquetas, valor).
+    """
+
+    def __init__(self, nombre, ayuda, funcion, etiquetas=None, tipo="gauge"):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.funcion = funcion
+        self.etiquetas = etiquetas or {}
+        self.tipo = tipo
+
+    def muestras(self):
+        valor = self.funcion()
+        if isinstance(valor, (list, tuple)):
+            for etiquetas, v in valor:
+                yield self.nombre, {**self.etiquetas, **etiquetas}, v
+        else:
+            yield self.nombre, self.etiquetas, valor
+
+class RegistroMetricas:
+    """Métricas del proceso, exportables en el formato de texto de Prometheus."""
+
+    def __init__(self):
+        self._metricas = []
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica):
+        with self._lock:
+            self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=None):
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, etiquetas=None, limites=LIMITES_LATENCIA):
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, limites))
+
+    def medidor(self, nombre, ayuda, funcion, etiquetas=None, tipo="gauge"):
+        """Gauge (o, con tipo='counter', contador) calculado al exportar."""
+        return self._registrar(Medidor(nombre, ayuda, funcion, etiquetas, tipo))
+
+    def exportar(self):
+        """Texto en el formato de exposición de Prometheus (0.0.4)."""
+        with self._lock:
+            metricas = list(self._metricas)
+        # Las series de una misma familia comparten HELP y TYPE
+        familias = {}
+        for metrica in metricas:
+            familias.setdefault(metrica.nombre, []).append(metrica)
+
+        lineas = []
+        for nombre, series in familias.items():
+            lineas.append(f"# HELP {nombre} {series[0].ayuda}")
+            lineas.append(f"# TYPE {nombre} {series[0].tipo}")
+            for metrica in series:
+                try:
+                    for nombre_muestra, etiquetas, valor in metrica.muestras():
+                        lineas.append(f"{nombre_muestra}{_etiquetas_texto(etiquetas)} {_numero(valor)}")
+                except Exception as e:
+                    lineas.append(f"# Error al calcular {nombre}: {e}")
+        return "\n".join(lineas) + "\n"
+
+# Registro compartido del proceso, que app.py expone en /metrics
+metricas = RegistroMetricas()
+LATENCIA_ETAPA = "balanceador_etapa_segundos"
+AYUDA_LATENCIA_ETAPA = "Duración de cada etapa del procesamiento de una solicitud"
+
+def histograma_etapa(etapa):
+    """Histograma de latencia de una etapa de /solicitud (una serie de balanceador_etapa_segundos)."""
+    return metricas.histograma(LATENCIA_ETAPA, AYUDA_LATENCIA_ETAPA, {"etapa": etapa})
@@ -0,0 +1,192 @@
+import argparse
+import time
+
+import numpy as np
+
+ACTIVACIONES = {
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0),
+    "linear": lambda x: x
+}
+
+def exportar_politica(ruta_zip, ruta_npz):
+    """
+    Extrae la red del actor de una política MlpPolicy de PPO (`.zip` de
+    stable-baselines3) y la guarda en un `.npz` que se puede servir solo con NumPy.
+
+    Args:
+        ruta_zip (str): Ruta al modelo PPO guardado.
+        ruta_npz (str): Ruta del archivo de salida.
+
+    Returns:
+        str: La ruta del archivo exportado.
+    """
+    # PyTorch y stable-baselines3 solo hacen falta para exportar, no para servir
+    from stable_baselines3 import PPO
+    from torch import nn
+
+    modelo = PPO.load(ruta_zip, device="cpu")
+    politica = modelo.policy
+
+    capas = []
+    for modulo in list(politica.mlp_extractor.policy_net) + [politica.action_net]:
+        if isinstance(modulo, nn.Linear):
+            capas.append([modulo.weight.detach().numpy().T, modulo.bias.detach().numpy(), "linear"])
+        elif isinstance(modulo, nn.Tanh):
+            capas[-1][2] = "tanh"
+        elif isinstance(modulo, nn.ReLU):
+            capas[-1][2] = "relu"
+        else:
+            raise ValueError(f"Capa no soportada en la política: {modulo}")
+
+    arrays = {"activaciones": np.array([activacion for _, _, activacion in capas]),
+              "forma_observacion": np.array(modelo.observation_space.shape)}
+    for i, (pesos, sesgo, _) in enumerate(capas):
+        arrays[f"pesos_{i}"] = pesos.astype(np.float32)
+        arrays[f"sesgo_{i}"] = sesgo.astype(np.float32)
+
+    np.savez(ruta_npz, **arrays)
+    print(f"Política exportada para NumPy en {ruta_npz}")
+    return ruta_npz
+
+class PoliticaNumPy:
+    """
+    Política de escalado exportada con `exportar_politica`. Ofrece la misma
+    interfaz `predict` que PPO para el autoescalador, sin PyTorch.
+    """
+
+    def __init__(self, capas, forma_observacion, semilla=None):
+        self.capas = capas  # [(pesos, sesgo, activacion)]
+        self.forma_observacion = tuple(forma_observacion)
+        self.rng = np.random.default_rng(semilla)
+
+    @classmethod
+    def cargar(cls, ruta, semilla=None):
+        """Carga una política exportada en formato `.npz`."""
+        with np.load(ruta) as datos:
+            activaciones = [str(a) for a in datos["activaciones"]]
+            capas = [(datos[f"pesos_{i}"], datos[f"sesgo_{i}"], activacion)
+                     for i, activacion in enumerate(activaciones)]
+            return cls(capas, datos["forma_observacion"], semilla)
+
+    def logits(self, observaciones):
+        """Devuelve los logits de las acciones para una matriz de observaciones."""
+        x = np.asarray(observaciones, dtype=np.float32)
+        for pesos, sesgo, activacion in self.capas:
+            x = ACTIVACIONES[activacion](x @ pesos + sesgo)
+        return x
+
+    def predecir_lote(self, observaciones, deterministic=True):
+        """Devuelve la acción para cada fila de una matriz de observaciones."""
+        logits = self.logits(observaciones)
+        if deterministic:
+            return np.argmax(logits, axis=1)
+        # Muestrear de la distribución categórica (softmax de los logits)
+        probabilidades = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilidades /= probabilidades.sum(axis=1, keepdims=True)
+        acumuladas = np.cumsum(probabilidades, axis=1)
+        u = self.rng.random((len(logits), 1))
+        return np.minimum((u > acumuladas).sum(axis=1), logits.shape[1] - 1)
+
+    def predict(self, observacion, deterministic=True):
+        """Igual que `PPO.predict`: devuelve `(accion, None)` para una observación."""
+        observacion = np.asarray(observacion, dtype=np.float32)
+        if observacion.shape == self.forma_observacion:
+            return self.predecir_lote(observacion[None, :], deterministic)[0], None
+        return self.predecir_lote(observacion, deterministic), None
+
+def verificar_paridad(ruta_zip, politica, observaciones):
+    """
+    Comprueba que la política NumPy elige las mismas acciones que
+    `PPO.predict(deterministic=True)` sobre las observaciones dadas.
+
+    Returns:
+        float: La diferencia absoluta máxima entre los logits de ambas.
+    """
+    import torch
+    from stable_baselines3 import PPO
+
+    modelo = PPO.load(ruta_zip, device="cpu")
+    observaciones = np.asarray(observaciones, dtype=np.float32)
+
+    acciones_ppo, _ = modelo.predict(observaciones, deterministic=True)
+    acciones_numpy = politica.predecir_lote(observaciones)
+    discrepancias = int(np.sum(acciones_ppo != acciones_numpy))
+
+    with torch.no_grad():
+        obs_tensor, _ = modelo.policy.obs_to_tensor(observaciones)
+        logits_ppo = modelo.policy.get_distribution(obs_tensor).distribution.logits.numpy()
+    # torch.distributions.Categorical normaliza los logits (log-softmax)
+    logits_numpy = politica.logits(observaciones)
+    maximos = logits_numpy.max(axis=1, keepdims=True)
+    logits_numpy = logits_numpy - maximos - np.log(np.exp(logits_numpy - maximos).sum(axis=1, keepdims=True))
+    diferencia = float(np.max(np.abs(logits_ppo - logits_numpy)))
+
+    if discrepancias:
+        raise AssertionError(f"Paridad PPO/NumPy fallida: {discrepancias} de {len(observaciones)} acciones distintas")
+    return diferencia
+
+def grabar_observaciones(politica, num_observaciones, modo_observacion=None, tasa_llegadas=2.0, semilla=0):
+    """
+    Graba las observaciones de un episodio de EntornoSimulado en el que la
+    propia `politica` decide el escalado, como el Autoescalador en producción.
+    Si no se da `modo_observacion`, se deduce de la forma de la política.
+    """
+    from entorno_rl import CARACTERISTICAS_AGREGADAS
+    from simulador_eventos import EntornoSimulado, llegadas_poisson
+
+    if modo_observacion is None:
+        agregada = politica.forma_observacion == (len(CARACTERISTICAS_AGREGADAS),)
+        modo_observacion = "agregada" if agregada else "servidores"
+    num_servidores_max = politica.forma_observacion[0] - 1 if modo_observacion == "servidores" else 5
+    entorno = EntornoSimulado(lambda semilla_llegadas: llegadas_poisson(tasa_llegadas, semilla_llegadas),
+                              num_servidores_max=num_servidores_max, modo_observacion=modo_observacion,
+                              escalado_por_umbral=False)
+
+    observaciones = np.empty((num_observaciones,) + politica.forma_observacion, dtype=np.float32)
+    observacion, _ = entorno.reset(seed=semilla)
+    for i in range(num_observaciones):
+        observaciones[i] = observacion
+        accion, _ = politica.predict(observacion, deterministic=True)
+        observacion, _, _, _, _ = entorno.step(int(accion))
+    return observaciones
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta la política PPO a NumPy y verifica la paridad.")
+    parser.add_argument("modelo", help="Modelo PPO (.zip) de stable-baselines3")
+    parser.add_argument("salida", help="Archivo .npz de salida")
+    parser.add_argument("--observaciones",
+                        help="Observaciones grabadas (.npy) para la verificación, p. ej. las que guarda la app "
+                             "en RUTA_ESTADOS_AUTOESCALADO")
+    parser.add_argument("--num-observaciones", type=int, default=10000,
+                        help="Pasos del episodio simulado que se graba si no se indican observaciones")
+    parser.add_argument("--observacion", choices=["servidores", "agregada"], default=None,
+                        help="Modo de observación del episodio simulado (por defecto, según la forma de la política)")
+    parser.add_argument("--tasa-llegadas", type=float, default=2.0, help="Solicitudes/s del episodio simulado")
+    parser.add_argument("--guardar-observaciones", help="Guardar en este .npy las observaciones usadas")
+    args = parser.parse_args()
+
+    exportar_politica(args.modelo, args.salida)
+    politica = PoliticaNumPy.cargar(args.salida)
+
+    if args.observaciones:
+        observaciones = np.load(args.observaciones)
+    else:
+        observaciones = grabar_observaciones(politica, args.num_observaciones, args.observacion, args.tasa_llegadas)
+        print(f"{len(observaciones)} observaciones grabadas de un episodio de EntornoSimulado")
+    if args.guardar_observaciones:
+        np.save(args.guardar_observaciones, observaciones)
+
+    diferencia = verificar_paridad(args.modelo, politica, observaciones)
+    print(f"Paridad correcta en {len(observaciones)} observaciones. Diferencia máxima de logits: {diferencia:.2e}")
+
+    for tamano in (1, 1024):
+        lote = observaciones[:tamano]
+        repeticiones = 2000 if tamano == 1 else 200
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            politica.predecir_lote(lote)
+        print(f"Lote de {tamano}: {(time.perf_counter() - inicio) / repeticiones * 1e6:.1f} us por llamada")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from asignador_recursos import DemandPredictor
-from app import cargar_datos_entrenamiento
+from carga_datos import cargar_datos_entrenamiento
 import numpy as np
 
 # Cargar datos de entrenamiento
@@ -0,0 +1,134 @@
+import atexit
+import sys
+import time
+
+from buffer_fondo import BufferFondo
+
+DEBUG, INFO, ADVERTENCIA, ERROR = 10, 20, 30, 40
+NIVELES = {"DEBUG": DEBUG, "INFO": INFO, "ADVERTENCIA": ADVERTENCIA, "ERROR": ERROR}
+DESACTIVADO = ERROR + 10
+
+def nivel_desde_texto(texto):
+    """Nivel a partir de su nombre ('DEBUG', 'INFO', ...) o de su número."""
+    texto = str(texto).strip().upper()
+    if texto in NIVELES:
+        return NIVELES[texto]
+    if texto in ("NINGUNO", "DESACTIVADO"):
+        return DESACTIVADO
+    return int(texto)
+
+def muestreo_desde_texto(texto):
+    """{nivel: fracción} a partir de 'INFO=0.1,DEBUG=0.01'."""
+    muestreo = {}
+    for parte in filter(None, (p.strip() for p in (texto or "").split(","))):
+        nombre, fraccion = parte.split("=")
+        muestreo[nivel_desde_texto(nombre)] = float(fraccion)
+    return muestreo
+
+class RegistroEventos:
+    """
+    Registro de eventos para el camino caliente de las solicitudes.
+
+    Cada evento se guarda como una tupla (instante, nivel, plantilla, argumentos)
+    en un buffer circular acotado (BufferFondo: añadir es atómico con el GIL y, si
+    se llena, se pierden los más antiguos). Un hilo de fondo les da formato
+    con `plantilla.format(*argumentos)` y los escribe en bloque. Los niveles por
+    debajo de `nivel` salen nada más entrar, y `muestreo` ({nivel: fracción})
+    deja pasar solo una fracción de los eventos de ese nivel.
+
+    Con `sincrono=True` cada evento se formatea y escribe al momento, como un print.
+    """
+
+    def __init__(self, nivel=INFO, muestreo=None, capacidad=65536, salida=None, intervalo=0.05, sincrono=False):
+        self.salida = salida  # None: el sys.stdout de cada momento
+        self._cola = BufferFondo(self._escribir, "registro-eventos", intervalo, capacidad)
+        self.descartados_muestreo = 0
+        self.escritos = 0
+        self.configurar(nivel, muestreo, sincrono)
+
+    def configurar(self, nivel=None, muestreo=None, sincrono=None):
+        if nivel is not None:
+            self.nivel = nivel
+        if muestreo is not None:
+            # Muestreo determinista: se escribe uno de cada round(1/fracción) eventos del nivel
+            self.muestreo = {n: f for n, f in muestreo.items() if f < 1.0}
+            self._cada = {n: max(round(1 / f), 1) if f > 0 else float("inf") for n, f in self.muestreo.items()}
+            self._cuentas = dict.fromkeys(self._cada, 0)
+        elif not hasattr(self, "muestreo"):
+            self.muestreo, self._cada, self._cuentas = {}, {}, {}
+        if sincrono is not None:
+            self.sincrono = sincrono
+
+    def activo(self, nivel):
+        """True si los eventos de `nivel` se registran: sirve para no calcular argumentos caros."""
+        return nivel >= self.nivel
+
+    def evento(self, nivel, plantilla, *argumentos):
+        if nivel >= self.nivel:
+            self._registrar(nivel, plantilla, argumentos)
+
+    def debug(self, plantilla, *argumentos):
+        if DEBUG >= self.nivel:
+            self._registrar(DEBUG, plantilla, argumentos)
+
+    def info(self, plantilla, *argumentos):
+        if INFO >= self.nivel:
+            self._registrar(INFO, plantilla, argumentos)
+
+    def advertencia(self, plantilla, *argumentos):
+        if ADVERTENCIA >= self.nivel:
+            self._registrar(ADVERTENCIA, plantilla, argumentos)
+
+    def error(self, plantilla, *argumentos):
+        if ERROR >= self.nivel:
+            self._registrar(ERROR, plantilla, argumentos)
+
+    def _registrar(self, nivel, plantilla, argumentos):
+        if self._cada and nivel in self._cada:
+            cuenta = self._cuentas[nivel] + 1
+            if cuenta < self._cada[nivel]:
+                self._cuentas[nivel] = cuenta
+                self.descartados_muestreo += 1
+                return
+            self._cuentas[nivel] = 0
+
+        evento = (time.time(), nivel, plantilla, argumentos)
+        if self.sincrono:
+            self._escribir([evento])
+            return
+        self._cola.anadir(evento)
+
+    def vaciar(self):
+        """Escribe ya los eventos pendientes."""
+        self._cola.vaciar()
+
+    def _escribir(self, eventos):
+        lineas = []
+        for _, nivel, plantilla, argumentos in eventos:
+            try:
+                lineas.append(plantilla.format(*argumentos) if argumentos else plantilla)
+            except Exception as e:
+                lineas.append(f"{plantilla!r} {argumentos!r} (error de formato: {e})")
+        salida = self.salida or sys.stdout
+        with self._cola.lock:
+            try:
+                salida.write("\n".join(lineas) + "\n")
+                salida.flush()
+            except (OSError, ValueError):
+                return  # Salida cerrada (p. ej. al terminar el intérprete)
+            self.escritos += len(lineas)
+
+    def estadisticas(self):
+        return {
+            "nivel": self.nivel,
+            "muestreo": self.muestreo,
+            "sincrono": self.sincrono,
+            "descartados_muestreo": self.descartados_muestreo,
+            "desbordados": self._cola.desbordados,
+            "escritos": self.escritos,
+            "pendientes": len(self._cola)
+        }
+
+# Registro compartido del proceso; app.py lo configura con NIVEL_REGISTRO y MUESTREO_REGISTRO
+registro = RegistroEventos()
+atexit.register(registro.vaciar)
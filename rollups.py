@@ -0,0 +1,203 @@
+import time
+
+import numpy as np
+
+from buffer_fondo import BufferFondo
+
+# (segundos por bucket, buckets que se conservan): 15 minutos a 1 s, un día a 1 min y 30 días a 1 h
+RESOLUCIONES = ((1, 900), (60, 1440), (3600, 720))
+METRICAS = ("espera", "procesamiento")
+# Límites (segundos) del histograma logarítmico que sirve de sketch de cuantiles:
+# 63 límites de 100 µs a 100 s, un ~25% más cada uno (64 bins con los dos extremos abiertos)
+LIMITES_SKETCH = np.geomspace(1e-4, 100.0, 63)
+CUANTILES = (0.5, 0.95, 0.99)
+OTRO = "otro"  # Categoría de los tipos o perfiles que no están en la lista
+
+class _Resolucion:
+    """Arrays preasignados de una resolución: un buffer circular de `retencion` buckets."""
+
+    def __init__(self, segundos, retencion, num_series, num_bins):
+        self.segundos = segundos
+        self.retencion = retencion
+        forma = (retencion, num_series, len(METRICAS))
+        self.bucket = np.full(retencion, -1, dtype=np.int64)  # Número de bucket guardado en cada hueco
+        self.cuenta = np.zeros(forma, dtype=np.int64)
+        self.suma = np.zeros(forma)
+        self.minimo = np.full(forma, np.inf)
+        self.maximo = np.full(forma, -np.inf)
+        self.sketch = np.zeros(forma + (num_bins,), dtype=np.int32)
+
+    def limpiar(self, huecos):
+        self.cuenta[huecos] = 0
+        self.suma[huecos] = 0.0
+        self.minimo[huecos] = np.inf
+        self.maximo[huecos] = -np.inf
+        self.sketch[huecos] = 0
+
+    def agregar(self, tiempos, series, valores, bins):
+        """Suma las observaciones (en cualquier orden) a sus buckets."""
+        buckets = (tiempos // self.segundos).astype(np.int64)
+        huecos = buckets % self.retencion
+        # Se descartan las observaciones de buckets ya reemplazados por otros más nuevos
+        # o que quedan fuera de la retención respecto a la más reciente
+        validas = (buckets > buckets.max() - self.retencion) & (buckets >= self.bucket[huecos])
+        if not validas.all():
+            buckets, huecos, series, valores, bins = (buckets[validas], huecos[validas], series[validas],
+                                                      valores[validas], bins[validas])
+        nuevos = np.unique(huecos[buckets > self.bucket[huecos]])
+        if len(nuevos):
+            self.limpiar(nuevos)
+            # Tras filtrar, cada hueco recibe un único número de bucket
+            self.bucket[huecos] = buckets
+
+        for m in range(len(METRICAS)):
+            indice = (huecos, series, m)
+            np.add.at(self.cuenta, indice, 1)
+            np.add.at(self.suma, indice, valores[:, m])
+            np.minimum.at(self.minimo, indice, valores[:, m])
+            np.maximum.at(self.maximo, indice, valores[:, m])
+            np.add.at(self.sketch, indice + (bins[:, m],), 1)
+
+class AlmacenRollups:
+    """
+    Agregados de las solicitudes terminadas (tiempo de espera y de procesamiento)
+    por tipo de solicitud y perfil de usuario, en buckets de 1 s, 1 min y 1 h.
+
+    Cada resolución es un buffer circular de buckets en arrays de NumPy
+    preasignados: cuenta, suma, mínimo, máximo y un histograma logarítmico (sketch)
+    para estimar cuantiles con ~12% de error relativo. `registrar` solo añade una
+    tupla a un BufferFondo; su hilo de fondo agrega las pendientes por lotes con
+    operaciones vectoriales. Una consulta lee como mucho `retencion` buckets, así
+    que su coste no depende de cuántas solicitudes haya habido.
+    """
+
+    def __init__(self, tipos, perfiles, resoluciones=RESOLUCIONES, intervalo=0.5, limites_sketch=LIMITES_SKETCH):
+        self.tipos = list(tipos) + [OTRO]
+        self.perfiles = list(perfiles) + [OTRO]
+        self._indice_tipo = {t: i for i, t in enumerate(self.tipos)}
+        self._indice_perfil = {p: i for i, p in enumerate(self.perfiles)}
+        self.limites_sketch = np.asarray(limites_sketch)
+        num_series = len(self.tipos) * len(self.perfiles)
+        num_bins = len(self.limites_sketch) + 1
+        self.resoluciones = {s: _Resolucion(s, r, num_series, num_bins) for s, r in resoluciones}
+        # Su lock protege también los arrays entre la agregación y las consultas
+        self._pendientes = BufferFondo(self._agregar, "rollups", intervalo)
+        self.registradas = 0
+
+    def registrar(self, tipo, perfil, espera, procesamiento, tiempo=None):
+        """Anota una solicitud terminada; se agrega en segundo plano."""
+        self._pendientes.anadir((time.time() if tiempo is None else tiempo, tipo, perfil, espera, procesamiento))
+
+    def vaciar(self):
+        """Agrega ya las solicitudes pendientes."""
+        self._pendientes.vaciar()
+
+    def _agregar(self, pendientes):
+        tiempos = np.fromiter((p[0] for p in pendientes), dtype=np.float64, count=len(pendientes))
+        otro_tipo, otro_perfil = len(self.tipos) - 1, len(self.perfiles) - 1
+        indice_tipo, indice_perfil = self._indice_tipo, self._indice_perfil
+        series = np.fromiter((indice_tipo.get(p[1], otro_tipo) * len(self.perfiles) + indice_perfil.get(p[2], otro_perfil)
+                              for p in pendientes), dtype=np.int64, count=len(pendientes))
+        valores = np.array([(p[3], p[4]) for p in pendientes], dtype=np.float64)
+        bins = np.searchsorted(self.limites_sketch, valores)
+        with self._pendientes.lock:
+            for resolucion in self.resoluciones.values():
+                resolucion.agregar(tiempos, series, valores, bins)
+            self.registradas += len(pendientes)
+
+    def _resolucion_para(self, paso):
+        """La resolución guardada más gruesa que divide a `paso`."""
+        candidatas = [s for s in self.resoluciones if paso % s == 0]
+        if not candidatas:
+            raise ValueError(f"El paso debe ser múltiplo de alguna resolución: {sorted(self.resoluciones)}")
+        return self.resoluciones[max(candidatas)]
+
+    def _mascara_series(self, tipo, perfil):
+        tipos = np.ones(len(self.tipos), dtype=bool) if tipo is None else np.array([t == tipo for t in self.tipos])
+        perfiles = (np.ones(len(self.perfiles), dtype=bool) if perfil is None
+                    else np.array([p == perfil for p in self.perfiles]))
+        return np.outer(tipos, perfiles).ravel()
+
+    def consultar(self, paso, desde, hasta, tipo=None, perfil=None, cuantiles=CUANTILES):
+        """
+        Puntos de `paso` segundos entre los instantes Unix `desde` y `hasta`, para un
+        tipo y un perfil (None: todos). `paso` debe ser múltiplo de 1, 60 o 3600 s;
+        se usa la resolución más gruesa que lo divide y se juntan sus buckets. Las
+        ventanas más antiguas que la retención de esa resolución se recortan.
+        """
+        if paso <= 0 or hasta < desde:
+            raise ValueError("Se necesita un paso positivo y desde <= hasta")
+        resolucion = self._resolucion_para(paso)
+        segundos, retencion = resolucion.segundos, resolucion.retencion
+        por_paso = paso // segundos
+        primero = int(desde // paso) * por_paso
+        ultimo = int(hasta // paso) * por_paso + por_paso - 1
+        mascara = self._mascara_series(tipo, perfil)
+
+        with self._pendientes.lock:
+            reciente = int(resolucion.bucket.max())
+            primero = max(primero, reciente - retencion + 1)
+            primero -= primero % por_paso  # Alinear al paso
+            ultimo = min(ultimo, reciente - reciente % por_paso + por_paso - 1)  # Nada después del más reciente
+            if ultimo < primero or reciente < 0:
+                return []
+            buckets = np.arange(primero, ultimo + 1)
+            huecos = buckets % retencion
+            presentes = resolucion.bucket[huecos] == buckets
+            cuenta = resolucion.cuenta[huecos][:, mascara]
+            suma = resolucion.suma[huecos][:, mascara]
+            minimo = resolucion.minimo[huecos][:, mascara]
+            maximo = resolucion.maximo[huecos][:, mascara]
+            sketch = resolucion.sketch[huecos][:, mascara]
+
+        # Los huecos que guardan otro bucket no cuentan
+        cuenta[~presentes] = 0
+        suma[~presentes] = 0.0
+        minimo[~presentes] = np.inf
+        maximo[~presentes] = -np.inf
+        sketch[~presentes] = 0
+
+        # Juntar las series elegidas y, después, los buckets de cada paso
+        grupos = np.arange(0, len(buckets), por_paso)
+        cuenta = np.add.reduceat(cuenta.sum(axis=1), grupos)
+        suma = np.add.reduceat(suma.sum(axis=1), grupos)
+        minimo = np.minimum.reduceat(minimo.min(axis=1), grupos)
+        maximo = np.maximum.reduceat(maximo.max(axis=1), grupos)
+        sketch = np.add.reduceat(sketch.sum(axis=1, dtype=np.int64), grupos)
+        valores_cuantiles = self._cuantiles(sketch, minimo, maximo, cuantiles)
+
+        puntos = []
+        for g in range(len(grupos)):
+            punto = {"tiempo": int((primero + g * por_paso) * segundos), "cuenta": int(cuenta[g, 0])}
+            for m, metrica in enumerate(METRICAS):
+                n = int(cuenta[g, m])
+                resumen = {"media": suma[g, m] / n, "min": minimo[g, m], "max": maximo[g, m]} if n else {}
+                for c, q in enumerate(cuantiles):
+                    if n:
+                        resumen[f"p{q * 100:g}"] = valores_cuantiles[g, m, c]
+                punto[metrica] = {k: float(v) for k, v in resumen.items()}
+            puntos.append(punto)
+        return puntos
+
+    def _cuantiles(self, sketch, minimo, maximo, cuantiles):
+        """Cuantiles estimados con el centro geométrico de su bin, acotados por el mínimo y el máximo."""
+        acumulado = np.cumsum(sketch, axis=-1)
+        total = acumulado[..., -1:]
+        limites = self.limites_sketch
+        centros = np.concatenate(([limites[0]], np.sqrt(limites[:-1] * limites[1:]), [limites[-1]]))
+        resultado = np.empty(sketch.shape[:-1] + (len(cuantiles),))
+        for c, q in enumerate(cuantiles):
+            # Primer bin cuyo acumulado alcanza el rango del cuantil
+            rango = np.maximum(np.ceil(q * total), 1)
+            bin_cuantil = (acumulado < rango).sum(axis=-1)
+            resultado[..., c] = np.clip(centros[np.minimum(bin_cuantil, len(centros) - 1)], minimo, maximo)
+        return resultado
+
+    def estadisticas(self):
+        return {
+            "registradas": self.registradas,
+            "pendientes": len(self._pendientes),
+            "resoluciones": {s: r.retencion for s, r in self.resoluciones.items()},
+            "memoria_mb": sum(a.nbytes for r in self.resoluciones.values()
+                              for a in (r.bucket, r.cuenta, r.suma, r.minimo, r.maximo, r.sketch)) / 1e6
+        }
@@ -0,0 +1,404 @@
+import argparse
+import heapq
+import itertools
+import json
+import random
+import time
+from collections import deque
+
+import gymnasium as gym
+from gymnasium import spaces
+import numpy as np
+
+from asignador_recursos import TIEMPO_ARRANQUE, calcular_tiempo_procesamiento
+from entorno_rl import calcular_recompensa, construir_estado, construir_estado_agregado, espacio_observacion
+from estimador_tasa import EstimadorTasa
+from estrategias_seleccion import crear_estrategia
+from flota import EstadoFlota
+
+# Tipos de evento del simulador
+LLEGADA = 0
+ARRANQUE = 1
+FIN_PROCESAMIENTO = 2
+
+TIPOS_SOLICITUD = ["simple", "compleja", "codigo"]
+
+def llegadas_poisson(tasa, semilla=None, pesos_tipo=(0.4, 0.35, 0.25), longitudes=(10, 40)):
+    """
+    Genera llegadas sintéticas de un proceso de Poisson.
+
+    Args:
+        tasa (float): Solicitudes por segundo.
+        semilla (int): Semilla para que la secuencia sea reproducible.
+        pesos_tipo (tuple): Probabilidad relativa de cada tipo de solicitud.
+        longitudes (tuple): Rango (mínimo, máximo) de la longitud del texto.
+
+    Yields:
+        tuple: (tiempo de llegada en segundos, características de la solicitud)
+    """
+    rng = random.Random(semilla)
+    t = 0.0
+    while True:
+        t += rng.expovariate(tasa)
+        tipo = rng.choices(TIPOS_SOLICITUD, weights=pesos_tipo)[0]
+        yield t, {"longitud": rng.randint(*longitudes), "tipo": tipo}
+
+def llegadas_desde_csv(ruta_csv, repetir=True):
+    """
+    Reproduce las llegadas grabadas en un CSV de simulación (columnas
+    'tiempo_inicio' y 'caracteristicas'), con tiempos relativos a la primera.
+
+    Yields:
+        tuple: (tiempo de llegada en segundos, características de la solicitud)
+    """
+    import pandas as pd
+
+    df = pd.read_csv(ruta_csv, usecols=["tiempo_inicio", "caracteristicas"])
+    segundos = pd.to_datetime(df["tiempo_inicio"]).astype("int64").to_numpy() // 10**9
+    orden = np.argsort(segundos, kind="stable")
+    segundos = segundos[orden] - segundos[orden[0]]
+
+    # 'tiempo_inicio' tiene resolución de un segundo: repartir las llegadas de cada segundo
+    registros = []
+    for segundo, grupo in itertools.groupby(zip(segundos, orden), key=lambda par: par[0]):
+        grupo = list(grupo)
+        for i, (_, fila) in enumerate(grupo):
+            caracteristicas = json.loads(df["caracteristicas"].iat[fila].replace("'", '"'))
+            registros.append((segundo + i / len(grupo),
+                              {"longitud": caracteristicas["longitud"], "tipo": caracteristicas["tipo"]}))
+
+    duracion = float(segundos[-1]) + 1.0
+    desplazamiento = 0.0
+    while True:
+        for t, caracteristicas in registros:
+            yield desplazamiento + t, caracteristicas
+        if not repetir:
+            return
+        desplazamiento += duracion
+
+class ServidorVirtual:
+    """Estado de un servidor dentro del simulador (equivalente a ServidorSimulado)."""
+
+    __slots__ = ("id", "carga", "capacidad", "arrancando", "pendientes", "cola", "ocupado", "activo")
+
+    def __init__(self, id, arrancando=False, capacidad=1.0):
+        self.id = id
+        self.carga = 0.0
+        self.capacidad = capacidad
+        self.arrancando = arrancando
+        self.pendientes = 0  # Solicitudes entregadas (en su cola local o en proceso)
+        self.cola = deque()
+        self.ocupado = False
+        self.activo = True  # False cuando no está en la lista de servidores (eliminado o en la reserva)
+
+class SimuladorEventos:
+    """
+    Simulador de eventos discretos con reloj virtual que reproduce la lógica de
+    AsignadorRecursos y ServidorSimulado: arranque de servidores, cola compartida,
+    reparto con la misma estrategia de selección, tiempo de procesamiento y escalado
+    por umbral. Avanzar un segundo de simulación no espera tiempo real.
+    """
+
+    def __init__(self, llegadas, num_servidores_inicial=1, num_servidores_max=5, predictor=None,
+                 max_pendientes_servidor=2, tiempo_arranque=TIEMPO_ARRANQUE, escalado_por_umbral=True,
+                 umbral_escalado_superior=5, umbral_escalado_inferior=1, semilla=None,
+                 estrategia="menor_carga", capacidades=None, guardar_tiempos_respuesta=False, tamano_reserva=0):
+        self.llegadas = iter(llegadas)
+        self.num_servidores_max = num_servidores_max
+        self.predictor = predictor  # Sin predictor, la demanda es 1.0 (como un DemandPredictor sin entrenar)
+        self.max_pendientes_servidor = max_pendientes_servidor
+        self.tiempo_arranque = tiempo_arranque
+        self.escalado_por_umbral = escalado_por_umbral
+        self.umbral_escalado_superior = umbral_escalado_superior
+        self.umbral_escalado_inferior = umbral_escalado_inferior
+        self.rng = random.Random(semilla)
+        self.estrategia = crear_estrategia(estrategia, max_pendientes_servidor, semilla)
+        self.flota = EstadoFlota()
+        self.estimador_llegadas = EstimadorTasa(reloj=lambda: self.reloj)
+        self.factor_tendencia_subida = 1.5
+        self.capacidades = capacidades  # Capacidad de cada servidor según su ID (cíclica); por defecto 1.0
+
+        self.reloj = 0.0
+        self.eventos = []  # Montículo de (tiempo, secuencia, tipo, datos)
+        self._secuencia = itertools.count()
+        self.cola_solicitudes = deque()  # (caracteristicas, demanda_predicha, tiempo_llegada)
+        self._contador_servidores = itertools.count()
+        self.servidores = [self._nuevo_servidor() for _ in range(num_servidores_inicial)]
+        # Reserva de servidores arrancados que se activan al instante al escalar (como en AsignadorRecursos)
+        self.tamano_reserva = tamano_reserva
+        self.reserva = []
+        self._arrancando_reserva = 0
+        self.num_escalados = 0
+        self.num_escalados_reserva = 0
+        self.tiempo_hasta_listo_total = 0.0
+        self.num_listos = 0
+
+        self.num_llegadas = 0
+        self.num_completadas = 0
+        self.tiempo_espera_total = 0.0
+        self.tiempo_respuesta_total = 0.0
+        self.tiempo_respuesta_max = 0.0
+        self.tiempos_respuesta = [] if guardar_tiempos_respuesta else None
+
+        self._programar_siguiente_llegada()
+        self._reponer_reserva()
+
+    def _nuevo_servidor(self, arrancando=False, en_servicio=True):
+        id = next(self._contador_servidores)
+        capacidad = self.capacidades[id % len(self.capacidades)] if self.capacidades else 1.0
+        servidor = ServidorVirtual(id, arrancando, capacidad)
+        servidor.activo = en_servicio
+        if en_servicio:
+            self._agregar_servidor(servidor)
+        return servidor
+
+    def _agregar_servidor(self, servidor):
+        self.estrategia.agregar(servidor)
+        self.flota.agregar(servidor)
+
+    def _quitar_servidor(self, servidor):
+        self.estrategia.quitar(servidor)
+        self.flota.quitar(servidor)
+
+    def _actualizar_servidor(self, servidor):
+        self.estrategia.actualizar(servidor)
+        self.flota.actualizar(servidor)
+
+    def _programar(self, tiempo, tipo, datos):
+        heapq.heappush(self.eventos, (tiempo, next(self._secuencia), tipo, datos))
+
+    def _programar_siguiente_llegada(self):
+        siguiente = next(self.llegadas, None)
+        if siguiente is not None:
+            tiempo, caracteristicas = siguiente
+            self._programar(max(tiempo, self.reloj), LLEGADA, caracteristicas)
+
+    def avanzar(self, duracion):
+        """Procesa todos los eventos hasta `reloj + duracion` y adelanta el reloj."""
+        fin = self.reloj + duracion
+        eventos = self.eventos
+        while eventos and eventos[0][0] <= fin:
+            tiempo, _, tipo, datos = heapq.heappop(eventos)
+            self.reloj = tiempo
+            if tipo == LLEGADA:
+                self._llegada(datos)
+            elif tipo == FIN_PROCESAMIENTO:
+                self._fin_procesamiento(*datos)
+            else:
+                self._arranque_completado(*datos)
+        self.reloj = fin
+
+    def _llegada(self, caracteristicas):
+        self.estimador_llegadas.registrar(self.reloj)
+        demanda_predicha = self.predictor.predict(caracteristicas) if self.predictor is not None else 1.0
+        self.cola_solicitudes.append((caracteristicas, demanda_predicha, self.reloj))
+        self.num_llegadas += 1
+        if self.escalado_por_umbral:
+            self.comprobar_escalado()
+        self._despachar()
+        self._programar_siguiente_llegada()
+
+    def _arranque_completado(self, servidor, para_reserva, inicio):
+        servidor.arrancando = False
+        if para_reserva:
+            self._arrancando_reserva -= 1
+        if servidor.activo:
+            self._actualizar_servidor(servidor)
+            self.tiempo_hasta_listo_total += self.reloj - inicio
+            self.num_listos += 1
+            self._despachar()
+        elif len(self.reserva) < self.tamano_reserva:
+            # Se eliminó mientras arrancaba, o se arrancó para la reserva
+            self.reserva.append(servidor)
+
+    def _reponer_reserva(self):
+        while len(self.reserva) + self._arrancando_reserva < self.tamano_reserva:
+            servidor = self._nuevo_servidor(arrancando=True, en_servicio=False)
+            self._arrancando_reserva += 1
+            self._programar(self.reloj + self.tiempo_arranque, ARRANQUE, (servidor, True, self.reloj))
+
+    def _fin_procesamiento(self, servidor, tiempo_procesamiento, tiempo_llegada, tiempo_espera):
+        servidor.carga -= tiempo_procesamiento
+        servidor.pendientes -= 1
+        servidor.ocupado = False
+
+        tiempo_respuesta = self.reloj - tiempo_llegada
+        self.num_completadas += 1
+        self.tiempo_espera_total += tiempo_espera
+        self.tiempo_respuesta_total += tiempo_respuesta
+        self.tiempo_respuesta_max = max(self.tiempo_respuesta_max, tiempo_respuesta)
+        if self.tiempos_respuesta is not None:
+            self.tiempos_respuesta.append(tiempo_respuesta)
+
+        if servidor.cola:
+            self._iniciar_procesamiento(servidor)
+        self._actualizar_servidor(servidor)
+        self._despachar()
+
+    def _despachar(self):
+        while self.cola_solicitudes:
+            servidor = self.estrategia.elegir()
+            if servidor is None:
+                return
+            servidor.pendientes += 1
+            servidor.cola.append(self.cola_solicitudes.popleft())
+            if not servidor.ocupado:
+                self._iniciar_procesamiento(servidor)
+            self._actualizar_servidor(servidor)
+
+    def _iniciar_procesamiento(self, servidor):
+        caracteristicas, demanda_predicha, tiempo_llegada = servidor.cola.popleft()
+        tiempo_procesamiento = calcular_tiempo_procesamiento(
+            caracteristicas["longitud"], caracteristicas["tipo"], demanda_predicha, self.rng) / servidor.capacidad
+        servidor.carga += tiempo_procesamiento
+        servidor.ocupado = True
+        self._programar(self.reloj + tiempo_procesamiento, FIN_PROCESAMIENTO,
+                        (servidor, tiempo_procesamiento, tiempo_llegada, self.reloj - tiempo_llegada))
+
+    def crear_servidor(self):
+        """
+        Activa un servidor de la reserva o, si no hay, añade uno que estará listo
+        tras `tiempo_arranque` segundos virtuales.
+        """
+        if len(self.servidores) >= self.num_servidores_max:
+            return
+        self.num_escalados += 1
+        if self.reserva:
+            servidor = self.reserva.pop()
+            servidor.activo = True
+            self.servidores.append(servidor)
+            self._agregar_servidor(servidor)
+            self.num_escalados_reserva += 1
+            self.num_listos += 1
+            self._despachar()
+        else:
+            servidor = self._nuevo_servidor(arrancando=True)
+            self.servidores.append(servidor)
+            self._programar(self.reloj + self.tiempo_arranque, ARRANQUE, (servidor, False, self.reloj))
+        self._reponer_reserva()
+
+    def eliminar_servidor(self):
+        """
+        Quita el último servidor, si hay más de uno; termina el trabajo que ya tenía
+        y, si estaba listo y cabe, pasa a la reserva.
+        """
+        if len(self.servidores) > 1:
+            servidor = self.servidores.pop()
+            servidor.activo = False
+            self._quitar_servidor(servidor)
+            if not servidor.arrancando and len(self.reserva) < self.tamano_reserva:
+                self.reserva.append(servidor)
+
+    def comprobar_escalado(self):
+        """Mismo criterio de umbrales que AsignadorRecursos.comprobar_escalado."""
+        carga_total = self.flota.carga_total()
+        if carga_total > self.umbral_escalado_superior and len(self.servidores) < self.num_servidores_max:
+            self.crear_servidor()
+        elif (carga_total < self.umbral_escalado_inferior and len(self.servidores) > 1
+              and not self.trafico_en_aumento()):
+            self.eliminar_servidor()
+
+    def trafico_en_aumento(self):
+        """Mismo criterio que AsignadorRecursos.trafico_en_aumento, con el reloj virtual."""
+        tasas = self.estimador_llegadas.tasas_ewma()
+        return tasas[-1] > 0 and tasas[0] > self.factor_tendencia_subida * tasas[-1]
+
+    def estadisticas(self):
+        completadas = self.num_completadas
+        return {
+            "reloj": self.reloj,
+            "llegadas": self.num_llegadas,
+            "completadas": completadas,
+            "en_cola": len(self.cola_solicitudes),
+            "servidores": len(self.servidores),
+            "reserva": len(self.reserva),
+            "escalados": self.num_escalados,
+            "escalados_desde_reserva": self.num_escalados_reserva,
+            "tiempo_hasta_listo_medio": self.tiempo_hasta_listo_total / self.num_listos if self.num_listos else 0.0,
+            "tiempo_espera_medio": self.tiempo_espera_total / completadas if completadas else 0.0,
+            "tiempo_respuesta_medio": self.tiempo_respuesta_total / completadas if completadas else 0.0,
+            "tiempo_respuesta_max": self.tiempo_respuesta_max
+        }
+
+class EntornoSimulado(gym.Env):
+    """
+    Entorno con las mismas observaciones, acciones y recompensa que
+    EntornoBalanceo, pero sobre SimuladorEventos: cada paso avanza
+    `duracion_paso` segundos de reloj virtual.
+
+    A diferencia del entorno real, `reset` reconstruye la simulación desde
+    cero (servidores iniciales y una nueva secuencia de llegadas).
+    """
+
+    def __init__(self, crear_llegadas=None, num_servidores_inicial=1, num_servidores_max=5, predictor=None,
+                 duracion_paso=1.0, max_pasos=None, modo_observacion="servidores", **opciones_simulador):
+        super(EntornoSimulado, self).__init__()
+        # crear_llegadas(semilla) devuelve un iterador de (tiempo, caracteristicas)
+        self.crear_llegadas = crear_llegadas or (lambda semilla: llegadas_poisson(2.0, semilla))
+        self.num_servidores_inicial = num_servidores_inicial
+        self.num_servidores_max = num_servidores_max
+        self.predictor = predictor
+        self.duracion_paso = duracion_paso
+        self.max_pasos = max_pasos
+        self.opciones_simulador = opciones_simulador
+        self.modo_observacion = modo_observacion
+        self.action_space = spaces.Discrete(3)  # 0: No hacer nada, 1: Crear servidor, 2: Eliminar servidor
+        self.observation_space = espacio_observacion(modo_observacion, num_servidores_max)
+        self.simulador = None
+        self.num_pasos = 0
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        semilla = int(self.np_random.integers(0, 2**31 - 1))
+        self.simulador = SimuladorEventos(self.crear_llegadas(semilla), self.num_servidores_inicial,
+                                          self.num_servidores_max, self.predictor, semilla=semilla,
+                                          **self.opciones_simulador)
+        self.num_pasos = 0
+        return self._get_estado(), {}
+
+    def step(self, accion):
+        if accion == 1:
+            self.simulador.crear_servidor()
+        elif accion == 2:
+            self.simulador.eliminar_servidor()
+
+        self.simulador.avanzar(self.duracion_paso)
+        self.num_pasos += 1
+
+        recompensa = calcular_recompensa(self.simulador.servidores, len(self.simulador.cola_solicitudes))
+        truncado = self.max_pasos is not None and self.num_pasos >= self.max_pasos
+        return self._get_estado(), recompensa, False, truncado, {}
+
+    def _get_estado(self):
+        if self.modo_observacion == "agregada":
+            carga, arrancando, pendientes = self.simulador.flota.arrays()
+            return construir_estado_agregado(carga, arrancando, pendientes, len(self.simulador.cola_solicitudes),
+                                             self.simulador.estimador_llegadas.caracteristicas())
+        return construir_estado(self.simulador.servidores, len(self.simulador.cola_solicitudes),
+                                self.num_servidores_max)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide los pasos por segundo del entorno simulado.")
+    parser.add_argument("--pasos", type=int, default=100000)
+    parser.add_argument("--tasa", type=float, default=2.0, help="Solicitudes por segundo virtual")
+    parser.add_argument("--servidores-max", type=int, default=5)
+    parser.add_argument("--observacion", choices=["servidores", "agregada"], default="servidores")
+    args = parser.parse_args()
+
+    entorno = EntornoSimulado(crear_llegadas=lambda semilla: llegadas_poisson(args.tasa, semilla),
+                              num_servidores_max=args.servidores_max, modo_observacion=args.observacion)
+    entorno.reset(seed=0)
+    acciones = np.random.default_rng(0).integers(0, 3, size=args.pasos)
+
+    inicio = time.perf_counter()
+    for accion in acciones:
+        entorno.step(accion)
+    duracion = time.perf_counter() - inicio
+
+    pasos_por_segundo = args.pasos / duracion
+    print(f"{args.pasos} pasos en {duracion:.2f} s: {pasos_por_segundo:,.0f} pasos/s "
+          f"({pasos_por_segundo * 3600 / 1e6:.1f} millones de pasos por hora)")
+    print(entorno.simulador.estadisticas())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import numpy as np
+
+PUNTOS_POR_SERIE = 2000  # Presupuesto de puntos por serie que se envía al navegador
+
+def _limites_buckets(n, num_buckets):
+    """Inicios de `num_buckets` buckets contiguos que reparten los índices [1, n - 1), más el final."""
+    return (np.arange(num_buckets + 1) * ((n - 2) / num_buckets)).astype(np.int64) + 1
+
+def lttb(x, y, puntos):
+    """
+    Índices de los `puntos` puntos que elige Largest-Triangle-Three-Buckets: el
+    primero, el último y, de cada bucket intermedio, el que forma el triángulo de
+    mayor área con el punto elegido en el bucket anterior y la media del siguiente.
+    `x` debe estar ordenado. El bucle es por buckets; cada uno se evalúa con NumPy.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+
+    num_buckets = puntos - 2
+    limites = _limites_buckets(n, num_buckets)
+    tamanos = np.diff(limites)
+    medias_x = np.add.reduceat(x[:n - 1], limites[:-1]) / tamanos
+    medias_y = np.add.reduceat(y[:n - 1], limites[:-1]) / tamanos
+    # El "siguiente bucket" del último es el punto final
+    medias_x = np.append(medias_x[1:], x[-1])
+    medias_y = np.append(medias_y[1:], y[-1])
+
+    indices = np.empty(puntos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(num_buckets):
+        inicio, fin = limites[i], limites[i + 1]
+        ax, ay = x[a], y[a]
+        areas = np.abs((ax - medias_x[i]) * (y[inicio:fin] - ay) - (ax - x[inicio:fin]) * (medias_y[i] - ay))
+        a = inicio + int(areas.argmax())
+        indices[i + 1] = a
+    return indices
+
+def min_max(y, puntos):
+    """
+    Índices del mínimo y el máximo de cada bucket (en orden), más el primero y el
+    último: conserva los picos, que LTTB puede suavizar. Totalmente vectorizado.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if puntos >= n or puntos < 4:
+        return np.arange(n)
+
+    num_buckets = (puntos - 2) // 2
+    tamano = -(-(n - 2) // num_buckets)  # Todos los buckets iguales salvo el último, que se rellena con NaN
+    num_buckets = -(-(n - 2) // tamano)
+    tabla = np.full(num_buckets * tamano, np.nan)
+    tabla[:n - 2] = y[1:n - 1]
+    tabla = tabla.reshape(num_buckets, tamano)
+    base = np.arange(num_buckets) * tamano + 1
+    minimos = base + np.nanargmin(tabla, axis=1)
+    maximos = base + np.nanargmax(tabla, axis=1)
+    return np.unique(np.concatenate(([0], minimos, maximos, [n - 1])))
+
+METODOS = {"lttb": lambda x, y, puntos: lttb(x, y, puntos), "min_max": lambda x, y, puntos: min_max(y, puntos)}
+
+def submuestrear(x, y, puntos=PUNTOS_POR_SERIE, metodo="lttb"):
+    """
+    Serie (x, y) reducida a como mucho `puntos` puntos. `x` puede ser de fechas
+    (datetime64) o numérico y debe estar ordenado; los puntos con `y` NaN se descartan.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    validos = ~np.isnan(y)
+    if not validos.all():
+        x, y = x[validos], y[validos]
+    if len(x) <= puntos:
+        return x, y
+    x_numerico = x.astype("datetime64[ns]").astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x
+    indices = METODOS[metodo](x_numerico, y, puntos)
+    return x[indices], y[indices]
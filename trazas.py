@@ -0,0 +1,176 @@
+import atexit
+import hashlib
+import json
+import random
+import time
+
+from buffer_fondo import BufferFondo
+
+NOMBRE_SERVICIO = "balanceador"
+
+class Traza:
+    """
+    Traza de una solicitud: un tramo raíz desde la entrada hasta la respuesta y
+    tramos hijos para cada etapa. Los tramos se dan con instantes de
+    time.perf_counter(), que se pasan a tiempo Unix con la referencia tomada al
+    crear la traza, y se envían al exportador en cuanto terminan (las etapas
+    asíncronas, como la espera en cola o el procesamiento, terminan después de
+    responder a la solicitud).
+    """
+
+    __slots__ = ("trazador", "id_traza", "id_raiz", "nombre", "inicio", "_origen_ns")
+
+    def __init__(self, trazador, id_traza, nombre):
+        self.trazador = trazador
+        self.id_traza = id_traza
+        self.id_raiz = _nuevo_id_tramo()
+        self.nombre = nombre
+        self.inicio = time.perf_counter()
+        self._origen_ns = time.time_ns() - int(self.inicio * 1e9)
+
+    def tramo(self, nombre, inicio, fin, **atributos):
+        """Registra un tramo hijo del raíz entre dos instantes de perf_counter."""
+        self.trazador._exportar((self.id_traza, _nuevo_id_tramo(), self.id_raiz, nombre,
+                                 self._origen_ns + int(inicio * 1e9), self._origen_ns + int(fin * 1e9),
+                                 atributos))
+
+    def terminar(self, error=None, **atributos):
+        """Cierra el tramo raíz en este instante."""
+        if error is not None:
+            atributos["error"] = str(error)
+        self.trazador._exportar((self.id_traza, self.id_raiz, None, self.nombre,
+                                 self._origen_ns + int(self.inicio * 1e9), time.time_ns(), atributos))
+
+def _nuevo_id_tramo():
+    return f"{random.getrandbits(64):016x}"
+
+def nuevo_id_solicitud():
+    """Id aleatorio de 128 bits en hexadecimal, válido también como id de traza."""
+    return f"{random.getrandbits(128):032x}"
+
+def _es_id_traza(texto):
+    return len(texto) == 32 and texto.strip("0123456789abcdef") == "" and texto != "0" * 32
+
+def id_traza_de(id_solicitud):
+    """
+    Id de traza de una solicitud: el propio id si ya tiene la forma de un id de
+    traza (32 caracteres hexadecimales) o, si no, los 128 primeros bits de su
+    SHA-256. Siempre el mismo para el mismo id, así que se pueden cruzar.
+    """
+    if _es_id_traza(id_solicitud):
+        return id_solicitud
+    return hashlib.sha256(id_solicitud.encode("utf-8")).hexdigest()[:32]
+
+def _valor_otlp(valor):
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    if isinstance(valor, (list, tuple)):
+        return {"arrayValue": {"values": [_valor_otlp(v) for v in valor]}}
+    return {"stringValue": str(valor)}
+
+def tramo_otlp(tramo):
+    """Un tramo (tupla interna) en la forma JSON de OTLP."""
+    id_traza, id_tramo, id_padre, nombre, inicio_ns, fin_ns, atributos = tramo
+    span = {
+        "traceId": id_traza,
+        "spanId": id_tramo,
+        "name": nombre,
+        "kind": 2 if id_padre is None else 1,  # SERVER para el raíz, INTERNAL para las etapas
+        "startTimeUnixNano": str(inicio_ns),
+        "endTimeUnixNano": str(fin_ns),
+        "attributes": [{"key": k, "value": _valor_otlp(v)} for k, v in atributos.items() if k != "error"]
+    }
+    if id_padre is not None:
+        span["parentSpanId"] = id_padre
+    if "error" in atributos:
+        span["status"] = {"code": 2, "message": str(atributos["error"])}
+    return span
+
+class Trazador:
+    """
+    Crea las trazas de las solicitudes y exporta sus tramos a un archivo JSON Lines.
+
+    La decisión de muestreo se toma una vez por solicitud, al entrar: `iniciar`
+    devuelve None para las no muestreadas y el resto del código se salta todo lo
+    relativo a la traza. Los tramos terminados se guardan como tuplas en un buffer
+    circular acotado y un hilo de fondo los escribe por lotes: cada línea del
+    archivo es una ExportTraceServiceRequest de OTLP/JSON con hasta `tamano_lote`
+    tramos, el mismo formato que el exportador `file` del OpenTelemetry Collector.
+    """
+
+    def __init__(self, ruta="trazas.jsonl", muestreo=0.01, tamano_lote=512, intervalo=1.0, capacidad=65536):
+        self.ruta = ruta
+        self.muestreo = muestreo
+        self.tamano_lote = tamano_lote
+        self._tramos = BufferFondo(self._escribir, "exportador-trazas", intervalo, capacidad)
+        self.trazas = 0
+        self.tramos_exportados = 0
+
+    def configurar(self, ruta=None, muestreo=None):
+        if ruta is not None:
+            self.ruta = ruta
+        if muestreo is not None:
+            self.muestreo = muestreo
+
+    def iniciar(self, nombre="solicitud", id_solicitud=None):
+        """
+        Nueva traza si la solicitud entra en el muestreo; si no, None. Su id se
+        deriva de `id_solicitud` con `id_traza_de`, o es uno nuevo si no se da.
+        """
+        if self.muestreo <= 0 or (self.muestreo < 1 and random.random() >= self.muestreo):
+            return None
+        self.trazas += 1
+        id_traza = id_traza_de(id_solicitud) if id_solicitud else nuevo_id_solicitud()
+        return Traza(self, id_traza, nombre)
+
+    def _exportar(self, tramo):
+        self._tramos.anadir(tramo)
+
+    def vaciar(self):
+        """Escribe ya los tramos pendientes."""
+        self._tramos.vaciar()
+
+    def _escribir(self, tramos):
+        lineas = []
+        for i in range(0, len(tramos), self.tamano_lote):
+            lineas.append(json.dumps({"resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": NOMBRE_SERVICIO}}]},
+                "scopeSpans": [{"scope": {"name": __name__},
+                                "spans": [tramo_otlp(t) for t in tramos[i:i + self.tamano_lote]]}]
+            }]}, separators=(",", ":")))
+        with self._tramos.lock:
+            try:
+                with open(self.ruta, "a", encoding="utf-8") as archivo:
+                    archivo.write("\n".join(lineas) + "\n")
+            except OSError as e:
+                print(f"No se pudieron escribir las trazas en '{self.ruta}': {e}")
+                return
+            self.tramos_exportados += len(tramos)
+
+    def estadisticas(self):
+        return {
+            "ruta": self.ruta,
+            "muestreo": self.muestreo,
+            "trazas": self.trazas,
+            "tramos_exportados": self.tramos_exportados,
+            "desbordados": self._tramos.desbordados,
+            "pendientes": len(self._tramos)
+        }
+
+def leer_tramos(ruta):
+    """Tramos de un archivo de trazas OTLP/JSON Lines, como diccionarios de OTLP."""
+    with open(ruta, encoding="utf-8") as archivo:
+        for linea in archivo:
+            if not linea.strip():
+                continue
+            for recurso in json.loads(linea).get("resourceSpans", []):
+                for ambito in recurso.get("scopeSpans", []):
+                    yield from ambito.get("spans", [])
+
+# Trazador compartido del proceso; app.py lo configura con RUTA_TRAZAS y MUESTREO_TRAZAS
+trazador = Trazador()
+atexit.register(trazador.vaciar)